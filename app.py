@@ -1,76 +1,381 @@
-from flask import Flask, render_template, request
-from threading import Thread, Lock
+from flask import Flask, Response, g, render_template, request, url_for
+from markupsafe import Markup
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+import base64
+import binascii
+import csv
+import datetime as dt
+import gzip
+import hashlib
+import io
+import itertools
 import json
 import math
 import logging
+import time
+import zlib
 
-from spacex_tracker import SpaceXData
-from utils import send_notifications, fetch_data, parse_date
-from config import PAGE_SIZE
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+import metrics
+from cache import LRUCache
+from diff import NO_CHANGES, SnapshotDiff
+from notifications import get_dispatcher
+from spacex_tracker import GROUP_BY_DIMENSIONS, SpaceXData
+from subscribers import create_store
+from utils import (send_notifications, fetch_data, parse_date, start_background_refresh, is_ready, is_refresher,
+                   data_fingerprint, snapshot_age)
+from config import (PAGE_SIZE, BACKGROUND_REFRESH, CACHE_EXPIRY, COMPRESS_MIN_SIZE,
+                    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES, PAGE_CACHE_SIZE, PAGE_CACHE_MAX_BYTES,
+                    STATIC_MAX_AGE, SUBSCRIBER_STORE, NOTIFY_LEASE_TTL)
 
 app = Flask(__name__)
 
-_SUBSCRIBERS = set()
+# Subscribers are shared by all workers through the store
+_STORE = create_store(SUBSCRIBER_STORE)
+
+# Changes seen by this worker that were not notified yet
+_PENDING_DIFF = NO_CHANGES
 _LOCK = Lock()
 
+# Serialized (and compressed) JSON bodies keyed by (etag, content encoding)
+_RESPONSE_CACHE = LRUCache(
+    max_entries=RESPONSE_CACHE_SIZE,
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    sizeof=lambda cached: len(cached[0]),
+)
+
+# Rendered HTML pages and fragments, keyed by data version, filters and page
+_PAGE_CACHE = LRUCache(
+    max_entries=PAGE_CACHE_SIZE,
+    max_bytes=PAGE_CACHE_MAX_BYTES,
+    sizeof=len,
+)
+
+_EXPORT_MIMETYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+_CSV_FIELDS = ("name", "date_utc", "rocket", "launchpad", "success")
+
+_REQUEST_SECONDS = metrics.histogram("spacex_http_request_seconds", "Duration of the HTTP requests",
+                                     ("endpoint", "method", "status"))
+
+# Warm the cache at startup and keep it fresh off the request path
+if BACKGROUND_REFRESH:
+    start_background_refresh()
+
+@app.before_request
+def _start_timing() -> None:
+    if metrics.ENABLED:
+        g.request_start = time.perf_counter()
+        metrics.start_request()
+
+@app.after_request
+def _server_timing(response: Response) -> Response:
+    """
+    Server-Timing header of the operations timed during the request (see
+    metrics.timed), and the request duration histogram.
+    """
+    start = g.get("request_start")
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        _REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "", method=request.method,
+                                 status=response.status_code)
+        timing = metrics.server_timing()
+        total = f"total;dur={elapsed * 1000:.3f}"
+        response.headers["Server-Timing"] = f"{timing}, {total}" if timing else total
+    return response
+
+@app.teardown_request
+def _end_timing(exc: Optional[BaseException]) -> None:
+    if metrics.ENABLED:
+        metrics.end_request()
+
+def _collect_metrics() -> Iterator[metrics.Family]:
+    """
+    Cache, webhook dispatcher and snapshot metrics, read when /metrics is
+    scraped.
+    """
+    caches = {"response": _RESPONSE_CACHE.info(), "page": _PAGE_CACHE.info(), "query": SpaceXData.query_cache_info()}
+    for key, metric_type in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                             ("entries", "gauge"), ("bytes", "gauge")):
+        name = f"spacex_cache_{key}_total" if metric_type == "counter" else f"spacex_cache_{key}"
+        yield name, metric_type, f"Cache {key}", [({"cache": cache}, info[key]) for cache, info in caches.items()]
+
+    for key, value in get_dispatcher().metrics().items():
+        if key in ("queued", "scheduled_retries", "pending", "avg_delivery_seconds"):
+            yield f"spacex_webhook_{key}", "gauge", f"Webhook deliveries {key.replace('_', ' ')}", [({}, value)]
+        else:
+            yield f"spacex_webhook_{key}_total", "counter", f"Webhook deliveries {key.replace('_', ' ')}", [({}, value)]
+
+    yield "spacex_ready", "gauge", "Whether a snapshot is loaded", [({}, int(is_ready()))]
+    if is_ready():
+        yield "spacex_snapshot_age_seconds", "gauge", "Age of the current snapshot", [({}, snapshot_age())]
+
+metrics.register_collector(_collect_metrics)
+
+def _render_template(template: str, **context: Any) -> str:
+    with metrics.timed("render"):
+        return render_template(template, **context)
+
+def _load_data() -> Tuple[Dict[str, Any], SpaceXData]:
+    """
+    Current snapshot and its SpaceXData, queueing notifications to the
+    subscribers if this call refreshed the data.
+    """
+    with metrics.timed("fetch"):
+        data, diff = fetch_data()
+    _notify(data, diff)
+    return data, SpaceXData.from_snapshot(data)
+
+def _notify(data: Dict[str, Any], diff: SnapshotDiff) -> None:
+    """
+    Notify subscribers of changes, at most once per snapshot across all the
+    workers and never after a newer snapshot. Only the process refreshing
+    the data from the API claims the notification (with a shared snapshot
+    file, its writer). Changes are kept pending until this worker wins the
+    claim, and dropped once a snapshot at least as recent was notified.
+    """
+    global _PENDING_DIFF
+
+    with _LOCK:
+        if diff:
+            _PENDING_DIFF = _PENDING_DIFF.merge(diff) if _PENDING_DIFF else diff
+        if not _PENDING_DIFF:
+            return
+        fingerprint, revision = data_fingerprint(data), data.get("revision", 0)
+        try:
+            if is_refresher() and _STORE.claim_notification(fingerprint, revision, ttl=NOTIFY_LEASE_TTL):
+                send_notifications(_STORE.all(), _PENDING_DIFF)
+            else:
+                notified_fingerprint, notified_revision = _STORE.notified()
+                if notified_fingerprint != fingerprint and notified_revision < revision:
+                    # not notified yet: the lease holder has not seen it
+                    return
+        except Exception as e:
+            logging.error(f"Could not notify subscribers: {e}")
+            return
+        _PENDING_DIFF = NO_CHANGES
+
+def _request_filters() -> Dict[str, Any]:
+    """
+    filter_launches arguments from the request parameters.
+    """
+    success_filter = request.args.get('success')
+    return {
+        "start_date": parse_date(request.args.get('start_date')),
+        "end_date": parse_date(request.args.get('end_date')),
+        "rocket_name": request.args.getlist('rocket'),
+        "success": success_filter.lower() == 'true' if success_filter else None,
+        "launch_site": request.args.getlist('launchpad'),
+    }
+
+def _filter_args(normalized: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Request parameters selecting the normalized filters, the inverse of
+    _request_filters.
+    """
+    def date_arg(date: Optional[dt.datetime]) -> Optional[str]:
+        if date is None:
+            return None
+        # formats parse_date reads back as the same UTC date
+        return date.strftime("%Y-%m-%d" if date.time() == dt.time() else "%Y-%m-%dT%H:%M:%S.%fZ")
+
+    start_date, end_date, rocket_names, success, site_names = normalized
+    args = {
+        "start_date": date_arg(start_date),
+        "end_date": date_arg(end_date),
+        "rocket": list(rocket_names or ()),
+        "success": None if success is None else str(success).lower(),
+        "launchpad": list(site_names or ()),
+    }
+    return {key: value for key, value in args.items() if value}
+
+def _etag(data: Dict[str, Any], *parts: Any) -> str:
+    """
+    Strong ETag for a representation of the snapshot, e.g. a route and its
+    normalized query.
+    """
+    return hashlib.sha1(repr((data_fingerprint(data),) + parts).encode()).hexdigest()
+
+def _accepted_encoding() -> Optional[str]:
+    if brotli is not None and request.accept_encodings["br"]:
+        return "br"
+    if request.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+def _set_cache_headers(response: Response, etag: str) -> None:
+    response.set_etag(etag)
+    # the snapshot is refreshed CACHE_EXPIRY seconds after it was fetched
+    max_age = max(0, int(CACHE_EXPIRY - snapshot_age()))
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    response.vary.add("Accept-Encoding")
+
+def _cached_json(etag: str, build: Callable[[], Any]) -> Response:
+    """
+    JSON response for `etag`. Answers 304 when the client already holds it,
+    otherwise serves the body built by `build` (compressed if the client
+    accepts it and the body is large), caching the encoded bytes.
+    """
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    encoding = _accepted_encoding()
+    cached = _RESPONSE_CACHE.get((etag, encoding))
+    if cached is None:
+        cached = _compress(app.json.response(build()).get_data(), encoding)
+        _RESPONSE_CACHE.set((etag, encoding), cached)
+
+    body, content_encoding = cached
+    return _encoded_response(Response(body, status=200, mimetype=app.json.mimetype), etag, content_encoding)
+
+def _compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    `body` compressed with `encoding` if it is large enough, and the content
+    encoding it ended up with.
+    """
+    if encoding and len(body) >= COMPRESS_MIN_SIZE:
+        return (brotli.compress(body) if encoding == "br" else gzip.compress(body, mtime=0)), encoding
+    return body, None
+
+def _compress_stream(chunks: Iterable[str], encoding: str) -> Iterator[bytes]:
+    """
+    `chunks` encoded to UTF-8 and compressed with `encoding` as they are
+    produced; the size of a stream is not known up front, so it is always
+    compressed.
+    """
+    # gzip container (wbits 16 + 15) with a zero mtime, like gzip.compress(mtime=0)
+    compressor = brotli.Compressor() if encoding == "br" else zlib.compressobj(wbits=31)
+    compress = compressor.process if encoding == "br" else compressor.compress
+    for chunk in chunks:
+        data = compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.finish() if encoding == "br" else compressor.flush()
+
+def _encoded_response(response: Response, etag: str, content_encoding: Optional[str]) -> Response:
+    # each content encoding is its own representation with its own tag (see _not_modified)
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    _set_cache_headers(response, f"{etag}-{content_encoding}" if content_encoding else etag)
+    return response
+
+def _filter_form(data: Dict[str, Any], spacex_data: SpaceXData) -> Markup:
+    """
+    Rendered filter form (rocket and launchpad option lists), which only
+    changes with the data.
+    """
+    def render():
+        return Markup(_render_template("_filter_form.html",
+                                       rockets=spacex_data.get_rockets(by_name=True),
+                                       launchpads=spacex_data.get_launch_sites(by_name=True)))
+    return _PAGE_CACHE.get_or_set(("filter_form", data_fingerprint(data)), render)
+
+def _render_launches(spacex_data: SpaceXData, filters: Dict[str, Any], page: int, filter_form: Markup) -> str:
+    """
+    Launches page for the request, raises ValueError for an invalid cursor.
+    """
+    after = _decode_cursor(request.args['after']) if request.args.get('after') else None
+    before = _decode_cursor(request.args['before']) if request.args.get('before') else None
+
+    # Keyset pagination: walk the sorted index from the cursor and stop after
+    # PAGE_SIZE rows (plus one to know whether there is more)
+    start = time.perf_counter()
+    if before is not None:
+        paginated_launches = list(itertools.islice(
+            spacex_data.iter_launches(**filters, before=before, descending=True), PAGE_SIZE + 1
+        ))
+        has_previous = len(paginated_launches) > PAGE_SIZE
+        paginated_launches = paginated_launches[:PAGE_SIZE][::-1]
+        has_next = True
+        if not has_previous:
+            page = 1
+    else:
+        matches = spacex_data.iter_launches(**filters, after=after)
+        if after is None and page > 1:
+            # page number without a cursor (old links): skip to the page
+            matches = itertools.islice(matches, (page - 1) * PAGE_SIZE, None)
+        paginated_launches = list(itertools.islice(matches, PAGE_SIZE + 1))
+        has_next = len(paginated_launches) > PAGE_SIZE
+        paginated_launches = paginated_launches[:PAGE_SIZE]
+        has_previous = page > 1
+
+    # Totals come from the index, no result list is built
+    total_launches = spacex_data.count_launches(**filters)
+    total_pages = max(math.ceil(total_launches / PAGE_SIZE), 1)
+    metrics.record("filter", time.perf_counter() - start)
+
+    # the page is cached per normalized filters (see launches), so its links
+    # are built from them rather than from whatever else the query carried
+    filter_args = _filter_args(SpaceXData.normalize_filters(**filters))
+
+    def page_url(**cursor: Any) -> str:
+        return url_for("launches", **filter_args, **cursor)
+
+    previous_url = next_url = None
+    if has_previous and paginated_launches:
+        previous_url = page_url(before=_encode_cursor(SpaceXData.launch_key(paginated_launches[0])), page=page - 1)
+    if has_next and paginated_launches:
+        next_url = page_url(after=_encode_cursor(SpaceXData.launch_key(paginated_launches[-1])), page=page + 1)
+
+    logging.info(len(paginated_launches))
+    
+    return _render_template("launches.html", 
+                            launches=paginated_launches, 
+                            filter_form=filter_form,
+                            page=page,
+                            total_pages=total_pages,
+                            total_launches=total_launches,
+                            previous_url=previous_url,
+                            next_url=next_url)
+
 @app.route('/')
 def launches():
 
     # Data
-    data, notify_subscribers = fetch_data()
-    # Notify subscribers as background task, thanks to caching notifies once.
-    if notify_subscribers and _SUBSCRIBERS:
-        Thread(target=send_notifications, args=(_SUBSCRIBERS,), daemon=True).start()
-        
-    spacex_data = SpaceXData(**data)
-
-    rockets = spacex_data.get_rockets(by_name=True)
-    launchpads = spacex_data.get_launch_sites(by_name=True)
-    
+    data, spacex_data = _load_data()
+
     # Request parameters
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    rocket_filter = request.args.getlist('rocket')
-    launchpad_filter = request.args.getlist('launchpad')
-    success_filter = request.args.get('success')
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    filters = _request_filters()
 
-    # Filter launches
-    start_date = parse_date(start_date)
-    end_date = parse_date(end_date)
-    success_filter = success_filter.lower() == 'true' if success_filter else None
-    
-    filtered_launches = spacex_data.filter_launches(
-        start_date=start_date,
-        end_date=end_date,
-        rocket_name=rocket_filter,
-        success=success_filter,
-        launch_site=launchpad_filter
-    )
-    
-    for launch in filtered_launches:
-        launch["rocket"] = spacex_data.get_rocket_by_id(launch["rocket"]).get("name", "Unknown")
-        launch["launchpad"] = spacex_data.get_launchpad_by_id(launch["launchpad"]).get("name", "Unknown")
-    
-    # Pagination logic
-    total_launches = len(filtered_launches)
-    total_pages = math.ceil(total_launches / PAGE_SIZE)
-    start = (page - 1) * PAGE_SIZE
-    end = start + PAGE_SIZE
-    paginated_launches = filtered_launches[start:end]
+    # rendered pages are cached per data version, normalized filters and page
+    key = (data_fingerprint(data), SpaceXData.normalize_filters(**filters), page,
+           request.args.get('after'), request.args.get('before'))
+    etag = _etag(data, "page", *key[1:])
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
 
-    logging.info(len(paginated_launches))
-    
-    return render_template("launches.html", 
-                           launches=paginated_launches, 
-                           rockets=rockets, 
-                           launchpads=launchpads,
-                           page=page,
-                           total_pages=total_pages)
+    html = _PAGE_CACHE.get(key)
+    if html is None:
+        try:
+            html = _render_launches(spacex_data, filters, page, _filter_form(data, spacex_data)).encode()
+        except ValueError as e:
+            return str(e), 400
+        _PAGE_CACHE.set(key, html)
+
+    response = Response(html, mimetype="text/html")
+    _set_cache_headers(response, etag)
+    return response
 
 @app.route('/stats')
 def stats():
-    return render_template("stats.html")
+    # static page (the charts load /api/stats), rendered once
+    html = _PAGE_CACHE.get_or_set("stats", lambda: _render_template("stats.html").encode())
+    response = Response(html, mimetype="text/html")
+    response.set_etag(hashlib.sha1(html).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    return response.make_conditional(request)
 
 @app.route("/api/subscribe", methods=["POST"])
 def subscribe():
@@ -78,78 +383,186 @@ def subscribe():
     if not url:
         return "No url", 400
     
-    with _LOCK:
-        _SUBSCRIBERS.add(url)
+    _STORE.add(url)
    
     return "Subscribed successfully!", 200
 
+@app.route("/api/ready")
+def ready():
+    if not is_ready():
+        return "Not ready", 503
+    return "Ready", 200
+
+@app.route("/metrics")
+def prometheus_metrics():
+    if not metrics.ENABLED:
+        return "Metrics are disabled", 404
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _encode_cursor(key: Tuple[dt.datetime, str]) -> str:
+    launch_date, launch_id = key
+    raw = json.dumps([launch_date.isoformat(), launch_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[dt.datetime, str]:
+    """
+    Inverse of _encode_cursor, raises ValueError for a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        launch_date, launch_id = json.loads(raw)
+        return dt.datetime.fromisoformat(launch_date), str(launch_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _not_modified(etag: str) -> Optional[Response]:
+    """
+    304 response if the client already holds the representation `etag`
+    (in any content encoding).
+    """
+    # each content encoding is its own representation with its own tag
+    for tag in (etag, f"{etag}-gzip", f"{etag}-br"):
+        if request.if_none_match.contains(tag):
+            response = Response(status=304)
+            _set_cache_headers(response, tag)
+            return response
+    return None
+
+def _csv_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=_CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    # same encoding as the JSON responses (app.json: sorted keys, compact), one row per line
+    for row in rows:
+        yield app.json.dumps(row, separators=(",", ":")) + "\n"
+
 @app.route("/api/launches", methods=["GET"])
 def export_launches():
-    data, notify_subscribers = fetch_data()
-    if notify_subscribers and _SUBSCRIBERS:
-        Thread(target=send_notifications, args=(_SUBSCRIBERS,), daemon=True).start()
+    data, spacex_data = _load_data()
+    filters = _request_filters()
 
-    spacex_data = SpaceXData(**data)
+    export_format = request.args.get("format", "json").lower()
+    if export_format not in _EXPORT_MIMETYPES:
+        return f"Unsupported format: {export_format}", 400
 
-    # Request parameters for filtering
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    rocket_filter = request.args.getlist('rocket')
-    launchpad_filter = request.args.getlist('launchpad')
-    success_filter = request.args.get('success')
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    try:
+        limit = int(limit) if limit else None
+        if limit is not None and limit <= 0:
+            raise ValueError(f"Invalid limit: {limit}")
+        after = _decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return str(e), 400
 
-    start_date = parse_date(start_date)
-    end_date = parse_date(end_date)
-    success_filter = success_filter.lower() == 'true' if success_filter else None
-    
-    filtered_launches = spacex_data.filter_launches(
-        start_date=start_date,
-        end_date=end_date,
-        rocket_name=rocket_filter,
-        success=success_filter,
-        launch_site=launchpad_filter
-    )
-    
-    for launch in filtered_launches:
-        launch["rocket"] = spacex_data.get_rocket_by_id(launch["rocket"]).get("name", "Unknown")
-        launch["launchpad"] = spacex_data.get_launchpad_by_id(launch["launchpad"]).get("name", "Unknown")
-        launch.pop("id")
+    etag = _etag(data, "launches", SpaceXData.normalize_filters(**filters), export_format, limit, cursor)
+
+    if export_format == "json" and limit is None and after is None:
+        def build():
+            filtered_launches = spacex_data.filter_launches(**filters)
+            return [launch.to_dict(include_id=False) for launch in filtered_launches]
+
+        # the tag is known before filtering, so polling clients get a 304 for free
+        return _cached_json(etag, build)
+
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
 
-    return filtered_launches, 200
+    # pages (and streamed exports) are in keyset order: date_utc, then id
+    launches = spacex_data.iter_launches(**filters, after=after)
+    next_cursor = None
+    if limit is not None:
+        # one extra row tells whether there is a next page
+        launches = list(itertools.islice(launches, limit + 1))
+        if len(launches) > limit:
+            launches = launches[:limit]
+            next_cursor = _encode_cursor(SpaceXData.launch_key(launches[-1]))
+    rows = (launch.to_dict(include_id=False) for launch in launches)
+
+    encoding = _accepted_encoding()
+    if export_format == "json":
+        # encoded and compressed like the unpaged export (_cached_json)
+        body, content_encoding = _compress(app.json.response(list(rows)).get_data(), encoding)
+    else:
+        lines = _csv_lines(rows) if export_format == "csv" else _ndjson_lines(rows)
+        body, content_encoding = (_compress_stream(lines, encoding), encoding) if encoding else (lines, None)
+    response = _encoded_response(Response(body, mimetype=_EXPORT_MIMETYPES[export_format]), etag, content_encoding)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        next_url = url_for("export_launches", **{**request.args.to_dict(flat=False), "cursor": next_cursor})
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+def _group_by() -> Optional[Tuple[str, ...]]:
+    """
+    Dimensions of the group_by parameter (repeated or comma separated), or
+    None if it is absent.
+    """
+    if "group_by" not in request.args:
+        return None
+    return tuple(dimension.strip() for value in request.args.getlist("group_by")
+                 for dimension in value.split(",") if dimension.strip())
 
 @app.route("/api/stats")
 def api_stats():
-    # Fetch data and initialize SpaceXData
-    data, notify_subscribers = fetch_data()
-    if notify_subscribers and _SUBSCRIBERS:
-        Thread(target=send_notifications, args=(_SUBSCRIBERS,), daemon=True).start()
-    spacex_data = SpaceXData(**data)
-
-    # Get success rates by rocket
-    success_rates = {
-        rocket: spacex_data.success_rate_by_rocket(rocket)
-        for rocket in spacex_data.get_rockets(by_name=True)
-    }
-    # sort by success rate
-    success_rates = dict(sorted(success_rates.items(), key=lambda x: -1 if x[1] is None else x[1], reverse=True))
+    data, spacex_data = _load_data()
 
-    # Get launch frequencies
-    launch_freq_monthly = spacex_data.launch_frequency("monthly")
-    launch_freq_yearly = spacex_data.launch_frequency("yearly")
+    group_by = _group_by()
+    if group_by is not None:
+        # launch counts of the filtered launches, grouped by group_by
+        unknown = [dimension for dimension in group_by if dimension not in GROUP_BY_DIMENSIONS]
+        if unknown:
+            return f"Unknown group_by dimension: {', '.join(unknown)}", 400
+        filters = _request_filters()
+        etag = _etag(data, "stats", group_by, SpaceXData.normalize_filters(**filters))
 
-    # conver monts and years to number (some reason js doesnt use sorted keys)
-    launch_freq_monthly = {int(k): v for k, v in launch_freq_monthly.items()}
-    launch_freq_yearly = {int(k): v for k, v in launch_freq_yearly.items()}
+        def build_groups():
+            with metrics.timed("stats"):
+                return {
+                    "group_by": list(group_by),
+                    "groups": spacex_data.group_launches(group_by, **filters),
+                }
 
-    # sort by month/year
-    launch_freq_monthly = dict(sorted(launch_freq_monthly.items(), key=lambda x: x[0]))
-    launch_freq_yearly = dict(sorted(launch_freq_yearly.items(), key=lambda x: x[0]))
+        return _cached_json(etag, build_groups)
 
-    return {
-        "success_rates": success_rates,
-        "launch_freq_monthly": launch_freq_monthly,
-        "launch_freq_yearly": launch_freq_yearly
-    }, 200
+    def build():
+        with metrics.timed("stats"):
+            # Get success rates by rocket
+            success_rates = {
+                rocket: spacex_data.success_rate_by_rocket(rocket)
+                for rocket in spacex_data.get_rockets(by_name=True)
+            }
+            # sort by success rate
+            success_rates = dict(sorted(success_rates.items(), key=lambda x: -1 if x[1] is None else x[1], reverse=True))
+
+            # Get launch frequencies
+            launch_freq_monthly = spacex_data.launch_frequency("monthly")
+            launch_freq_yearly = spacex_data.launch_frequency("yearly")
+
+            # conver monts and years to number (some reason js doesnt use sorted keys)
+            launch_freq_monthly = {int(k): v for k, v in launch_freq_monthly.items()}
+            launch_freq_yearly = {int(k): v for k, v in launch_freq_yearly.items()}
+
+            # sort by month/year
+            launch_freq_monthly = dict(sorted(launch_freq_monthly.items(), key=lambda x: x[0]))
+            launch_freq_yearly = dict(sorted(launch_freq_yearly.items(), key=lambda x: x[0]))
+
+            return {
+                "success_rates": success_rates,
+                "launch_freq_monthly": launch_freq_monthly,
+                "launch_freq_yearly": launch_freq_yearly
+            }
+
+    return _cached_json(_etag(data, "stats"), build)
     
 
 
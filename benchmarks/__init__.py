@@ -0,0 +1,8 @@
+"""
+Performance benchmarks on seeded synthetic data.
+
+  - synthetic: the dataset generator
+  - suite: benchmarks of every SpaceXData method, fetch_data and the HTTP
+    routes, with JSON baselines and regression checks
+  - filter_launches, parse_date: standalone micro-benchmarks
+"""
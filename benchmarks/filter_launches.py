@@ -0,0 +1,101 @@
+"""
+Benchmark SpaceXData.filter_launches against a linear scan on synthetic data.
+
+Usage: python benchmarks/filter_launches.py [--launches 100000]
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_data  # noqa: E402
+from columns import HAS_NUMPY, build_launch_columns  # noqa: E402
+import spacex_tracker  # noqa: E402
+from spacex_tracker import SpaceXData  # noqa: E402
+from utils import _parse_date_formats  # noqa: E402
+
+
+def linear_filter(data: SpaceXData, start_date=None, end_date=None, rocket_name=None, success=None, launch_site=None):
+    """
+    Reference implementation: the original per-launch scan (and date
+    parsing), without copies.
+    """
+    rockets = {r["id"]: r["name"].lower() for r in data.rockets}
+    launchpads = {p["id"]: p["name"].lower() for p in data.launchpads}
+    filtered = []
+    for launch in data.launches:
+        launch_date = _parse_date_formats(launch.get("date_utc", ""))
+        if not launch_date:
+            continue
+        if start_date and launch_date < start_date:
+            continue
+        if end_date and launch_date > end_date:
+            continue
+        if success is not None and launch.get("success", False) != success:
+            continue
+        if rocket_name and rockets.get(launch["rocket"], "") not in rocket_name:
+            continue
+        if launch_site and launchpads.get(launch["launchpad"], "") not in launch_site:
+            continue
+        filtered.append(launch)
+    return filtered
+
+
+def timed(func, *args, repeat: int = 5, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="filter_launches benchmark")
+    parser.add_argument("--launches", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # measure the filters themselves, not the result cache
+    spacex_tracker._QUERY_CACHE.max_entries = 0
+
+    launches, rockets, launchpads = synthetic_data(args.launches)
+    data = SpaceXData(launches, rockets, launchpads)
+    columnar = SpaceXData(launches, rockets, launchpads, columns=build_launch_columns(launches)) if HAS_NUMPY else None
+
+    t0 = time.perf_counter()
+    data.filter_launches(success=True)
+    print(f"index build + first query: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    utc = datetime.timezone.utc
+    queries = {
+        "one year": dict(start_date=datetime.datetime(2015, 1, 1, tzinfo=utc), end_date=datetime.datetime(2015, 12, 31, tzinfo=utc)),
+        "rocket": dict(rocket_name=["rocket 3"]),
+        "rocket + site + success": dict(rocket_name=["rocket 3"], launch_site=["launch site 7"], success=True),
+        "month + rocket": dict(start_date=datetime.datetime(2019, 3, 1, tzinfo=utc), end_date=datetime.datetime(2019, 3, 31, tzinfo=utc), rocket_name=["rocket 1"]),
+    }
+    for label, kwargs in queries.items():
+        indexed, result = timed(data.filter_launches, repeat=args.repeat, **kwargs)
+        linear, expected = timed(linear_filter, data, repeat=1, **kwargs)
+        assert result == expected, label
+        line = f"{label:>24}: {len(result):>7} rows  indexed {indexed * 1000:8.2f} ms  linear {linear * 1000:8.2f} ms"
+        if columnar is not None:
+            vectorized, result = timed(columnar.filter_launches, repeat=args.repeat, **kwargs)
+            assert result == expected, label
+            line += f"  columnar {vectorized * 1000:8.2f} ms"
+        print(line)
+
+    for label, backend in [("indexed", data), ("columnar", columnar)]:
+        if backend is None:
+            continue
+        # drop the memoized stats but keep the already built index/columns
+        backend._stats = None
+        elapsed, _ = timed(backend.stats, repeat=1)
+        print(f"{label:>8} stats pass: {elapsed * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Load test of the app against the stub SpaceX API: concurrent clients hit
+/, /api/launches and /api/stats on the real app (served by a threaded WSGI
+server) while a scenario event happens mid-run, and the latency histogram,
+percentiles and throughput per route plus the time spent waiting on
+utils._LOCK are reported.
+
+Usage:
+  python -m benchmarks.load_test [--scenario steady|cold|expiry|all] [--background]
+      [--concurrency 30] [--duration 10] [--launches 10000] [--latency 0.2] [--failure-rate 0.1]
+  python -m benchmarks.load_test --target http://127.0.0.1:8000   # an app already running
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+import config as c  # noqa: E402
+import utils  # noqa: E402
+from benchmarks.stub_api import StubSpaceXAPI  # noqa: E402
+from breaker import CircuitBreaker  # noqa: E402
+from subscribers import MemorySubscriberStore  # noqa: E402
+
+# (label, path) requested by the clients, picked at random
+ROUTES: List[Tuple[str, str]] = [
+    ("/", "/"),
+    ("/", "/?rocket=Rocket%203&page=2"),
+    ("/api/launches", "/api/launches?rocket=Rocket%201&success=true"),
+    ("/api/launches", "/api/launches?format=ndjson&limit=100&launchpad=Launch%20Site%207"),
+    ("/api/stats", "/api/stats"),
+    ("/api/stats", "/api/stats?group_by=rocket,year"),
+]
+
+# Upper bounds (ms) of the latency histogram buckets, the last one is open
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+SCENARIOS = {
+    "steady": "warm cache, constant load",
+    "cold": "the cache is dropped mid-run: the next request downloads under utils._LOCK",
+    "expiry": "the cache TTL lapses mid-run after upstream data changed",
+}
+
+
+class TimedLock:
+    """
+    Lock recording how long each acquisition waited, swapped in for
+    utils._LOCK during a run.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits: List[float] = []
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self.waits.append(0.0)
+            return True
+        if not blocking:
+            return False
+        t0 = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        if acquired:
+            self.waits.append(time.perf_counter() - t0)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class AppServer:
+    """
+    The Flask app behind a threaded WSGI server (a thread per connection,
+    like gunicorn's gthread worker), in a background thread.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self.server = make_server(host, port, app.app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="load-test-app", daemon=True)
+
+    def __enter__(self) -> "AppServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextlib.contextmanager
+def app_environment(stub: StubSpaceXAPI, background: bool = False):
+    """
+    Point the app at the stub with an empty cache, an instrumented
+    utils._LOCK and in-memory subscribers, and load the cache. Everything
+    is restored on exit. Yields the TimedLock.
+    """
+    lock = TimedLock()
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patch.object(c, "SPACEX_BASE_URL", stub.url))
+        stack.enter_context(patch.object(c, "SNAPSHOT_FILE", None))
+        stack.enter_context(patch.dict(utils._VALIDATORS, clear=True))
+        stack.enter_context(patch.object(app, "_STORE", MemorySubscriberStore()))
+        breaker = CircuitBreaker(c.BREAKER_FAILURES, c.BREAKER_RESET_TIMEOUT)
+        for name, value in (("_SESSION", utils._create_session()), ("_LOCK", lock), ("_DATA", {}),
+                            ("_TIMESTAMP", datetime.datetime(1453, 5, 29)), ("_VERSION", utils._VERSION),
+                            ("_BREAKER", breaker)):
+            stack.enter_context(patch.object(utils, name, value))
+        app._RESPONSE_CACHE.clear()
+        app._PAGE_CACHE.clear()
+        if background:
+            utils.start_background_refresh()
+            stack.callback(utils.stop_background_refresh, 5)
+        else:
+            utils.warm_cache()
+        yield lock
+
+
+def _drop_cache() -> None:
+    utils._DATA = {}
+
+
+def _expire_cache(stub: StubSpaceXAPI) -> Callable[[], None]:
+    def expire() -> None:
+        launches = stub.documents["/launches"]
+        launches[0] = dict(launches[0], success=not launches[0]["success"])
+        stub.changed("/launches")
+        utils._TIMESTAMP = datetime.datetime.now() - datetime.timedelta(seconds=c.CACHE_EXPIRY + 1)
+    return expire
+
+
+def run_load(base_url: str,
+             routes: List[Tuple[str, str]],
+             concurrency: int,
+             duration: float,
+             events: Tuple[Tuple[float, Callable[[], None]], ...] = (),
+             seed: int = 0) -> Tuple[List[Tuple[str, float, int]], float]:
+    """
+    `concurrency` clients (each with its own keep-alive session) requesting
+    random routes for `duration` seconds; each (delay, function) event is
+    called `delay` seconds into the run. Returns the (route label, latency
+    in seconds, status) samples, status 0 for connection errors, and the
+    elapsed time.
+    """
+    samples: List[Tuple[str, float, int]] = []
+    start = time.monotonic()
+    deadline = start + duration
+
+    def client(number: int) -> None:
+        rng = random.Random(seed * 1000 + number)
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                label, path = rng.choice(routes)
+                t0 = time.perf_counter()
+                try:
+                    status = session.get(base_url + path, timeout=120).status_code
+                except requests.RequestException:
+                    status = 0
+                # list.append is atomic
+                samples.append((label, time.perf_counter() - t0, status))
+
+    timers = [threading.Timer(delay, function) for delay, function in events]
+    threads = [threading.Thread(target=client, args=(number,), daemon=True) for number in range(concurrency)]
+    for thread in timers + threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for timer in timers:
+        timer.cancel()
+    return samples, time.monotonic() - start
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    """
+    Number of latencies per bucket, keyed "<=N" (ms) and ">N" for the last.
+    """
+    counts = {f"<={bound}": 0 for bound in BUCKETS_MS}
+    counts[f">{BUCKETS_MS[-1]}"] = 0
+    for latency in latencies_ms:
+        for bound in BUCKETS_MS:
+            if latency <= bound:
+                counts[f"<={bound}"] += 1
+                break
+        else:
+            counts[f">{BUCKETS_MS[-1]}"] += 1
+    return counts
+
+
+def summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> Dict[str, Any]:
+    """
+    Throughput, error count and latency distribution overall and per route.
+    """
+    def describe(latencies: List[float], errors: int) -> Dict[str, Any]:
+        ordered = sorted(latency * 1000 for latency in latencies)
+        return {
+            "requests": len(ordered),
+            "errors": errors,
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(statistics.fmean(ordered), 3) if ordered else 0.0,
+            "p50_ms": round(_percentile(ordered, 0.50), 3),
+            "p90_ms": round(_percentile(ordered, 0.90), 3),
+            "p99_ms": round(_percentile(ordered, 0.99), 3),
+            "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+            "histogram": histogram(ordered),
+        }
+
+    routes: Dict[str, List[Tuple[float, int]]] = {}
+    for label, latency, status in samples:
+        routes.setdefault(label, []).append((latency, status))
+    summary = describe([latency for _, latency, _ in samples], sum(1 for *_, status in samples if status != 200))
+    summary["routes"] = {
+        label: describe([latency for latency, _ in results], sum(1 for _, status in results if status != 200))
+        for label, results in sorted(routes.items())
+    }
+    return summary
+
+
+def lock_summary(waits: List[float]) -> Dict[str, Any]:
+    ordered = sorted(wait * 1000 for wait in waits)
+    contended = [wait for wait in ordered if wait > 0]
+    return {
+        "acquisitions": len(ordered),
+        "contended": len(contended),
+        "wait_total_ms": round(sum(contended), 3),
+        "wait_p99_ms": round(_percentile(ordered, 0.99), 3),
+        "wait_max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def run_scenario(scenario: str,
+                 stub: StubSpaceXAPI,
+                 concurrency: int = 30,
+                 duration: float = 10,
+                 background: bool = False,
+                 seed: int = 0) -> Dict[str, Any]:
+    """
+    One scenario of SCENARIOS against the in-process app, its event
+    happening half way through the run. Raises RuntimeError if the event
+    did not make the app download the data again.
+    """
+    with app_environment(stub, background) as lock, AppServer() as server:
+        events: Tuple[Tuple[float, Callable[[], None]], ...] = ()
+        if scenario == "cold":
+            events = ((duration / 2, _drop_cache),)
+        elif scenario == "expiry":
+            events = ((duration / 2, _expire_cache(stub)),)
+        lock.waits.clear()
+        upstream = stub.requests, stub.failures
+        samples, elapsed = run_load(server.url, ROUTES, concurrency, duration, events, seed)
+        if events and stub.requests == upstream[0]:
+            # the event did not make the app go back to the API: nothing was measured
+            raise RuntimeError(f"scenario {scenario!r} made no upstream request")
+        result = {
+            "scenario": scenario,
+            "description": SCENARIOS[scenario],
+            "mode": "background" if background else "sync",
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 3),
+            **summarize(samples, elapsed),
+            "lock": lock_summary(lock.waits),
+            "upstream": {"requests": stub.requests - upstream[0], "failures": stub.failures - upstream[1],
+                         "circuit": utils._BREAKER.state},
+        }
+    return result
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    lines = [
+        f"== {result.get('scenario', 'target')} ({result.get('mode', 'external')}): {result.get('description', '')}",
+        f"{result['requests']} requests in {result['duration_s']:.1f}s, {result['throughput_rps']:.1f} req/s, "
+        f"{result['errors']} errors, concurrency {result['concurrency']}",
+        f"{'route':<16} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+    ]
+    for label, route in result["routes"].items():
+        lines.append(f"{label:<16} {route['requests']:>7} {route['errors']:>5} {route['throughput_rps']:>8.1f} "
+                     f"{route['p50_ms']:>9.2f} {route['p90_ms']:>9.2f} {route['p99_ms']:>9.2f} {route['max_ms']:>9.2f}")
+    peak = max(result["histogram"].values()) or 1
+    lines.append("latency histogram (all routes):")
+    for bucket, count in result["histogram"].items():
+        if count:
+            lines.append(f"  {bucket:>8} ms {count:>7} {'#' * max(1, round(40 * count / peak))}")
+    if "lock" in result:
+        lock = result["lock"]
+        lines.append(f"utils._LOCK: {lock['acquisitions']} acquisitions, {lock['contended']} waited, "
+                     f"total wait {lock['wait_total_ms']:.1f} ms, p99 {lock['wait_p99_ms']:.2f} ms, max {lock['wait_max_ms']:.1f} ms")
+        lines.append(f"upstream: {result['upstream']['requests']} requests, {result['upstream']['failures']} failed, "
+                     f"circuit {result['upstream']['circuit']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test against a stub SpaceX API")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--background", action="store_true", help="Use the background refresher (BACKGROUND_REFRESH)")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--launches", type=int, default=10_000)
+    parser.add_argument("--rockets", type=int, default=10)
+    parser.add_argument("--launchpads", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of stub API requests failing with 503")
+    parser.add_argument("--target", help="Load this running app instead (no stub, no scenario events)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = []
+    if args.target:
+        samples, elapsed = run_load(args.target.rstrip("/"), ROUTES, args.concurrency, args.duration, seed=args.seed)
+        results.append({"concurrency": args.concurrency, "duration_s": round(elapsed, 3), **summarize(samples, elapsed)})
+        print(format_report(results[-1]))
+    else:
+        scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        with StubSpaceXAPI(args.launches, args.rockets, args.launchpads, args.seed,
+                           latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate) as stub:
+            for scenario in scenarios:
+                results.append(run_scenario(scenario, stub, args.concurrency, args.duration, args.background, args.seed))
+                print(format_report(results[-1]) + "\n")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark of utils.parse_date: the strptime format chain against the
+ISO-8601 fast path, without and with memoization.
+
+Usage: python benchmarks/parse_date.py [--dates 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_data  # noqa: E402
+from utils import _parse_date_formats, _parse_date_str, parse_date  # noqa: E402
+
+
+def timed(func, values, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for value in values:
+            func(value)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_date benchmark")
+    parser.add_argument("--dates", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    launches, _, _ = synthetic_data(args.dates)
+    shapes = {
+        "date_utc (.%fZ)": [launch["date_utc"] for launch in launches],
+        "date only": [launch["date_utc"][:10] for launch in launches],
+        "space separated": [launch["date_utc"][:19].replace("T", " ") for launch in launches],
+    }
+    for label, values in shapes.items():
+        assert all(_parse_date_str.__wrapped__(value) == _parse_date_formats(value) for value in values[:1000])
+        chain = timed(_parse_date_formats, values, args.repeat)
+        fast = timed(_parse_date_str.__wrapped__, values, args.repeat)
+        _parse_date_str.cache_clear()
+        parse_date(values[0])
+        for value in values:
+            parse_date(value)  # warm the memo, as ingestion does
+        memoized = timed(parse_date, values, args.repeat)
+        per_date = 1e9 / len(values)
+        print(f"{label:>16}: chain {chain * per_date:7.0f} ns  fast {fast * per_date:7.0f} ns  "
+              f"memoized {memoized * per_date:7.0f} ns  ({chain / fast:4.1f}x / {chain / memoized:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Local stand-in for the SpaceX v4 API serving a synthetic dataset, with
+injectable latency and failures, to load test the app without the network.
+
+Usage: python -m benchmarks.stub_api [--launches 100000] [--latency 0.2] [--failure-rate 0.1] [--port 8081]
+  then: SPACEX_BASE_URL=http://127.0.0.1:8081 gunicorn -w 1 --threads 30 app:app
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_documents  # noqa: E402
+
+
+class StubSpaceXAPI:
+    """
+    Serves ``GET /<collection>`` (with ETag revalidation and gzip) and the
+    paginated ``POST /<collection>/query`` for launches, rockets and
+    launchpads of ``synthetic_documents``.
+
+    Every request waits `latency` seconds (plus up to `jitter`) and fails
+    with a 503 with probability `failure_rate`; all three can be changed
+    while the server runs. Use as a context manager, or ``start``/``stop``.
+    """
+    def __init__(self,
+                 launches: int = 1000,
+                 rockets: int = 10,
+                 launchpads: int = 20,
+                 seed: int = 0,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 failure_rate: float = 0.0,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.documents: Dict[str, List[Dict[str, Any]]] = {
+            f"/{key}": documents for key, documents in synthetic_documents(launches, rockets, launchpads, seed).items()
+        }
+        self._bodies: Dict[str, Tuple[bytes, bytes, str]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        for path in self.documents:
+            self.changed(path)
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if stub._delay_or_fail(self):
+                    return
+                cached = stub._bodies.get(self.path)
+                if cached is None:
+                    self._send(404)
+                    return
+                body, compressed, etag = cached
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, headers={"ETag": etag})
+                    return
+                headers = {"Content-Type": "application/json", "ETag": etag}
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = compressed
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, headers)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if stub._delay_or_fail(self):
+                    return
+                documents = stub.documents.get(self.path[:-len("/query")]) if self.path.endswith("/query") else None
+                if documents is None:
+                    self._send(404)
+                    return
+                options = request.get("options", {})
+                page, limit = options.get("page", 1), options.get("limit", 10)
+                select = options.get("select", {})
+                docs = [{key: value for key, value in document.items() if key == "id" or key in select}
+                        for document in documents[(page - 1) * limit:page * limit]]
+                body = json.dumps({
+                    "docs": docs,
+                    "totalDocs": len(documents),
+                    "limit": limit,
+                    "page": page,
+                    "totalPages": max(1, -(-len(documents) // limit)),
+                }).encode()
+                self._send(200, body, {"Content-Type": "application/json"})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-spacex-api", daemon=True)
+
+    def changed(self, path: str) -> None:
+        """
+        Re-encode the documents of path after they were modified.
+        """
+        body = json.dumps(self.documents[path]).encode()
+        self._bodies[path] = (body, gzip.compress(body, mtime=0), '"' + hashlib.md5(body).hexdigest() + '"')
+
+    def _delay_or_fail(self, handler: BaseHTTPRequestHandler) -> bool:
+        """
+        Apply the injected latency, then True (after answering 503) if
+        this request is picked to fail.
+        """
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.random() * self.jitter
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+        if delay:
+            time.sleep(delay)
+        if failed:
+            handler._send(503, b'{"error": "injected failure"}', {"Content-Type": "application/json"})
+        return failed
+
+    def start(self) -> "StubSpaceXAPI":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubSpaceXAPI":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub SpaceX v4 API")
+    parser.add_argument("--launches", type=int, default=10_000)
+    parser.add_argument("--rockets", type=int, default=10)
+    parser.add_argument("--launchpads", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many more seconds, at random")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with a 503")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    stub = StubSpaceXAPI(args.launches, args.rockets, args.launchpads, args.seed,
+                         latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                         host=args.host, port=args.port)
+    print(f"Serving {args.launches} launches on {stub.url} (SPACEX_BASE_URL)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
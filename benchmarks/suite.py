@@ -0,0 +1,393 @@
+"""
+Benchmark suite: the SpaceXData query methods, fetch_data and the HTTP
+routes on a seeded synthetic dataset, with JSON baselines.
+
+Usage:
+  python -m benchmarks.suite [--launches 100000] [--only filter] [--save FILE]
+  python -m benchmarks.suite --compare benchmarks/baselines/default.json [--threshold 0.25]
+
+--compare exits with status 1 when a benchmark's median is more than
+--threshold (a fraction) slower than in the baseline.
+"""
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+import config  # noqa: E402
+import parallel  # noqa: E402
+import spacex_tracker  # noqa: E402
+import utils  # noqa: E402
+from benchmarks.synthetic import synthetic_documents, synthetic_snapshot  # noqa: E402
+from columns import HAS_NUMPY  # noqa: E402
+from diff import NO_CHANGES  # noqa: E402
+from spacex_tracker import SpaceXData  # noqa: E402
+
+FORMAT = 1
+UTC = datetime.timezone.utc
+
+# Each benchmark returns the function to time and an optional setup run
+# before every timed call (e.g. to empty a cache), outside of the timing
+Case = Tuple[Callable[[], Any], Optional[Callable[[], None]]]
+BENCHMARKS: Dict[str, Callable[["Context"], Case]] = {}
+
+
+def benchmark(name: str):
+    def register(factory: Callable[["Context"], Case]) -> Callable[["Context"], Case]:
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+class Context:
+    """
+    The dataset shared by the benchmarks, built once, and the patches a
+    benchmark needs while it runs (undone by ``close``).
+    """
+    def __init__(self, launches: int, rockets: int, launchpads: int, seed: int):
+        self.params = {"launches": launches, "rockets": rockets, "launchpads": launchpads, "seed": seed}
+        self.documents = synthetic_documents(launches, rockets, launchpads, seed)
+        self.snapshot = synthetic_snapshot(launches, rockets, launchpads, seed)
+        self.data = SpaceXData.from_snapshot(self.snapshot)
+        # without columns: the list index backend
+        self.indexed = SpaceXData(self.snapshot["launches"], self.snapshot["rockets"], self.snapshot["launchpads"])
+        self._stack = contextlib.ExitStack()
+
+    def enter(self, context_manager: Any) -> Any:
+        return self._stack.enter_context(context_manager)
+
+    def close(self) -> None:
+        self._stack.close()
+        self._stack = contextlib.ExitStack()
+
+    def client(self):
+        self.enter(patch("app.fetch_data", return_value=(self.snapshot, NO_CHANGES)))
+        return app.app.test_client()
+
+
+def _clear_query_cache() -> None:
+    spacex_tracker._QUERY_CACHE.clear()
+
+
+def _clear_http_caches() -> None:
+    app._RESPONSE_CACHE.clear()
+    app._PAGE_CACHE.clear()
+
+
+_QUERIES = {
+    "all": {},
+    "year": {"start_date": datetime.datetime(2015, 1, 1, tzinfo=UTC), "end_date": datetime.datetime(2015, 12, 31, tzinfo=UTC)},
+    "rocket": {"rocket_name": "Rocket 3"},
+    "combined": {"rocket_name": "Rocket 3", "launch_site": "Launch Site 7", "success": True},
+}
+
+for _label, _kwargs in _QUERIES.items():
+    def _filter_case(ctx: Context, kwargs: Dict[str, Any] = _kwargs, attr: str = "data") -> Case:
+        return lambda: getattr(ctx, attr).filter_launches(**kwargs), _clear_query_cache
+
+    def _indexed_filter_case(ctx: Context, kwargs: Dict[str, Any] = _kwargs) -> Case:
+        return _filter_case(ctx, kwargs, "indexed")
+
+    def _count_case(ctx: Context, kwargs: Dict[str, Any] = _kwargs) -> Case:
+        return lambda: ctx.data.count_launches(**kwargs), _clear_query_cache
+
+    benchmark(f"spacex_data.filter_launches[{_label}]")(_filter_case)
+    benchmark(f"spacex_data.filter_launches[{_label}, indexed]")(_indexed_filter_case)
+    benchmark(f"spacex_data.count_launches[{_label}]")(_count_case)
+
+
+@benchmark("spacex_data.index_build")
+def _index_build(ctx: Context) -> Case:
+    launches = ctx.snapshot["launches"]
+    return lambda: spacex_tracker._LaunchIndex(launches), None
+
+
+@benchmark("spacex_data.columns_build")
+def _columns_build(ctx: Context) -> Case:
+    from columns import build_launch_columns
+    launches = ctx.snapshot["launches"]
+    return lambda: build_launch_columns(launches), None
+
+
+@benchmark("spacex_data.iter_launches[first page]")
+def _iter_launches(ctx: Context) -> Case:
+    return lambda: list(itertools.islice(ctx.data.iter_launches(rocket_name="Rocket 3", success=True), 20)), None
+
+
+@benchmark("spacex_data.group_launches[rocket, year]")
+def _group_launches(ctx: Context) -> Case:
+    kwargs = {"start_date": datetime.datetime(2010, 6, 15, 12, tzinfo=UTC), "launch_site": "Launch Site 7"}
+    return lambda: ctx.data.group_launches(["rocket", "year"], **kwargs), _clear_query_cache
+
+
+@benchmark("spacex_data.stats")
+def _stats(ctx: Context) -> Case:
+    def reset() -> None:
+        ctx.data._stats = None
+    return ctx.data.stats, reset
+
+
+@benchmark("spacex_data.stats[indexed]")
+def _indexed_stats(ctx: Context) -> Case:
+    ctx.indexed._get_launch_index()
+
+    def reset() -> None:
+        ctx.indexed._stats = None
+    return ctx.indexed.stats, reset
+
+
+def _use_parallel(ctx: Context) -> None:
+    """
+    Evaluate the column filters and statistics in a pool of one worker per
+    core (at least two) while the benchmark runs.
+    """
+    executor = parallel.ParallelColumns(max(2, os.cpu_count() or 1))
+    ctx.enter(contextlib.ExitStack()).callback(executor.shutdown)
+    ctx.enter(patch.object(parallel, "_EXECUTOR", executor))
+    ctx.enter(patch.object(config, "PARALLEL_WORKERS", executor.workers))
+
+
+@benchmark("spacex_data.count_launches[combined, parallel]")
+def _parallel_count(ctx: Context) -> Case:
+    _use_parallel(ctx)
+
+    def run() -> int:
+        return ctx.data.count_launches(**_QUERIES["combined"])
+    run()  # start the workers and share the columns outside of the timing
+    return run, _clear_query_cache
+
+
+@benchmark("spacex_data.stats[parallel]")
+def _parallel_stats(ctx: Context) -> Case:
+    _use_parallel(ctx)
+
+    def reset() -> None:
+        ctx.data._stats = None
+    ctx.data.stats()
+    return ctx.data.stats, reset
+
+
+@benchmark("spacex_data.launch_frequency")
+def _launch_frequency(ctx: Context) -> Case:
+    return lambda: ctx.data.launch_frequency("yearly"), None
+
+
+@benchmark("spacex_data.success_rate_by_rocket")
+def _success_rate(ctx: Context) -> Case:
+    return lambda: [ctx.data.success_rate_by_rocket(name) for name in ctx.data.get_rockets(by_name=True)], None
+
+
+@benchmark("spacex_data.launches_by_site")
+def _launches_by_site(ctx: Context) -> Case:
+    return lambda: [ctx.data.launches_by_site(name) for name in ctx.data.get_launch_sites(by_name=True)], None
+
+
+def _patch_fetch_state(ctx: Context, download: Callable[[], Dict[str, Any]]) -> None:
+    ctx.enter(patch.object(utils, "_download_data", download))
+    for name in ("_DATA", "_VERSION", "_TIMESTAMP"):
+        ctx.enter(patch.object(utils, name, getattr(utils, name)))
+
+
+@benchmark("fetch_data[cache hit]")
+def _fetch_cached(ctx: Context) -> Case:
+    _patch_fetch_state(ctx, lambda: ctx.snapshot)
+    utils._DATA = ctx.snapshot
+    utils._TIMESTAMP = datetime.datetime.now()
+    return utils.fetch_data, None
+
+
+@benchmark("fetch_data[ingest]")
+def _fetch_ingest(ctx: Context) -> Case:
+    # projection, diff, columns and fingerprint of a full download
+    def download() -> Dict[str, Any]:
+        return {key: utils._project(ctx.documents[key], fields) for key, fields in
+                (("launches", utils._LAUNCH_FIELDS), ("rockets", utils._ROCKET_FIELDS), ("launchpads", utils._LAUNCHPAD_FIELDS))}
+
+    def reset() -> None:
+        utils._DATA = {}
+    _patch_fetch_state(ctx, download)
+    return utils.refresh_data, reset
+
+
+@benchmark("fetch_data[refresh, 1% changed]")
+def _fetch_incremental(ctx: Context) -> Case:
+    launches = list(ctx.snapshot["launches"])
+    for pos in range(0, len(launches), 100):
+        launch = dict(launches[pos])
+        launch["success"] = not launch["success"]
+        launches[pos] = utils._project([launch], utils._LAUNCH_FIELDS)[0]
+    download = {"launches": launches, "rockets": utils.NOT_MODIFIED, "launchpads": utils.NOT_MODIFIED}
+
+    def reset() -> None:
+        utils._DATA = ctx.snapshot
+    _patch_fetch_state(ctx, lambda: download)
+    return utils.refresh_data, reset
+
+
+_ROUTES = {
+    "/api/launches": "/api/launches",
+    "/api/launches[filtered]": "/api/launches?rocket=Rocket%203&success=true",
+    "/api/launches[ndjson page]": "/api/launches?format=ndjson&limit=100&rocket=Rocket%203",
+    "/api/launches[csv]": "/api/launches?format=csv&start_date=2015-01-01&end_date=2015-12-31",
+    "/api/stats": "/api/stats",
+    "/api/stats[group_by]": "/api/stats?group_by=site,quarter&start_date=2012-01-01",
+    "/": "/?page=3&rocket=Rocket%203",
+    "/stats": "/stats",
+}
+
+for _label, _url in _ROUTES.items():
+    def _route_case(ctx: Context, url: str = _url) -> Case:
+        client = ctx.client()
+
+        def reset() -> None:
+            _clear_query_cache()
+            _clear_http_caches()
+        return lambda: client.get(url).get_data(), reset
+
+    benchmark(f"route {_label}")(_route_case)
+
+
+@benchmark("route /api/launches[cached]")
+def _cached_route(ctx: Context) -> Case:
+    client = ctx.client()
+    return lambda: client.get("/api/launches", headers={"Accept-Encoding": "gzip"}).get_data(), None
+
+
+def measure(run: Callable[[], Any], setup: Optional[Callable[[], None]], repeat: int) -> Dict[str, Any]:
+    """
+    Best and median of `repeat` timed calls, after one warm-up call.
+    """
+    timings: List[float] = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - t0
+        if i:
+            timings.append(elapsed * 1000)
+    return {"best_ms": round(min(timings), 4), "median_ms": round(statistics.median(timings), 4), "runs": repeat}
+
+
+def run_suite(launches: int = 10_000,
+              rockets: int = 10,
+              launchpads: int = 20,
+              seed: int = 0,
+              repeat: int = 5,
+              only: Optional[List[str]] = None,
+              report: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Run the benchmarks whose names match one of the `only` patterns (all
+    by default) and return the results document saved as a baseline.
+    """
+    ctx = Context(launches, rockets, launchpads, seed)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, factory in BENCHMARKS.items():
+        if only and not any(fnmatch.fnmatch(name, f"*{pattern}*") for pattern in only):
+            continue
+        try:
+            run, setup = factory(ctx)
+            results[name] = measure(run, setup, repeat)
+        finally:
+            ctx.close()
+        report(f"{name:<50} {results[name]['median_ms']:>10.3f} ms  (best {results[name]['best_ms']:.3f})")
+    return {
+        "format": FORMAT,
+        "params": ctx.params,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": HAS_NUMPY,
+        },
+        "created": datetime.datetime.now(UTC).isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.25) -> List[Dict[str, Any]]:
+    """
+    Per benchmark present in both documents: baseline and current median
+    and their ratio, with "regression" set when the current median is more
+    than `threshold` slower.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_ms": base["median_ms"],
+            "current_ms": result["median_ms"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpaceX tracker benchmark suite")
+    parser.add_argument("--launches", type=int, default=10_000)
+    parser.add_argument("--rockets", type=int, default=10)
+    parser.add_argument("--launchpads", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", help="Run only benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with this baseline JSON file, using its dataset parameters")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown flagged as a regression (default 0.25)")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    logging.disable(logging.WARNING)
+    baseline = None
+    params = {"launches": args.launches, "rockets": args.rockets, "launchpads": args.launchpads, "seed": args.seed}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # same dataset as the baseline, or the comparison is meaningless
+        params = baseline["params"]
+
+    print(f"Dataset: {params}")
+    current = run_suite(**params, repeat=args.repeat, only=args.only)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"Saved {args.save}")
+
+    if baseline is None:
+        return 0
+    if baseline["environment"] != current["environment"]:
+        print(f"Warning: baseline recorded on {baseline['environment']}")
+    rows = compare(baseline, current, args.threshold)
+    print(f"\n{'benchmark':<50} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<50} {row['baseline_ms']:>10.3f} {row['current_ms']:>10.3f} {row['ratio']:>7.2f}{flag}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%} in {len(rows)} benchmarks")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
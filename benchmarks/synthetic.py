@@ -0,0 +1,88 @@
+"""
+Seeded synthetic SpaceX datasets: the same arguments always give the same
+data, of any size (up to millions of launches).
+"""
+import datetime
+import os
+import random
+import sys
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: E402
+from columns import build_launch_columns  # noqa: E402
+
+_START = datetime.datetime(2006, 1, 1)
+_SPAN_MINUTES = 20 * 365 * 24 * 60
+
+
+def synthetic_data(n_launches: int,
+                   n_rockets: int = 10,
+                   n_launchpads: int = 20,
+                   seed: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (launches, rockets, launchpads) as minimal dicts: launches spread over
+    20 years from 2006, with random rockets, launchpads and outcomes (a
+    fifth of them unknown).
+    """
+    rng = random.Random(seed)
+    rockets = [{"id": f"rocket{i}", "name": f"Rocket {i}"} for i in range(n_rockets)]
+    launchpads = [{"id": f"pad{i}", "name": f"Launch Site {i}"} for i in range(n_launchpads)]
+    launches = [
+        {
+            "id": f"launch{i}",
+            "name": f"Launch {i}",
+            "date_utc": (_START + datetime.timedelta(minutes=rng.randrange(_SPAN_MINUTES))).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "rocket": rng.choice(rockets)["id"],
+            "launchpad": rng.choice(launchpads)["id"],
+            "success": rng.choice([True, True, True, False, None]),
+        }
+        for i in range(n_launches)
+    ]
+    return launches, rockets, launchpads
+
+
+def synthetic_documents(n_launches: int,
+                        n_rockets: int = 10,
+                        n_launchpads: int = 20,
+                        seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Upstream-like documents of synthetic_data, with the fields of the v4
+    API the app ingests (rocket "active", launchpad "status", "rockets" and
+    "launches").
+    """
+    launches, rockets, launchpads = synthetic_data(n_launches, n_rockets, n_launchpads, seed)
+    pad_launches: Dict[str, List[str]] = {pad["id"]: [] for pad in launchpads}
+    pad_rockets: Dict[str, Dict[str, None]] = {pad["id"]: {} for pad in launchpads}
+    for launch in launches:
+        pad_launches[launch["launchpad"]].append(launch["id"])
+        pad_rockets[launch["launchpad"]][launch["rocket"]] = None
+    return {
+        "launches": launches,
+        "rockets": [dict(rocket, active=i % 3 != 0) for i, rocket in enumerate(rockets)],
+        "launchpads": [dict(pad, status="active", rockets=list(pad_rockets[pad["id"]]), launches=pad_launches[pad["id"]])
+                       for pad in launchpads],
+    }
+
+
+def synthetic_snapshot(n_launches: int,
+                       n_rockets: int = 10,
+                       n_launchpads: int = 20,
+                       seed: int = 0) -> Dict[str, Any]:
+    """
+    A snapshot of synthetic_documents as utils.fetch_data installs it:
+    projected records, launch columns (with numpy), version and fingerprint.
+    """
+    documents = synthetic_documents(n_launches, n_rockets, n_launchpads, seed)
+    snapshot: Dict[str, Any] = {
+        "launches": utils._project(documents["launches"], utils._LAUNCH_FIELDS),
+        "rockets": utils._project(documents["rockets"], utils._ROCKET_FIELDS),
+        "launchpads": utils._project(documents["launchpads"], utils._LAUNCHPAD_FIELDS),
+        "version": 1,
+    }
+    columns = build_launch_columns(snapshot["launches"])
+    if columns is not None:
+        snapshot["columns"] = columns
+    utils.data_fingerprint(snapshot)
+    return snapshot
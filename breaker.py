@@ -0,0 +1,83 @@
+import time
+from threading import Lock
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    Closed, every call is allowed. After `failure_threshold` consecutive
+    failures it opens and ``allow`` fails fast for `reset_timeout` seconds;
+    then it is half-open and lets a single probe through (another one if the
+    probe does not report back within `reset_timeout`). A successful probe
+    closes it, a failed one opens it again for `reset_timeout` seconds.
+    """
+    def __init__(self,
+                 failure_threshold: int = 3,
+                 reset_timeout: float = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go through now. In the half-open state the caller
+        that gets True is the probe and must report its outcome.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = self._clock()
+            if self._state == OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_started = None
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state != CLOSED or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probe_started = None
+
+    def retry_after(self) -> float:
+        """
+        Seconds until a probe is allowed, 0 unless the breaker is open.
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def reset(self) -> None:
+        self.record_success()
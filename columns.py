@@ -0,0 +1,316 @@
+import datetime as dt
+import logging
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, SpaceXData falls back to its list indexes
+    np = None
+
+from utils import parse_date, parse_date_lenient
+
+HAS_NUMPY = np is not None
+
+# Arrays of a LaunchColumns, one entry per launch
+COLUMN_NAMES = ("dates", "rocket_codes", "launchpad_codes", "success", "years", "months", "valid")
+
+# filter_mask's filters encoded for LaunchColumns.mask: datetime64 bounds, success
+# code, and boolean masks over the rocket and launchpad codes (None: no filter)
+CodedFilters = Tuple[Any, Any, Optional[int], Any, Any]
+
+# rocket_totals, rocket_successes, site_totals and frequency
+ColumnStats = Tuple[Dict[Any, int], Dict[Any, int], Dict[Any, int], Dict[str, Dict[str, int]]]
+
+# success tri-state codes
+SUCCESS_TRUE = 1
+SUCCESS_FALSE = 0
+SUCCESS_UNKNOWN = -1
+
+
+class LaunchColumns:
+    """
+    Columnar (struct-of-arrays) copy of a launch list for vectorized queries.
+
+      - dates: datetime64[us] in UTC, NaT where ``parse_date`` rejects the date
+      - rocket_codes / launchpad_codes: int32 codes into rocket_keys / launchpad_keys
+      - success: int8 tri-state (SUCCESS_TRUE, SUCCESS_FALSE, SUCCESS_UNKNOWN)
+      - years / months: calendar year and month used by launch frequency, 0 when unknown
+
+    Position i in every column is launch i of the source list.
+    """
+    def __init__(self, launches: List[Dict[str, Any]]):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar backend")
+
+        n = len(launches)
+        self.rocket_keys: List[Any] = []
+        self.launchpad_keys: List[Any] = []
+        self._rocket_lookup: Dict[Any, int] = {}
+        self._launchpad_lookup: Dict[Any, int] = {}
+        self.dates = np.full(n, np.datetime64("NaT"), dtype="datetime64[us]")
+        self.rocket_codes = np.empty(n, dtype=np.int32)
+        self.launchpad_codes = np.empty(n, dtype=np.int32)
+        self.success = np.empty(n, dtype=np.int8)
+        self.years = np.zeros(n, dtype=np.int32)
+        self.months = np.zeros(n, dtype=np.int8)
+        self._encode(launches, range(n))
+
+    @classmethod
+    def from_arrays(cls,
+                    rocket_keys: List[Any],
+                    launchpad_keys: List[Any],
+                    **arrays: "np.ndarray") -> "LaunchColumns":
+        """
+        Columns over existing arrays (e.g. read-only views of a memory-mapped
+        snapshot file), without copying them.
+        """
+        columns = cls.__new__(cls)
+        columns.rocket_keys = list(rocket_keys)
+        columns.launchpad_keys = list(launchpad_keys)
+        columns._rocket_lookup = {key: code for code, key in enumerate(columns.rocket_keys)}
+        columns._launchpad_lookup = {key: code for code, key in enumerate(columns.launchpad_keys)}
+        for name in COLUMN_NAMES:
+            setattr(columns, name, arrays[name])
+        return columns
+
+    def rows(self, start: int, stop: int) -> "LaunchColumns":
+        """
+        Columns of the launches at positions start to stop, as views of
+        these arrays (position 0 is launch start).
+        """
+        return LaunchColumns.from_arrays(self.rocket_keys, self.launchpad_keys,
+                                         **{name: getattr(self, name)[start:stop] for name in COLUMN_NAMES})
+
+    def updated(self, launches: List[Dict[str, Any]], changed_positions: List[int], old_length: int) -> "LaunchColumns":
+        """
+        Columns for a new version of the launch list in which the launches at
+        changed_positions were modified and launches from old_length on were
+        appended. Only those rows are re-encoded, this instance is untouched.
+        """
+        n = len(launches)
+        columns = LaunchColumns.__new__(LaunchColumns)
+        columns.rocket_keys = list(self.rocket_keys)
+        columns.launchpad_keys = list(self.launchpad_keys)
+        columns._rocket_lookup = dict(self._rocket_lookup)
+        columns._launchpad_lookup = dict(self._launchpad_lookup)
+
+        def grow(array: "np.ndarray", fill: Any) -> "np.ndarray":
+            grown = np.full(n, fill, dtype=array.dtype)
+            grown[:old_length] = array[:old_length]
+            return grown
+
+        columns.dates = grow(self.dates, np.datetime64("NaT"))
+        columns.rocket_codes = grow(self.rocket_codes, 0)
+        columns.launchpad_codes = grow(self.launchpad_codes, 0)
+        columns.success = grow(self.success, SUCCESS_UNKNOWN)
+        columns.years = grow(self.years, 0)
+        columns.months = grow(self.months, 0)
+        columns._encode(launches, list(changed_positions) + list(range(old_length, n)))
+        return columns
+
+    @staticmethod
+    def _code(lookup: Dict[Any, int], keys: List[Any], key: Any) -> int:
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(keys)
+            keys.append(key)
+        return code
+
+    def _encode(self, launches: List[Dict[str, Any]], positions: Any) -> None:
+        """
+        (Re-)encode the launches at the given positions into the columns.
+        """
+        nat = np.datetime64("NaT")
+        for pos in positions:
+            launch = launches[pos]
+            self.rocket_codes[pos] = self._code(self._rocket_lookup, self.rocket_keys, launch.get("rocket"))
+            self.launchpad_codes[pos] = self._code(self._launchpad_lookup, self.launchpad_keys, launch.get("launchpad"))
+
+            value = launch.get("success", False)
+            if value is None:
+                self.success[pos] = SUCCESS_UNKNOWN
+            elif value == True:  # noqa: E712 - same comparison as filter_launches
+                self.success[pos] = SUCCESS_TRUE
+            elif value == False:  # noqa: E712
+                self.success[pos] = SUCCESS_FALSE
+            else:
+                self.success[pos] = SUCCESS_UNKNOWN
+
+            self.dates[pos] = nat
+            self.years[pos] = 0
+            self.months[pos] = 0
+            launch_date = parse_date(launch.get("date_utc", ""))
+            if launch_date is not None:
+                self.dates[pos] = np.datetime64(launch_date.replace(tzinfo=None), "us")
+            else:
+                # launch frequency is more lenient than parse_date (e.g. utc offsets)
+                date_str: str = launch.get("date_utc", "")
+                if not date_str:
+                    continue
+                launch_date = parse_date_lenient(date_str)
+                if launch_date is None:
+                    logging.warning(f"Skiping, launch({launch.get('id')}) - Invalid date format: {date_str}")
+                    continue
+            self.years[pos] = launch_date.year
+            self.months[pos] = launch_date.month
+
+        self.valid = ~np.isnat(self.dates)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @staticmethod
+    def _to_datetime64(date: dt.datetime) -> "np.datetime64":
+        return np.datetime64(date.astimezone(dt.timezone.utc).replace(tzinfo=None), "us")
+
+    @staticmethod
+    def _key_mask(keys: List[Any], names: Set[str], records_by_id: Dict[Any, Dict[str, Any]]) -> "np.ndarray":
+        """
+        Boolean mask over category codes whose record name is in names.
+        """
+        mask = np.zeros(len(keys), dtype=bool)
+        for code, key in enumerate(keys):
+            record = records_by_id.get(key)
+            name = record.get("name", "") if record is not None else ""
+            mask[code] = name.strip().lower() in names
+        return mask
+
+    def encode_filters(self,
+                       start_date: Optional[dt.datetime] = None,
+                       end_date: Optional[dt.datetime] = None,
+                       rocket_names: Optional[Set[str]] = None,
+                       rockets_by_id: Optional[Dict[Any, Dict[str, Any]]] = None,
+                       success: Optional[bool] = None,
+                       site_names: Optional[Set[str]] = None,
+                       launchpads_by_id: Optional[Dict[Any, Dict[str, Any]]] = None) -> CodedFilters:
+        """
+        The filters of filter_mask in terms of the column values, for mask.
+        """
+        return (
+            self._to_datetime64(start_date) if start_date else None,
+            self._to_datetime64(end_date) if end_date else None,
+            (SUCCESS_TRUE if success else SUCCESS_FALSE) if success is not None else None,
+            self._key_mask(self.rocket_keys, rocket_names, rockets_by_id or {}) if rocket_names else None,
+            self._key_mask(self.launchpad_keys, site_names, launchpads_by_id or {}) if site_names else None,
+        )
+
+    def mask(self, filters: CodedFilters) -> "np.ndarray":
+        """
+        Boolean mask of launches matching filters from encode_filters.
+        """
+        start, end, success_code, rocket_mask, site_mask = filters
+        mask = self.valid.copy()
+        if start is not None:
+            mask &= self.dates >= start
+        if end is not None:
+            mask &= self.dates <= end
+        if success_code is not None:
+            mask &= self.success == success_code
+        if rocket_mask is not None:
+            mask &= rocket_mask[self.rocket_codes]
+        if site_mask is not None:
+            mask &= site_mask[self.launchpad_codes]
+        return mask
+
+    def filter_mask(self,
+                    start_date: Optional[dt.datetime] = None,
+                    end_date: Optional[dt.datetime] = None,
+                    rocket_names: Optional[Set[str]] = None,
+                    rockets_by_id: Optional[Dict[Any, Dict[str, Any]]] = None,
+                    success: Optional[bool] = None,
+                    site_names: Optional[Set[str]] = None,
+                    launchpads_by_id: Optional[Dict[Any, Dict[str, Any]]] = None) -> "np.ndarray":
+        """
+        Boolean mask of launches matching the (already normalized) filters.
+        Dates must be timezone aware.
+        """
+        return self.mask(self.encode_filters(start_date, end_date, rocket_names, rockets_by_id,
+                                             success, site_names, launchpads_by_id))
+
+    @staticmethod
+    def _counts(keys: List[Any], codes: "np.ndarray") -> Dict[Any, int]:
+        counts = np.bincount(codes, minlength=len(keys))
+        return {key: int(count) for key, count in zip(keys, counts) if count}
+
+    def rocket_totals(self) -> Dict[Any, int]:
+        return self._counts(self.rocket_keys, self.rocket_codes[self.valid])
+
+    def rocket_successes(self) -> Dict[Any, int]:
+        return self._counts(self.rocket_keys, self.rocket_codes[self.valid & (self.success == SUCCESS_TRUE)])
+
+    def site_totals(self) -> Dict[Any, int]:
+        return self._counts(self.launchpad_keys, self.launchpad_codes[self.valid])
+
+    def frequency(self) -> Dict[str, Dict[str, int]]:
+        """
+        Monthly and yearly launch counts keyed like ``launch_frequency``.
+        """
+        known = self.years > 0
+        monthly = np.bincount(self.months[known], minlength=13)
+        years = self.years[known]
+        yearly: Dict[str, int] = {}
+        if len(years):
+            first = int(years.min())
+            yearly = {f"{first + offset:04d}": int(count)
+                      for offset, count in enumerate(np.bincount(years - first)) if count}
+        return {
+            "monthly": {f"{month:02d}": int(count) for month, count in enumerate(monthly) if count},
+            "yearly": yearly,
+        }
+
+    def counts(self) -> Dict[str, Any]:
+        """
+        Launch counts of these rows by rocket and launchpad code, month and
+        year. Counts of disjoint rows add up (see merge_counts), so they can
+        be computed by chunk.
+        """
+        valid = self.valid
+        known = self.years > 0
+        years, year_counts = np.unique(self.years[known], return_counts=True)
+        return {
+            "rocket_totals": np.bincount(self.rocket_codes[valid], minlength=len(self.rocket_keys)),
+            "rocket_successes": np.bincount(self.rocket_codes[valid & (self.success == SUCCESS_TRUE)],
+                                            minlength=len(self.rocket_keys)),
+            "site_totals": np.bincount(self.launchpad_codes[valid], minlength=len(self.launchpad_keys)),
+            "monthly": np.bincount(self.months[known], minlength=13),
+            "yearly": dict(zip(years.tolist(), year_counts.tolist())),
+        }
+
+    @staticmethod
+    def merge_counts(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sum of the counts of disjoint rows.
+        """
+        merged = dict(parts[0])
+        merged["yearly"] = dict(merged["yearly"])
+        for part in parts[1:]:
+            for name in ("rocket_totals", "rocket_successes", "site_totals", "monthly"):
+                merged[name] = merged[name] + part[name]
+            for year, count in part["yearly"].items():
+                merged["yearly"][year] = merged["yearly"].get(year, 0) + count
+        return merged
+
+    def stats_from_counts(self, counts: Dict[str, Any]) -> ColumnStats:
+        """
+        rocket_totals, rocket_successes, site_totals and frequency from the
+        counts of every row.
+        """
+        def by_key(keys: List[Any], counts: "np.ndarray") -> Dict[Any, int]:
+            return {key: int(count) for key, count in zip(keys, counts) if count}
+
+        frequency = {
+            "monthly": {f"{month:02d}": int(count) for month, count in enumerate(counts["monthly"]) if count},
+            "yearly": {f"{year:04d}": count for year, count in sorted(counts["yearly"].items()) if count},
+        }
+        return (by_key(self.rocket_keys, counts["rocket_totals"]),
+                by_key(self.rocket_keys, counts["rocket_successes"]),
+                by_key(self.launchpad_keys, counts["site_totals"]),
+                frequency)
+
+def build_launch_columns(launches: List[Dict[str, Any]]) -> Optional[LaunchColumns]:
+    """
+    Build the columnar representation of launches, or None without numpy.
+    """
+    if not HAS_NUMPY:
+        return None
+    return LaunchColumns(launches)
@@ -12,4 +12,130 @@ except ValueError:
     logging.error("Invalid CACHE_EXPIRY value, using default of 3600")
     CACHE_EXPIRY = 3600
 
-PAGE_SIZE = 20
\ No newline at end of file
+PAGE_SIZE = 20
+
+try:
+    REFRESH_INTERVAL = int(os.environ.get("REFRESH_INTERVAL", CACHE_EXPIRY))
+except ValueError:
+    logging.error(f"Invalid REFRESH_INTERVAL value, using CACHE_EXPIRY ({CACHE_EXPIRY})")
+    REFRESH_INTERVAL = CACHE_EXPIRY
+
+# Refresh the cache from a background thread instead of on the request path
+BACKGROUND_REFRESH = os.environ.get("BACKGROUND_REFRESH", "false").lower() in ("1", "true", "yes")
+
+# Circuit breaker around the upstream downloads: after BREAKER_FAILURES
+# consecutive failed (or rejected) downloads the last good snapshot is served
+# without calling the API, which is probed again every BREAKER_RESET_TIMEOUT s
+try:
+    BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", 3))
+    BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", 60))
+except ValueError:
+    logging.error("Invalid BREAKER_FAILURES/BREAKER_RESET_TIMEOUT value, using defaults of 3 and 60")
+    BREAKER_FAILURES, BREAKER_RESET_TIMEOUT = 3, 60.0
+
+# Downloaded snapshots in which a collection is empty, or lost more than this
+# fraction of its records, are rejected as truncated
+try:
+    SNAPSHOT_MAX_SHRINK = float(os.environ.get("SNAPSHOT_MAX_SHRINK", 0.5))
+except ValueError:
+    logging.error("Invalid SNAPSHOT_MAX_SHRINK value, using default of 0.5")
+    SNAPSHOT_MAX_SHRINK = 0.5
+
+# Request timing (Server-Timing headers) and the Prometheus /metrics endpoint
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Upstream HTTP client settings
+try:
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+except ValueError:
+    logging.error("Invalid HTTP timeout value, using defaults of 5s connect / 30s read")
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT = 5.0, 30.0
+
+try:
+    HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+except ValueError:
+    logging.error("Invalid HTTP_POOL_SIZE value, using default of 10")
+    HTTP_POOL_SIZE = 10
+
+# Ingest through the v4 query endpoints (server side projection and paging)
+QUERY_INGESTION = os.environ.get("QUERY_INGESTION", "false").lower() in ("1", "true", "yes")
+
+# Keep ingested records as compact slotted objects (records.py) instead of dicts
+COMPACT_RECORDS = os.environ.get("COMPACT_RECORDS", "true").lower() in ("1", "true", "yes")
+
+try:
+    QUERY_PAGE_SIZE = int(os.environ.get("QUERY_PAGE_SIZE", 200))
+    QUERY_CONCURRENCY = int(os.environ.get("QUERY_CONCURRENCY", 4))
+except ValueError:
+    logging.error("Invalid QUERY_PAGE_SIZE/QUERY_CONCURRENCY value, using defaults of 200 and 4")
+    QUERY_PAGE_SIZE, QUERY_CONCURRENCY = 200, 4
+
+# Worker processes evaluating the column filters and statistics of large
+# launch sets in parallel (0 or 1: in the calling thread), from this many launches
+try:
+    PARALLEL_WORKERS = int(os.environ.get("PARALLEL_WORKERS", 0))
+    PARALLEL_MIN_LAUNCHES = int(os.environ.get("PARALLEL_MIN_LAUNCHES", 500_000))
+except ValueError:
+    logging.error("Invalid PARALLEL_WORKERS/PARALLEL_MIN_LAUNCHES value, using defaults of 0 and 500000")
+    PARALLEL_WORKERS, PARALLEL_MIN_LAUNCHES = 0, 500_000
+
+# filter_launches result cache (0 entries disables it)
+try:
+    QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", 256))
+    QUERY_CACHE_MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    QUERY_CACHE_TTL = int(os.environ.get("QUERY_CACHE_TTL", CACHE_EXPIRY))
+except ValueError:
+    logging.error("Invalid QUERY_CACHE_* value, using defaults")
+    QUERY_CACHE_SIZE, QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL = 256, 64 * 1024 * 1024, CACHE_EXPIRY
+
+# HTTP response caching/compression of the JSON API
+try:
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 128))
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+except ValueError:
+    logging.error("Invalid COMPRESS_MIN_SIZE/RESPONSE_CACHE_* value, using defaults")
+    COMPRESS_MIN_SIZE, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES = 1024, 128, 32 * 1024 * 1024
+
+# Rendered HTML page cache, and max-age of static pages
+try:
+    PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 256))
+    PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 86400))
+except ValueError:
+    logging.error("Invalid PAGE_CACHE_*/STATIC_MAX_AGE value, using defaults")
+    PAGE_CACHE_SIZE, PAGE_CACHE_MAX_BYTES, STATIC_MAX_AGE = 256, 16 * 1024 * 1024, 86400
+
+# Webhook delivery
+try:
+    WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", 8))
+    WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", 10000))
+    WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", 5))
+    WEBHOOK_BACKOFF = float(os.environ.get("WEBHOOK_BACKOFF", 1))
+    WEBHOOK_BACKOFF_MAX = float(os.environ.get("WEBHOOK_BACKOFF_MAX", 300))
+    WEBHOOK_PER_HOST = int(os.environ.get("WEBHOOK_PER_HOST", 4))
+    WEBHOOK_TIMEOUT = float(os.environ.get("WEBHOOK_TIMEOUT", 5))
+except ValueError:
+    logging.error("Invalid WEBHOOK_* value, using defaults")
+    WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_MAX_ATTEMPTS = 8, 10000, 5
+    WEBHOOK_BACKOFF, WEBHOOK_BACKOFF_MAX, WEBHOOK_PER_HOST, WEBHOOK_TIMEOUT = 1.0, 300.0, 4, 5.0
+
+WEBHOOK_DEAD_LETTER_FILE = os.environ.get("WEBHOOK_DEAD_LETTER_FILE") or None
+
+# Subscriber store shared by the workers (":memory:" for a per-process set)
+# and lease of the worker sending the notifications
+SUBSCRIBER_STORE = os.environ.get("SUBSCRIBER_STORE", "subscribers.db")
+try:
+    NOTIFY_LEASE_TTL = float(os.environ.get("NOTIFY_LEASE_TTL", 60))
+except ValueError:
+    logging.error("Invalid NOTIFY_LEASE_TTL value, using default of 60")
+    NOTIFY_LEASE_TTL = 60.0
+
+# Snapshot file shared by the workers of a host (unset: each worker keeps its own)
+SNAPSHOT_FILE = os.environ.get("SNAPSHOT_FILE") or None
+try:
+    SNAPSHOT_POLL_INTERVAL = float(os.environ.get("SNAPSHOT_POLL_INTERVAL", 1))
+except ValueError:
+    logging.error("Invalid SNAPSHOT_POLL_INTERVAL value, using default of 1")
+    SNAPSHOT_POLL_INTERVAL = 1.0
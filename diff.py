@@ -0,0 +1,158 @@
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class RecordDiff:
+    """
+    Changes of one collection (launches, rockets or launchpads) between two
+    snapshots, keyed on record id.
+
+    When ``in_place`` is set every record of the old list kept its position
+    and new records were appended after ``old_length``, so position based
+    indexes can be updated instead of rebuilt. ``changed_positions`` are the
+    positions (in the new list) of records whose content changed.
+    """
+    __slots__ = ("added", "changed", "removed", "in_place", "old_length", "changed_positions")
+
+    def __init__(self,
+                 added: Optional[List[Any]] = None,
+                 changed: Optional[List[Any]] = None,
+                 removed: Optional[List[Any]] = None,
+                 in_place: bool = False,
+                 old_length: int = 0,
+                 changed_positions: Optional[List[int]] = None):
+        self.added = added or []
+        self.changed = changed or []
+        self.removed = removed or []
+        self.in_place = in_place
+        self.old_length = old_length
+        self.changed_positions = changed_positions or []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self) -> str:
+        return f"RecordDiff(added={self.added!r}, changed={self.changed!r}, removed={self.removed!r})"
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        return {"added": list(self.added), "changed": list(self.changed), "removed": list(self.removed)}
+
+    def merge(self, later: "RecordDiff") -> "RecordDiff":
+        """
+        Combine with the diff of the following refresh. Positions are not
+        kept, the result only describes which ids changed.
+        """
+        added = dict.fromkeys(self.added)
+        changed = dict.fromkeys(self.changed)
+        removed = dict.fromkeys(self.removed)
+        for record_id in later.added:
+            if record_id in removed:
+                # removed then re-added counts as a change
+                del removed[record_id]
+                changed[record_id] = None
+            else:
+                added[record_id] = None
+        for record_id in later.changed:
+            if record_id not in added:
+                changed[record_id] = None
+        for record_id in later.removed:
+            if record_id in added:
+                del added[record_id]
+                continue
+            changed.pop(record_id, None)
+            removed[record_id] = None
+        return RecordDiff(list(added), list(changed), list(removed))
+
+
+def diff_records(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], RecordDiff]:
+    """
+    Compare two versions of a collection by id.
+
+    Returns the list to install, where unchanged records are the objects of
+    the old list (or the old list itself when nothing changed), and the diff.
+    """
+    old_length = len(old)
+    in_place = len(new) >= old_length and all(
+        old_record.get("id") == new_record.get("id") for old_record, new_record in zip(old, new)
+    )
+
+    records: List[Dict[str, Any]] = []
+    diff = RecordDiff(in_place=in_place, old_length=old_length)
+    if in_place:
+        for pos, (old_record, new_record) in enumerate(zip(old, new)):
+            if old_record == new_record:
+                records.append(old_record)
+            else:
+                records.append(new_record)
+                diff.changed.append(new_record.get("id"))
+                diff.changed_positions.append(pos)
+        for new_record in new[old_length:]:
+            records.append(new_record)
+            diff.added.append(new_record.get("id"))
+    else:
+        old_by_id = {record.get("id"): record for record in old}
+        new_ids = set()
+        for pos, new_record in enumerate(new):
+            record_id = new_record.get("id")
+            new_ids.add(record_id)
+            old_record = old_by_id.get(record_id)
+            if old_record is None:
+                records.append(new_record)
+                diff.added.append(record_id)
+            elif old_record == new_record:
+                records.append(old_record)
+            else:
+                records.append(new_record)
+                diff.changed.append(record_id)
+                diff.changed_positions.append(pos)
+        diff.removed = [record_id for record_id in old_by_id if record_id not in new_ids]
+
+    if not diff and old_length == len(new):
+        return old, diff
+    return records, diff
+
+
+class SnapshotDiff:
+    """
+    Per collection diff between two snapshots installed by ``fetch_data``.
+    Falsy when nothing changed.
+    """
+    __slots__ = ("launches", "rockets", "launchpads", "base_version", "version")
+
+    def __init__(self,
+                 launches: Optional[RecordDiff] = None,
+                 rockets: Optional[RecordDiff] = None,
+                 launchpads: Optional[RecordDiff] = None,
+                 base_version: int = 0,
+                 version: int = 0):
+        self.launches = launches or RecordDiff()
+        self.rockets = rockets or RecordDiff()
+        self.launchpads = launchpads or RecordDiff()
+        self.base_version = base_version
+        self.version = version
+
+    def __bool__(self) -> bool:
+        return bool(self.launches or self.rockets or self.launchpads)
+
+    def __repr__(self) -> str:
+        return (f"SnapshotDiff(version={self.base_version}->{self.version}, launches={self.launches!r}, "
+                f"rockets={self.rockets!r}, launchpads={self.launchpads!r})")
+
+    def to_dict(self) -> Dict[str, Dict[str, List[Any]]]:
+        return {
+            "launches": self.launches.to_dict(),
+            "rockets": self.rockets.to_dict(),
+            "launchpads": self.launchpads.to_dict(),
+        }
+
+    def merge(self, later: "SnapshotDiff") -> "SnapshotDiff":
+        return SnapshotDiff(
+            self.launches.merge(later.launches),
+            self.rockets.merge(later.rockets),
+            self.launchpads.merge(later.launchpads),
+            base_version=self.base_version,
+            version=later.version,
+        )
+
+
+# Diff returned when a cached snapshot is served
+NO_CHANGES = SnapshotDiff()
@@ -0,0 +1,293 @@
+import bisect
+import contextvars
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import config as c
+
+# Instrumentation switch, read on every call: while disabled every helper
+# below returns straight away (and timed() a shared no-op context manager)
+ENABLED = c.METRICS_ENABLED
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (name, type, help, [(labels, value)]) of one metric family
+Family = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _label_values(labelnames: Tuple[str, ...], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class Counter:
+    """
+    Monotonic counter, one value per combination of label values.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if not ENABLED:
+            return
+        key = _label_values(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_values(self.labelnames, labels), 0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """
+    Distribution of observed values (seconds) over fixed buckets, with their
+    count and sum, per combination of label values.
+    """
+    type = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # per label values: [count per bucket (last one +Inf)], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not ENABLED:
+            return
+        key = _label_values(self.labelnames, labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][position] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(_label_values(self.labelnames, labels))
+        return sum(entry[0]) if entry is not None else 0
+
+    def samples(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(float(bound))}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total[0]))
+                samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+_METRICS: Dict[str, Any] = {}
+_COLLECTORS: List[Callable[[], Iterable[Family]]] = []
+_REGISTRY_LOCK = Lock()
+
+
+def _register(metric_type: type, name: str, *args: Any, **kwargs: Any) -> Any:
+    with _REGISTRY_LOCK:
+        metric = _METRICS.get(name)
+        if metric is None:
+            metric = _METRICS[name] = metric_type(name, *args, **kwargs)
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    """
+    The counter registered under name, created on first use.
+    """
+    return _register(Counter, name, documentation, labelnames)
+
+
+def histogram(name: str,
+              documentation: str,
+              labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    """
+    The histogram registered under name, created on first use.
+    """
+    return _register(Histogram, name, documentation, labelnames, buckets)
+
+
+def register_collector(collect: Callable[[], Iterable[Family]]) -> None:
+    """
+    Add a callable returning metric families computed when /metrics is
+    scraped (e.g. gauges read from a cache's counters).
+    """
+    with _REGISTRY_LOCK:
+        if collect not in _COLLECTORS:
+            _COLLECTORS.append(collect)
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    with _REGISTRY_LOCK:
+        metrics = list(_METRICS.values())
+        collectors = list(_COLLECTORS)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in metric.samples())
+    for collect in collectors:
+        for name, metric_type, documentation, samples in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# Durations of the operations timed during the current request, in
+# milliseconds, for its Server-Timing header (None outside of a request)
+_TIMINGS: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("server_timing", default=None)
+
+OPERATION_SECONDS = histogram("spacex_operation_seconds", "Duration of the instrumented operations", ("operation",))
+
+
+def start_request() -> None:
+    """
+    Start collecting the Server-Timing entries of the current request.
+    """
+    if ENABLED:
+        _TIMINGS.set({})
+
+
+def end_request() -> None:
+    _TIMINGS.set(None)
+
+
+def record(name: str, seconds: float) -> None:
+    """
+    Add a duration to the operation histogram and to the Server-Timing
+    entry `name` of the current request.
+    """
+    if not ENABLED:
+        return
+    OPERATION_SECONDS.observe(seconds, operation=name)
+    timings = _TIMINGS.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds * 1000
+
+
+def describe(name: str, description: str) -> None:
+    """
+    Server-Timing entry `name` of the current request with a description
+    instead of a duration, e.g. whether the cache was hit.
+    """
+    if not ENABLED:
+        return
+    timings = _TIMINGS.get()
+    if timings is not None:
+        timings[name] = description
+
+
+def server_timing() -> Optional[str]:
+    """
+    Server-Timing header value of the current request, None if nothing
+    was timed.
+    """
+    timings = _TIMINGS.get()
+    if not timings:
+        return None
+    return ", ".join(f"{name};dur={value:.3f}" if isinstance(value, float) else f'{name};desc="{_escape(value)}"'
+                     for name, value in timings.items())
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record(self.name, time.perf_counter() - self.start)
+
+
+class _TimedAcquire:
+    __slots__ = ("lock", "name")
+
+    def __init__(self, lock: Any, name: str):
+        self.lock = lock
+        self.name = name
+
+    def __enter__(self) -> bool:
+        start = time.perf_counter()
+        acquired = self.lock.acquire()
+        record(self.name, time.perf_counter() - start)
+        return acquired
+
+    def __exit__(self, *exc: Any) -> None:
+        self.lock.release()
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timed(name: str) -> Any:
+    """
+    Context manager recording the duration of its block (see record).
+    """
+    if not ENABLED:
+        return _NO_TIMER
+    return _Timer(name)
+
+
+def acquire(lock: Any, name: str = "lock_wait") -> Any:
+    """
+    Context manager holding lock, recording how long acquiring it took.
+    """
+    if not ENABLED:
+        return lock
+    return _TimedAcquire(lock, name)
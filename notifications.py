@@ -0,0 +1,286 @@
+import heapq
+import itertools
+import json
+import logging
+import queue
+import random
+import time
+from collections import deque
+from threading import BoundedSemaphore, Condition, Lock, Thread
+from typing import Any, Deque, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+import config as c
+
+# Status codes worth retrying, any other 4xx is a permanent failure
+_RETRY_STATUS = {408, 425, 429}
+
+
+class _Delivery:
+    """
+    One notification for one subscriber. The body is shared by every
+    delivery of the same notification.
+    """
+    __slots__ = ("url", "body", "attempts", "first_queued")
+
+    def __init__(self, url: str, body: bytes):
+        self.url = url
+        self.body = body
+        self.attempts = 0
+        self.first_queued = time.monotonic()
+
+
+class WebhookDispatcher:
+    """
+    Asynchronous webhook delivery.
+
+    ``submit`` never blocks: deliveries go to a bounded queue drained by a
+    fixed pool of worker threads sharing one keep-alive session, with at
+    most ``per_host`` concurrent requests per subscriber host. Failed
+    deliveries are not retried by sleeping in a worker, they are scheduled
+    on a timer heap with exponential backoff and re-queued when due. After
+    ``max_attempts`` (or a permanent 4xx) a delivery is dead-lettered: kept
+    in memory and, when ``dead_letter_file`` is set, appended to it as a
+    JSON line. Deliveries that do not fit in the queue are dead-lettered
+    straight away.
+
+    Threads are started on the first submit.
+    """
+    def __init__(self,
+                 workers: int = c.WEBHOOK_WORKERS,
+                 queue_size: int = c.WEBHOOK_QUEUE_SIZE,
+                 max_attempts: int = c.WEBHOOK_MAX_ATTEMPTS,
+                 backoff: float = c.WEBHOOK_BACKOFF,
+                 backoff_max: float = c.WEBHOOK_BACKOFF_MAX,
+                 per_host: int = c.WEBHOOK_PER_HOST,
+                 timeout: float = c.WEBHOOK_TIMEOUT,
+                 dead_letter_size: int = 1000,
+                 dead_letter_file: Optional[str] = c.WEBHOOK_DEAD_LETTER_FILE):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.per_host = per_host
+        self.timeout = timeout
+        self.dead_letter_file = dead_letter_file
+
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max(workers, 32), pool_maxsize=per_host)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._ready: "queue.Queue[Optional[_Delivery]]" = queue.Queue(maxsize=queue_size)
+        self._retries: List[Any] = []  # heap of (due, seq, delivery)
+        self._sequence = itertools.count()
+        self._host_slots: Dict[str, BoundedSemaphore] = {}
+        self._dead_letters: Deque[Dict[str, Any]] = deque(maxlen=dead_letter_size)
+
+        self._lock = Lock()
+        self._schedule = Condition(self._lock)
+        self._idle = Condition(self._lock)
+        self._pending = 0
+        self._counters = {
+            "submitted": 0,
+            "delivered": 0,
+            "attempts": 0,
+            "failed_attempts": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "dropped": 0,
+        }
+        self._delivery_seconds = 0.0
+
+        self._threads: List[Thread] = []
+        self._started = False
+        self._stopping = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stopping = False
+            self._threads = [Thread(target=self._schedule_retries, name="webhook-scheduler", daemon=True)]
+            self._threads += [
+                Thread(target=self._work, name=f"webhook-worker-{i}", daemon=True) for i in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the threads; queued and scheduled deliveries are abandoned.
+        """
+        with self._lock:
+            if not self._started:
+                return
+            self._stopping = True
+            self._schedule.notify_all()
+        for _ in range(self.workers):
+            self._ready.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._lock:
+            self._started = False
+
+    def submit(self, subscribers: Iterable[str], payload: Dict[str, Any]) -> int:
+        """
+        Queue a notification for every subscriber and return how many were
+        queued. The payload is serialized once.
+        """
+        self.start()
+        body = json.dumps(payload).encode()
+        queued = 0
+        for url in subscribers:
+            delivery = _Delivery(url, body)
+            with self._lock:
+                self._counters["submitted"] += 1
+                self._pending += 1
+            try:
+                self._ready.put_nowait(delivery)
+                queued += 1
+            except queue.Full:
+                logging.error(f"Webhook queue full, dropping notification to {url}")
+                self._dead_letter(delivery, "queue full", counter="dropped")
+        return queued
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every submitted delivery was delivered or dead-lettered.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics: Dict[str, Any] = dict(self._counters)
+            metrics["queued"] = self._ready.qsize()
+            metrics["scheduled_retries"] = len(self._retries)
+            metrics["pending"] = self._pending
+            delivered = self._counters["delivered"]
+            metrics["avg_delivery_seconds"] = self._delivery_seconds / delivered if delivered else 0.0
+        return metrics
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._dead_letters)
+
+    def _slots(self, url: str) -> BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = self._host_slots[host] = BoundedSemaphore(self.per_host)
+            return slots
+
+    def _work(self) -> None:
+        while True:
+            delivery = self._ready.get()
+            if delivery is None:
+                break
+            try:
+                self._attempt(delivery)
+            except Exception as e:
+                logging.error(f"Webhook delivery to {delivery.url} crashed: {e}")
+                self._dead_letter(delivery, str(e))
+
+    def _attempt(self, delivery: _Delivery) -> None:
+        delivery.attempts += 1
+        error = None
+        retry = True
+        with self._slots(delivery.url):
+            logging.info(f"Sending notification to {delivery.url}")
+            try:
+                response = self._session.post(delivery.url,
+                                              data=delivery.body,
+                                              headers={"Content-Type": "application/json"},
+                                              timeout=self.timeout)
+                if 200 <= response.status_code < 300:
+                    self._delivered(delivery)
+                    return
+                error = f"HTTP {response.status_code}"
+                retry = response.status_code >= 500 or response.status_code in _RETRY_STATUS
+            except requests.RequestException as e:
+                error = str(e)
+
+        with self._lock:
+            self._counters["attempts"] += 1
+            self._counters["failed_attempts"] += 1
+        if retry and delivery.attempts < self.max_attempts:
+            self._retry_later(delivery, error)
+        else:
+            self._dead_letter(delivery, error)
+
+    def _delivered(self, delivery: _Delivery) -> None:
+        with self._lock:
+            self._counters["attempts"] += 1
+            self._counters["delivered"] += 1
+            self._delivery_seconds += time.monotonic() - delivery.first_queued
+            self._done()
+
+    def _retry_later(self, delivery: _Delivery, error: str) -> None:
+        delay = min(self.backoff_max, self.backoff * 2 ** (delivery.attempts - 1)) + random.random() * self.backoff
+        logging.warning(f"Notification to {delivery.url} failed ({error}), retrying in {delay:.1f}s")
+        with self._lock:
+            self._counters["retried"] += 1
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), delivery))
+            self._schedule.notify()
+
+    def _schedule_retries(self) -> None:
+        """
+        Move retries to the ready queue when they are due.
+        """
+        while True:
+            with self._lock:
+                while not self._stopping:
+                    now = time.monotonic()
+                    if self._retries and self._retries[0][0] <= now:
+                        break
+                    self._schedule.wait(self._retries[0][0] - now if self._retries else None)
+                if self._stopping:
+                    return
+                _, _, delivery = heapq.heappop(self._retries)
+            # waits for room in the queue, a retry is never dropped
+            self._ready.put(delivery)
+
+    def _dead_letter(self, delivery: _Delivery, error: Optional[str], counter: str = "dead_lettered") -> None:
+        logging.error(f"Giving up on notification to {delivery.url} after {delivery.attempts} attempt(s): {error}")
+        entry = {
+            "url": delivery.url,
+            "payload": json.loads(delivery.body),
+            "attempts": delivery.attempts,
+            "error": error,
+            "time": time.time(),
+        }
+        with self._lock:
+            self._counters[counter] += 1
+            self._dead_letters.append(entry)
+            if self.dead_letter_file:
+                try:
+                    with open(self.dead_letter_file, "a") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    logging.error(f"Could not write dead letter to {self.dead_letter_file}: {e}")
+            self._done()
+
+    def _done(self) -> None:
+        # with self._lock held
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.notify_all()
+
+
+_DISPATCHER: Optional[WebhookDispatcher] = None
+_DISPATCHER_LOCK = Lock()
+
+def get_dispatcher() -> WebhookDispatcher:
+    """
+    Process wide dispatcher, created on first use.
+    """
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            _DISPATCHER = WebhookDispatcher()
+        return _DISPATCHER
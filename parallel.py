@@ -0,0 +1,186 @@
+import logging
+import multiprocessing
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import config as c
+from columns import COLUMN_NAMES, HAS_NUMPY, CodedFilters, ColumnStats, LaunchColumns, np
+
+# What a worker needs to map the columns: shared memory block name, number of
+# launches, (column, dtype, byte offset) of each array and number of rocket and
+# launchpad codes
+Block = Tuple[str, int, Tuple[Tuple[str, str, int], ...], int, int]
+
+
+class _SharedColumns:
+    """
+    Copy of the arrays of a LaunchColumns in one shared memory block, mapped
+    by the workers instead of receiving the launches pickled.
+    """
+    def __init__(self, columns: LaunchColumns):
+        layout, size = [], 0
+        for name in COLUMN_NAMES:
+            array = getattr(columns, name)
+            offset = -(-size // 8) * 8
+            layout.append((name, array.dtype.str, offset))
+            size = offset + array.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, dtype, offset in layout:
+            np.ndarray(len(columns), dtype=dtype, buffer=self.shm.buf, offset=offset)[:] = getattr(columns, name)
+        self.block: Block = (self.shm.name, len(columns), tuple(layout),
+                             len(columns.rocket_keys), len(columns.launchpad_keys))
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.shm.close()
+            self.shm.unlink()
+
+
+# In a worker: the blocks it has mapped, least recently used first
+_MAPPED: "OrderedDict[str, Tuple[shared_memory.SharedMemory, LaunchColumns]]" = OrderedDict()
+_MAPPED_MAX = 4
+
+
+def _attach(block: Block) -> LaunchColumns:
+    name, length, layout, rockets, launchpads = block
+    entry = _MAPPED.get(name)
+    if entry is not None:
+        _MAPPED.move_to_end(name)
+        return entry[1]
+    # the workers share the parent's resource tracker, which already knows the
+    # block: attaching registers it again, harmlessly, and the parent unlinks it
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {column: np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)
+              for column, dtype, offset in layout}
+    # only the number of codes matters in a worker, not the ids they stand for
+    columns = LaunchColumns.from_arrays(list(range(rockets)), list(range(launchpads)), **arrays)
+    _MAPPED[name] = (shm, columns)
+    while len(_MAPPED) > _MAPPED_MAX:
+        _, (old_shm, old_columns) = _MAPPED.popitem(last=False)
+        del old_columns
+        old_shm.close()
+    return columns
+
+
+def _mask_chunk(block: Block, start: int, stop: int, filters: CodedFilters) -> "np.ndarray":
+    return np.packbits(_attach(block).rows(start, stop).mask(filters))
+
+
+def _count_chunk(block: Block, start: int, stop: int) -> Dict[str, Any]:
+    return _attach(block).rows(start, stop).counts()
+
+
+class ParallelColumns:
+    """
+    Evaluates LaunchColumns filter masks and statistics in a pool of worker
+    processes, one chunk of the launches per worker, and merges the chunks'
+    results. The columns are copied once into shared memory (released with
+    them); a task only carries the chunk bounds and the encoded filters.
+
+    Columns of fewer than `min_launches` launches are evaluated in the
+    calling thread, where a round trip to the workers costs more than it
+    saves.
+    """
+    def __init__(self, workers: int, min_launches: int = 0):
+        self.workers = workers
+        self.min_launches = min_launches
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._shared: "weakref.WeakKeyDictionary[LaunchColumns, _SharedColumns]" = weakref.WeakKeyDictionary()
+        self._lock = Lock()
+
+    def parallel(self, columns: LaunchColumns) -> bool:
+        """
+        Whether columns are evaluated by the workers.
+        """
+        return self.workers > 1 and len(columns) > 0 and len(columns) >= self.min_launches
+
+    def _block(self, columns: LaunchColumns) -> Tuple[ProcessPoolExecutor, Block]:
+        with self._lock:
+            if self._pool is None:
+                # not fork: the app runs threads (refresher, webhook delivery)
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+            shared = self._shared.get(columns)
+            if shared is None:
+                shared = self._shared[columns] = _SharedColumns(columns)
+                weakref.finalize(columns, shared.release)
+            return self._pool, shared.block
+
+    def _chunks(self, length: int) -> List[Tuple[int, int]]:
+        size = -(-length // self.workers)
+        return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+    def _broken(self, pool: ProcessPoolExecutor, e: Exception) -> None:
+        logging.error(f"Parallel evaluation failed, evaluating in the calling thread: {e}")
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def filter_mask(self, columns: LaunchColumns, **filters: Any) -> "np.ndarray":
+        """
+        ``columns.filter_mask(**filters)``, by chunk in the workers.
+        """
+        if not self.parallel(columns):
+            return columns.filter_mask(**filters)
+        coded = columns.encode_filters(**filters)
+        pool, block = self._block(columns)
+        chunks = self._chunks(len(columns))
+        try:
+            futures = [pool.submit(_mask_chunk, block, start, stop, coded) for start, stop in chunks]
+            return np.concatenate([np.unpackbits(future.result(), count=stop - start).view(bool)
+                                   for future, (start, stop) in zip(futures, chunks)])
+        except BrokenProcessPool as e:
+            self._broken(pool, e)
+            return columns.mask(coded)
+
+    def stats(self, columns: LaunchColumns) -> ColumnStats:
+        """
+        Rocket totals, rocket successes, site totals and launch frequency of
+        columns, counted by chunk in the workers.
+        """
+        if not self.parallel(columns):
+            return columns.rocket_totals(), columns.rocket_successes(), columns.site_totals(), columns.frequency()
+        pool, block = self._block(columns)
+        try:
+            futures = [pool.submit(_count_chunk, block, start, stop) for start, stop in self._chunks(len(columns))]
+            counts = LaunchColumns.merge_counts([future.result() for future in futures])
+        except BrokenProcessPool as e:
+            self._broken(pool, e)
+            counts = columns.counts()
+        return columns.stats_from_counts(counts)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            shared = list(self._shared.values())
+            self._shared.clear()
+        if pool is not None:
+            pool.shutdown()
+        for block in shared:
+            block.release()
+
+
+_EXECUTOR: Optional[ParallelColumns] = None
+_EXECUTOR_LOCK = Lock()
+
+
+def get_executor() -> Optional[ParallelColumns]:
+    """
+    Process wide executor, created on first use, or None unless
+    PARALLEL_WORKERS asks for more than one worker (and numpy is installed).
+    """
+    global _EXECUTOR
+    if c.PARALLEL_WORKERS <= 1 or not HAS_NUMPY:
+        return None
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ParallelColumns(c.PARALLEL_WORKERS, c.PARALLEL_MIN_LAUNCHES)
+        return _EXECUTOR
@@ -0,0 +1,143 @@
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Tuple, Type
+
+
+def _intern(value: Any) -> Any:
+    """
+    The interned copy of a string, or of the strings of a list.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [sys.intern(item) if isinstance(item, str) else item for item in value]
+    return value
+
+
+class Record(Mapping):
+    """
+    Compact read-only record with a fixed set of fields, a drop-in for the
+    projected upstream documents.
+
+    Each field is a slot instead of a dict entry (no per-record hash table,
+    no repeated keys) and id-like fields are interned, so the thousands of
+    launches referencing a rocket or launchpad share one id string. Item
+    access, iteration order, equality with dicts and ``dict(record)`` are
+    those of the document, so records serialize to the same JSON (with
+    ``json_default``). Subclasses list the fields in ``__slots__``, in
+    document order, and the fields to intern in ``INTERNED``.
+    """
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.__slots__)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+        getter = attrgetter(*cls.FIELDS)
+        cls._values = getter if len(cls.FIELDS) > 1 else staticmethod(lambda record: (getter(record),))
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "Record":
+        return cls(*map(document.get, cls.FIELDS))
+
+    def __reduce__(self):
+        return type(self), self._values(self)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._FIELD_SET
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is type(self):
+            return self._values(self) == self._values(other)
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.FIELDS, self._values(self)))
+
+
+class LaunchRecord(Record):
+    __slots__ = ("id", "name", "launchpad", "date_utc", "success", "rocket")
+
+    def __init__(self, id: Any, name: Any, launchpad: Any, date_utc: Any, success: Any, rocket: Any):
+        self.id = _intern(id)
+        self.name = name
+        self.launchpad = _intern(launchpad)
+        self.date_utc = date_utc
+        self.success = success
+        self.rocket = _intern(rocket)
+
+
+class RocketRecord(Record):
+    __slots__ = ("id", "name", "active")
+
+    def __init__(self, id: Any, name: Any, active: Any):
+        self.id = _intern(id)
+        self.name = name
+        self.active = active
+
+
+class LaunchpadRecord(Record):
+    __slots__ = ("id", "name", "status", "rockets", "launches")
+
+    def __init__(self, id: Any, name: Any, status: Any, rockets: Any, launches: Any):
+        self.id = _intern(id)
+        self.name = name
+        self.status = _intern(status)
+        self.rockets = _intern(rockets)
+        self.launches = _intern(launches)
+
+
+RECORD_TYPES: Dict[str, Type[Record]] = {
+    "launches": LaunchRecord,
+    "rockets": RocketRecord,
+    "launchpads": LaunchpadRecord,
+}
+
+
+def compact_records(documents: List[Any], record_type: Type[Record]) -> List[Any]:
+    """
+    The documents as records of record_type. Documents whose keys are not
+    exactly the record fields (in order) are kept as they are, so the
+    result always serializes to the same JSON as the input.
+    """
+    fields = record_type.FIELDS
+    return [record_type.from_document(document)
+            if type(document) is dict and tuple(document) == fields else document
+            for document in documents]
+
+
+def json_default(value: Any) -> Any:
+    """
+    ``default`` for json.dumps: records as their documents, anything else
+    unknown as a string.
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
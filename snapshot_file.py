@@ -0,0 +1,268 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows): every process may write
+    fcntl = None
+
+import config as c
+from columns import HAS_NUMPY, LaunchColumns
+from records import RECORD_TYPES, compact_records, json_default
+
+if HAS_NUMPY:
+    import numpy as np
+
+# File layout (little endian):
+#   MAGIC | uint64 header length | header (JSON) | sections, 8-byte aligned
+# The header holds the format, version, fingerprint, revision and write time of the
+# snapshot and the offset (from the first section), length and dtype of
+# each section: "records" (the launches, rockets and launchpads as JSON)
+# and, when the columnar launches exist, one raw array per column.
+#
+# Only the columns are used in place from the mapping, and so kept once in
+# the page cache for every worker; the records section is decoded into
+# Python objects by each worker, which then holds its own copy of them.
+MAGIC = b"SPXSNAP\x00"
+FORMAT = 1
+_HEADER_LENGTH = struct.Struct("<Q")
+_COLUMNS = ("dates", "rocket_codes", "launchpad_codes", "success", "years", "months", "valid")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path: str, data: Dict[str, Any], version: int) -> None:
+    """
+    Write a snapshot to path atomically: the file is written and synced
+    under a temporary name in the same directory and then renamed over
+    path, so readers see either the previous or the new version in full.
+    """
+    records = json.dumps({key: data.get(key, []) for key in ("launches", "rockets", "launchpads")},
+                         separators=(",", ":"), default=json_default).encode()
+    sections = [("records", records, None)]
+    header: Dict[str, Any] = {
+        "format": FORMAT,
+        "version": version,
+        "fingerprint": data.get("fingerprint"),
+        "revision": data.get("revision"),
+        "written": time.time(),
+        "sections": {},
+    }
+
+    columns = data.get("columns")
+    if columns is not None:
+        for name in _COLUMNS:
+            array = getattr(columns, name)
+            sections.append((f"columns.{name}", array.tobytes(), str(array.dtype)))
+        header["column_keys"] = {"rocket": columns.rocket_keys, "launchpad": columns.launchpad_keys}
+
+    offset = 0
+    for name, payload, dtype in sections:
+        header["sections"][name] = {"offset": offset, "length": len(payload), "dtype": dtype}
+        offset = _align(offset + len(payload))
+    header_bytes = json.dumps(header, default=str).encode()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            base = _align(f.tell())
+            for name, payload, _ in sections:
+                f.write(b"\0" * (base + header["sections"][name]["offset"] - f.tell()))
+                f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    logging.info(f"Wrote snapshot version {version} to {path}")
+
+
+def _parse_header(mapped: Any) -> Tuple[Dict[str, Any], int]:
+    """
+    Header of a snapshot file's content and the offset of its first section.
+    """
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a snapshot file")
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    (header_length,) = _HEADER_LENGTH.unpack(mapped[len(MAGIC):start])
+    header = json.loads(mapped[start:start + header_length])
+    if header.get("format") != FORMAT:
+        raise ValueError(f"unsupported format {header.get('format')}")
+    return header, _align(start + header_length)
+
+
+def read_header(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Header of a snapshot file (format, version, fingerprint, written and
+    sections), or None if the file is missing or invalid.
+    """
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(MAGIC) + _HEADER_LENGTH.size)
+            (header_length,) = _HEADER_LENGTH.unpack(prefix[len(MAGIC):])
+            return _parse_header(prefix + f.read(header_length))[0]
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a snapshot written by write_snapshot, or None if the file is
+    missing or invalid. The file is memory-mapped read-only: the launch
+    columns are numpy arrays over the mapping (shared through the page
+    cache by every process reading the same file), while the records are
+    decoded into Python objects private to the calling process.
+
+    Returns the snapshot dict (launches, rockets, launchpads, columns when
+    stored, fingerprint, revision) plus "version" and "written" (epoch
+    seconds).
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:  # ValueError: empty file
+        if not isinstance(e, FileNotFoundError):
+            logging.error(f"Could not map snapshot {path}: {e}")
+        return None
+
+    try:
+        header, base = _parse_header(mapped)
+
+        def section(name: str) -> Tuple[int, int, Optional[str]]:
+            info = header["sections"][name]
+            offset = base + info["offset"]
+            if offset + info["length"] > len(mapped):
+                raise ValueError(f"truncated section {name}")
+            return offset, info["length"], info["dtype"]
+
+        offset, length, _ = section("records")
+        snapshot: Dict[str, Any] = json.loads(mapped[offset:offset + length])
+        if c.COMPACT_RECORDS:
+            for key, record_type in RECORD_TYPES.items():
+                snapshot[key] = compact_records(snapshot.get(key, []), record_type)
+
+        if "column_keys" in header and HAS_NUMPY:
+            arrays = {}
+            for name in _COLUMNS:
+                offset, length, dtype = section(f"columns.{name}")
+                dtype = np.dtype(dtype)
+                arrays[name] = np.frombuffer(mapped, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+            snapshot["columns"] = LaunchColumns.from_arrays(
+                header["column_keys"]["rocket"], header["column_keys"]["launchpad"], **arrays
+            )
+    except (ValueError, KeyError, TypeError) as e:
+        logging.error(f"Invalid snapshot {path}: {e}")
+        return None
+
+    snapshot["fingerprint"] = header.get("fingerprint")
+    snapshot["version"] = header.get("version", 0)
+    snapshot["written"] = header.get("written", 0)
+    snapshot["revision"] = header.get("revision") or int(snapshot["written"] * 1e9)
+    return snapshot
+
+
+class SnapshotFile:
+    """
+    A snapshot file shared by the workers of one host.
+
+    One process, the writer, holds an exclusive lock on ``<path>.lock``
+    (taken with ``try_become_writer`` and kept until the process exits)
+    and publishes new versions with ``write``. The other processes read
+    the published versions with ``load_if_changed``, which only remaps
+    the file when it was replaced. When a download brings nothing new the
+    writer only ``touch``es the file: `revalidated` is the epoch time the
+    loaded version was last confirmed current by the writer.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.revalidated = 0.0
+        self._lock_file = None
+        self._identity: Optional[Tuple[int, int, int]] = None
+        self._loaded: Optional[Tuple[Any, Any]] = None
+
+    def try_become_writer(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        lock_file = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        logging.info(f"Process {os.getpid()} writes the snapshot {self.path}")
+        self._lock_file = lock_file
+        return True
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_file is not None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def write(self, data: Dict[str, Any], version: int) -> None:
+        write_snapshot(self.path, data, version)
+        self._identity = self._stat()
+        self._loaded = (version, data.get("fingerprint"))
+        self.revalidated = time.time()
+
+    def touch(self) -> bool:
+        """
+        Mark the published version as still current, False if there is
+        no published version yet.
+        """
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            return False
+        self._identity = self._stat()
+        self.revalidated = time.time()
+        return True
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        identity = self._stat()
+        snapshot = read_snapshot(self.path)
+        if snapshot is not None:
+            self._identity = identity
+            self._loaded = (snapshot["version"], snapshot["fingerprint"])
+            if identity is not None:
+                snapshot["written"] = max(snapshot["written"], identity[1] / 1e9)
+            self.revalidated = snapshot["written"]
+        return snapshot
+
+    def load_if_changed(self) -> Optional[Dict[str, Any]]:
+        """
+        The snapshot if a new version was published since the last load or
+        write, else None (a touched file is not reloaded, only
+        `revalidated` moves).
+        """
+        identity = self._stat()
+        if identity is None or identity == self._identity:
+            return None
+        header = read_header(self.path)
+        if header is not None and self._loaded == (header.get("version"), header.get("fingerprint")):
+            self._identity = identity
+            self.revalidated = identity[1] / 1e9
+            return None
+        return self.load()
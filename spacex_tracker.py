@@ -1,52 +1,626 @@
-
+import csv
 import datetime
+import itertools
+import json
 import logging
-from typing import List, Dict, Any, Optional, Union
-import copy
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+from typing import List, Dict, Any, Optional, Union, Set, Tuple, Iterator, Callable, TextIO
+
+import config as c
+import metrics
+import parallel
+from cache import LRUCache
+from columns import LaunchColumns, build_launch_columns
+from diff import SnapshotDiff
+from records import Record
+from utils import fetch_data, parse_date, parse_date_lenient
+
+
+def _sort_id(launch: Dict[str, Any]) -> str:
+    """
+    Launch id as used to break ties between launches with the same date.
+    """
+    launch_id = launch.get("id")
+    return "" if launch_id is None else str(launch_id)
+
+
+class _LaunchIndex:
+    """
+    Read-only indexes over a launch list, built once per dataset.
+
+    Launch positions always refer to the position in the original list, so
+    results can be returned in the same order as the source data.
+    """
+    def __init__(self, launches: List[Dict[str, Any]]):
+        dated = []
+        # parsed launch date per position, None when the date is invalid
+        self.launch_dates: List[Optional[datetime.datetime]] = [None] * len(launches)
+        self.by_rocket: Dict[Any, List[int]] = {}
+        self.by_launchpad: Dict[Any, List[int]] = {}
+        self.by_success: Dict[Any, List[int]] = {}
+
+        for pos, launch in enumerate(launches):
+            launch_date = parse_date(launch.get("date_utc", ""))
+            if not launch_date:
+                logging.warning(f"Skiping, launch({launch.get('id')}) - Invalid date format.")
+                continue
+            self.launch_dates[pos] = launch_date
+            dated.append((launch_date, _sort_id(launch), pos))
+            self.by_rocket.setdefault(launch.get("rocket"), []).append(pos)
+            self.by_launchpad.setdefault(launch.get("launchpad"), []).append(pos)
+            self.by_success.setdefault(launch.get("success", False), []).append(pos)
+
+        # positions of all launches with a valid date, in source order
+        self.valid: List[int] = [pos for _, _, pos in dated]
+
+        # launches sorted by (date, id), the keyset order: dates ascending
+        # with the matching launch ids and positions
+        dated.sort()
+        self.dates: List[datetime.datetime] = [date for date, _, _ in dated]
+        self.date_ids: List[str] = [launch_id for _, launch_id, _ in dated]
+        self.date_positions: List[int] = [pos for _, _, pos in dated]
+
+    def date_window(self, start_date: Optional[datetime.datetime], end_date: Optional[datetime.datetime]) -> List[int]:
+        """
+        Positions of launches with start_date <= date <= end_date.
+        """
+        lo = bisect_left(self.dates, start_date) if start_date else 0
+        hi = bisect_right(self.dates, end_date) if end_date else len(self.dates)
+        return self.date_positions[lo:hi]
+
+    def key_position(self, date: datetime.datetime, launch_id: str, after: bool = True) -> int:
+        """
+        Index in the keyset order of the first launch after (or, with
+        after=False, not before) (date, launch_id).
+        """
+        lo = bisect_left(self.dates, date)
+        hi = bisect_right(self.dates, date, lo)
+        if after:
+            return bisect_right(self.date_ids, launch_id, lo, hi)
+        return bisect_left(self.date_ids, launch_id, lo, hi)
+
+    def updated(self,
+                old_launches: List[Dict[str, Any]],
+                launches: List[Dict[str, Any]],
+                changed_positions: List[int],
+                old_length: int) -> "_LaunchIndex":
+        """
+        Index of a new version of the launch list in which the launches at
+        changed_positions were modified and launches from old_length on were
+        appended. Only those launches are (re-)parsed; posting lists are
+        copied on write so this index stays valid for concurrent readers.
+        """
+        index = _LaunchIndex.__new__(_LaunchIndex)
+        index.launch_dates = self.launch_dates[:old_length] + [None] * (len(launches) - old_length)
+        index.by_rocket = dict(self.by_rocket)
+        index.by_launchpad = dict(self.by_launchpad)
+        index.by_success = dict(self.by_success)
+        index.dates = list(self.dates)
+        index.date_ids = list(self.date_ids)
+        index.date_positions = list(self.date_positions)
+        copied: Set[Tuple[str, Any]] = set()
+
+        def posting(name: str, postings: Dict[Any, List[int]], key: Any) -> List[int]:
+            if (name, key) not in copied:
+                copied.add((name, key))
+                postings[key] = list(postings.get(key, []))
+            return postings[key]
+
+        for pos in changed_positions:
+            old_date = self.launch_dates[pos]
+            if old_date is None:
+                continue
+            index.launch_dates[pos] = None
+            old = old_launches[pos]
+            posting("rocket", index.by_rocket, old.get("rocket")).remove(pos)
+            posting("launchpad", index.by_launchpad, old.get("launchpad")).remove(pos)
+            posting("success", index.by_success, old.get("success", False)).remove(pos)
+            i = bisect_left(index.dates, old_date)
+            while index.date_positions[i] != pos:
+                i += 1
+            del index.dates[i]
+            del index.date_ids[i]
+            del index.date_positions[i]
+
+        for pos in list(changed_positions) + list(range(old_length, len(launches))):
+            launch = launches[pos]
+            launch_date = parse_date(launch.get("date_utc", ""))
+            if not launch_date:
+                logging.warning(f"Skiping, launch({launch.get('id')}) - Invalid date format.")
+                continue
+            index.launch_dates[pos] = launch_date
+            insort(posting("rocket", index.by_rocket, launch.get("rocket")), pos)
+            insort(posting("launchpad", index.by_launchpad, launch.get("launchpad")), pos)
+            insort(posting("success", index.by_success, launch.get("success", False)), pos)
+            launch_id = _sort_id(launch)
+            i = index.key_position(launch_date, launch_id)
+            index.dates.insert(i, launch_date)
+            index.date_ids.insert(i, launch_id)
+            index.date_positions.insert(i, pos)
+
+        index.valid = [pos for pos, launch_date in enumerate(index.launch_dates) if launch_date is not None]
+        return index
+
+
+class LaunchView(Mapping):
+    """
+    Read-only view of a launch returned by ``SpaceXData.filter_launches``.
+
+    Item access reads straight through to the stored launch dict (so
+    ``launch["rocket"]`` is still the rocket id), while ``rocket_name`` and
+    ``launchpad_name`` resolve the ids on demand. Nothing is copied until
+    ``to_dict`` is called.
+    """
+    __slots__ = ("_launch", "_data")
+
+    def __init__(self, launch: Dict[str, Any], data: "SpaceXData"):
+        self._launch = launch
+        self._data = data
+
+    def __getitem__(self, key: str) -> Any:
+        return self._launch[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._launch)
+
+    def __len__(self) -> int:
+        return len(self._launch)
+
+    def __repr__(self) -> str:
+        return f"LaunchView({self._launch!r})"
+
+    @property
+    def rocket_name(self) -> Any:
+        return self._data.get_rocket_by_id(self._launch.get("rocket")).get("name", "Unknown")
+
+    @property
+    def launchpad_name(self) -> Any:
+        return self._data.get_launchpad_by_id(self._launch.get("launchpad")).get("name", "Unknown")
+
+    def to_dict(self, resolve_names: bool = True, include_id: bool = True) -> Dict[str, Any]:
+        """
+        Shallow dict of the launch, with rocket/launchpad ids replaced by
+        their names when resolve_names is set. Key order is preserved.
+        """
+        launch = self._launch
+        launch = launch.to_dict() if isinstance(launch, Record) else dict(launch)
+        if resolve_names:
+            if "rocket" in launch:
+                launch["rocket"] = self.rocket_name
+            if "launchpad" in launch:
+                launch["launchpad"] = self.launchpad_name
+        if not include_id:
+            launch.pop("id", None)
+        return launch
+
+
+class LaunchStats:
+    """
+    Launch statistics computed in a single pass over a launch list, or with
+    ``bincount`` over its columnar representation.
+
+    Counts are kept per rocket/launchpad id and grouped by (case-insensitive)
+    name on lookup, matching the semantics of ``filter_launches``. Like the
+    filter, rocket and site counts skip launches with an invalid date.
+    """
+    def __init__(self,
+                 rocket_totals: Dict[Any, int],
+                 rocket_successes: Dict[Any, int],
+                 site_totals: Dict[Any, int],
+                 frequency: Dict[str, Dict[str, int]]):
+        self.rocket_totals = rocket_totals
+        self.rocket_successes = rocket_successes
+        self.site_totals = site_totals
+        self.frequency = frequency
+
+    def _add(self, launch: Dict[str, Any], launch_date: Optional[datetime.datetime], sign: int = 1) -> None:
+        """
+        Add (or with sign=-1 remove) the contribution of one launch. The date
+        is the one parsed by the launch index, None when it was invalid.
+        """
+        if launch_date is not None:
+            rocket = launch.get("rocket")
+            self.rocket_totals[rocket] = self.rocket_totals.get(rocket, 0) + sign
+            if launch.get("success", False):
+                self.rocket_successes[rocket] = self.rocket_successes.get(rocket, 0) + sign
+            launchpad = launch.get("launchpad")
+            self.site_totals[launchpad] = self.site_totals.get(launchpad, 0) + sign
+        else:
+            # launch_frequency is more lenient than parse_date (e.g. utc offsets)
+            date_str: str = launch.get("date_utc", "")
+            if not date_str:
+                return
+            launch_date = parse_date_lenient(date_str)
+            if launch_date is None:
+                logging.warning(f"Skiping, launch({launch.get('id')}) - Invalid date format: {date_str}")
+                return
+
+        monthly = self.frequency["monthly"]
+        yearly = self.frequency["yearly"]
+        month = f"{launch_date.month:02d}"
+        year = f"{launch_date.year:04d}"
+        monthly[month] = monthly.get(month, 0) + sign
+        yearly[year] = yearly.get(year, 0) + sign
+
+    @classmethod
+    def from_launches(cls, launches: List[Dict[str, Any]], index: _LaunchIndex) -> "LaunchStats":
+        stats = cls({}, {}, {}, {"monthly": {}, "yearly": {}})
+        for launch, launch_date in zip(launches, index.launch_dates):
+            stats._add(launch, launch_date)
+        return stats
+
+    def updated(self,
+                removed: List[Tuple[Dict[str, Any], Optional[datetime.datetime]]],
+                added: List[Tuple[Dict[str, Any], Optional[datetime.datetime]]]) -> "LaunchStats":
+        """
+        Copy of these statistics with the given (launch, date) contributions
+        removed and added.
+        """
+        stats = LaunchStats(dict(self.rocket_totals), dict(self.rocket_successes), dict(self.site_totals),
+                            {period: dict(freq) for period, freq in self.frequency.items()})
+        for launch, launch_date in removed:
+            stats._add(launch, launch_date, sign=-1)
+        for launch, launch_date in added:
+            stats._add(launch, launch_date)
+        # drop buckets that dropped to zero, like a fresh count would
+        for counts in (stats.rocket_totals, stats.rocket_successes, stats.site_totals, *stats.frequency.values()):
+            for key in [key for key, count in counts.items() if count == 0]:
+                del counts[key]
+        return stats
+
+    @classmethod
+    def from_columns(cls, columns: LaunchColumns) -> "LaunchStats":
+        return cls(columns.rocket_totals(), columns.rocket_successes(), columns.site_totals(), columns.frequency())
+
+    @staticmethod
+    def _count_by_name(names: Set[str],
+                       counts: Dict[Any, int],
+                       records_by_id: Dict[Any, Dict[str, Any]]) -> int:
+        if not names:
+            # no name given means no filter, same as filter_launches
+            return sum(counts.values())
+        total = 0
+        for record_id, count in counts.items():
+            record = records_by_id.get(record_id)
+            name = record.get("name", "") if record is not None else ""
+            if name.strip().lower() in names:
+                total += count
+        return total
+
+    def success_rate_by_rocket(self, rocket_names: Set[str], rockets_by_id: Dict[Any, Dict[str, Any]]) -> Optional[float]:
+        total_launches = self._count_by_name(rocket_names, self.rocket_totals, rockets_by_id)
+        if total_launches == 0:
+            return None
+        successful_launches = self._count_by_name(rocket_names, self.rocket_successes, rockets_by_id)
+        return successful_launches / total_launches * 100
+
+    def launches_by_site(self, site_names: Set[str], launchpads_by_id: Dict[Any, Dict[str, Any]]) -> int:
+        return self._count_by_name(site_names, self.site_totals, launchpads_by_id)
+
+
+# Dimensions SpaceXData.group_launches can group by
+GROUP_BY_DIMENSIONS = ("rocket", "site", "year", "month", "quarter", "week", "success")
+
+# A cube cell: (UTC day ordinal, rocket id, launchpad id, success value)
+_Cell = Tuple[int, Any, Any, Any]
+
+
+class _StatsCube:
+    """
+    Launch counts pre-aggregated at the finest grain any group-by or filter
+    of ``SpaceXData.group_launches`` needs: one cell per (UTC day, rocket,
+    launchpad, success) with the number of launches in it, ordered by day.
+
+    An aggregation sums the cells of the days entirely inside the date
+    range and only looks at single launches on the (at most two) days the
+    range cuts through, so its cost depends on the number of cells rather
+    than on the number of launches.
+    """
+    def __init__(self, launches: List[Dict[str, Any]], index: _LaunchIndex):
+        cells: Dict[_Cell, int] = {}
+        for launch_date, pos in zip(index.dates, index.date_positions):
+            launch = launches[pos]
+            cell = (launch_date.toordinal(), launch.get("rocket"), launch.get("launchpad"), launch.get("success", False))
+            cells[cell] = cells.get(cell, 0) + 1
+        # cells are first seen in date order
+        self.cells: List[Tuple[_Cell, int]] = list(cells.items())
+        self.days: List[int] = [cell[0] for cell, _ in self.cells]
+        self._calendars: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def calendar(self, day: int) -> Tuple[int, int, int, int]:
+        """
+        (year, month, quarter, ISO week) of a day ordinal, memoized.
+        """
+        fields = self._calendars.get(day)
+        if fields is None:
+            date = datetime.date.fromordinal(day)
+            fields = self._calendars[day] = (date.year, date.month, (date.month - 1) // 3 + 1, date.isocalendar()[1])
+        return fields
+
+    @staticmethod
+    def _day_bounds(day: int) -> Tuple[datetime.datetime, datetime.datetime]:
+        date = datetime.date.fromordinal(day)
+        return (datetime.datetime.combine(date, datetime.time.min, tzinfo=datetime.timezone.utc),
+                datetime.datetime.combine(date, datetime.time.max, tzinfo=datetime.timezone.utc))
+
+    def cells_between(self,
+                      launches: List[Dict[str, Any]],
+                      index: _LaunchIndex,
+                      start_date: Optional[datetime.datetime],
+                      end_date: Optional[datetime.datetime]) -> Iterator[Tuple[_Cell, int]]:
+        """
+        (cell, count) pairs covering exactly the launches with
+        start_date <= date <= end_date (UTC dates, None for no bound).
+        """
+        first_day, last_day, partial_days = None, None, []
+        if start_date:
+            first_day = start_date.toordinal()
+            if start_date.time() != datetime.time.min:
+                partial_days.append(first_day)
+                first_day += 1
+        if end_date:
+            last_day = end_date.toordinal()
+            if end_date.time() != datetime.time.max:
+                partial_days.append(last_day)
+                last_day -= 1
+
+        lo = bisect_left(self.days, first_day) if first_day is not None else 0
+        hi = bisect_right(self.days, last_day) if last_day is not None else len(self.days)
+        yield from itertools.islice(self.cells, lo, hi)
+
+        for day in sorted(set(partial_days)):
+            day_start, day_end = self._day_bounds(day)
+            lo = bisect_left(index.dates, max(start_date, day_start) if start_date else day_start)
+            hi = bisect_right(index.dates, min(end_date, day_end) if end_date else day_end)
+            for pos in index.date_positions[lo:hi]:
+                launch = launches[pos]
+                yield (day, launch.get("rocket"), launch.get("launchpad"), launch.get("success", False)), 1
+
+
+# Filter results shared by all SpaceXData instances, keyed on the instance
+# generation (bumped whenever its data is reassigned) and the normalized query
+_GENERATIONS = itertools.count()
+_QUERY_CACHE = LRUCache(
+    max_entries=c.QUERY_CACHE_SIZE,
+    max_bytes=c.QUERY_CACHE_MAX_BYTES,
+    ttl=c.QUERY_CACHE_TTL,
+    # rough footprint of a tuple of LaunchView (or of a count)
+    sizeof=lambda cached: 64 + 72 * len(cached) if isinstance(cached, tuple) else 64,
+)
+
+_SNAPSHOT_CACHE: Optional[Tuple[Dict[str, Any], "SpaceXData"]] = None
 
-from utils import fetch_data, parse_date
 
 class SpaceXData:
     """
     Class to load and store SpaceX API data.
+
+    Lookups by id and launch filtering are served from indexes that are built
+    lazily on first use and dropped whenever ``launches``, ``rockets`` or
+    ``launchpads`` is reassigned. The lists must not be mutated in place once
+    an index has been built.
+
+    When ``columns`` is given (``utils.fetch_data`` builds them at ingestion
+    when numpy is installed), filtering and statistics run as vectorized
+    masks over the columnar representation instead. Set ``columnar`` to build
+    the columns lazily for data constructed by hand.
+
+    Records may be dicts or any read-only Mapping, such as the compact
+    ``records.Record`` objects ``utils.fetch_data`` ingests.
     """
-    def __init__(self, launches: List[Dict[str, Any]], rockets: List[Dict[str, Any]], launchpads: List[Dict[str, Any]]):
-        self.launches= launches
-        self.rockets= rockets
-        self.launchpads= launchpads
+    def __init__(self,
+                 launches: List[Dict[str, Any]],
+                 rockets: List[Dict[str, Any]],
+                 launchpads: List[Dict[str, Any]],
+                 columns: Optional[LaunchColumns] = None):
+        self.columnar = columns is not None
+        self.launches = launches
+        self.rockets = rockets
+        self.launchpads = launchpads
+        self._columns = columns
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "SpaceXData":
+        """
+        Return a SpaceXData for the snapshot returned by ``fetch_data``.
+
+        The instance (and therefore its indexes) is reused for as long as
+        ``fetch_data`` keeps returning the same snapshot object, and updated
+        incrementally from the snapshot's diff when it moves to the next one.
+        """
+        global _SNAPSHOT_CACHE
+        cached = _SNAPSHOT_CACHE
+        if cached is not None and cached[0] is data:
+            return cached[1]
+
+        diff = data.get("diff")
+        with metrics.timed("build"):
+            if cached is not None and diff is not None and cached[0].get("version") == diff.base_version:
+                # next version of the cached snapshot, carry its indexes over
+                spacex_data = cached[1].updated(data, diff)
+            else:
+                spacex_data = cls(data.get("launches", []), data.get("rockets", []), data.get("launchpads", []),
+                                  columns=data.get("columns"))
+        _SNAPSHOT_CACHE = (data, spacex_data)
+        # results of the previous snapshot can no longer be hit
+        _QUERY_CACHE.clear()
+        return spacex_data
+
+    @staticmethod
+    def query_cache_info() -> Dict[str, int]:
+        """
+        Hit/miss/eviction counters and usage of the filter result cache.
+        """
+        return _QUERY_CACHE.info()
+
+    def updated(self, data: Dict[str, Any], diff: SnapshotDiff) -> "SpaceXData":
+        """
+        SpaceXData for the snapshot following this one. Indexes and
+        statistics already built here are reused for unchanged collections
+        and updated with the diff instead of rebuilt when the launches
+        changed in place; anything else is rebuilt lazily as usual.
+        """
+        launches = data.get("launches", [])
+        columns = data.get("columns")
+        spacex_data = SpaceXData(launches, data.get("rockets", []), data.get("launchpads", []), columns=columns)
+        spacex_data.columnar = self.columnar or columns is not None
+
+        if spacex_data.rockets is self._rockets:
+            spacex_data._rockets_by_id = self._rockets_by_id
+        if spacex_data.launchpads is self._launchpads:
+            spacex_data._launchpads_by_id = self._launchpads_by_id
+
+        index = self._launch_index
+        if launches is self._launches:
+            spacex_data._launch_index = index
+            spacex_data._cube = self._cube
+            if columns is self._columns:
+                spacex_data._stats = self._stats
+        elif index is not None and diff.launches.in_place:
+            changes = diff.launches
+            new_index = index.updated(self._launches, launches, changes.changed_positions, changes.old_length)
+            spacex_data._launch_index = new_index
+            if self._stats is not None and columns is None:
+                spacex_data._stats = self._stats.updated(
+                    [(self._launches[pos], index.launch_dates[pos]) for pos in changes.changed_positions],
+                    [(launches[pos], new_index.launch_dates[pos])
+                     for pos in list(changes.changed_positions) + list(range(changes.old_length, len(launches)))]
+                )
+        return spacex_data
+
+    @property
+    def launches(self) -> List[Dict[str, Any]]:
+        return self._launches
+
+    @launches.setter
+    def launches(self, launches: List[Dict[str, Any]]) -> None:
+        self._launches = launches
+        self._generation = next(_GENERATIONS)
+        self._launch_index: Optional[_LaunchIndex] = None
+        self._columns: Optional[LaunchColumns] = None
+        self._stats: Optional[LaunchStats] = None
+        self._cube: Optional[_StatsCube] = None
+
+    @property
+    def rockets(self) -> List[Dict[str, Any]]:
+        return self._rockets
+
+    @rockets.setter
+    def rockets(self, rockets: List[Dict[str, Any]]) -> None:
+        self._rockets = rockets
+        self._generation = next(_GENERATIONS)
+        self._rockets_by_id: Optional[Dict[Any, Dict[str, Any]]] = None
+
+    @property
+    def launchpads(self) -> List[Dict[str, Any]]:
+        return self._launchpads
+
+    @launchpads.setter
+    def launchpads(self, launchpads: List[Dict[str, Any]]) -> None:
+        self._launchpads = launchpads
+        self._generation = next(_GENERATIONS)
+        self._launchpads_by_id: Optional[Dict[Any, Dict[str, Any]]] = None
+
+    @staticmethod
+    def _index_by_id(records: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        index: Dict[Any, Dict[str, Any]] = {}
+        for record in records:
+            # first record wins, same as a linear scan
+            index.setdefault(record.get("id"), record)
+        return index
+
+    def _get_launch_index(self) -> _LaunchIndex:
+        index = self._launch_index
+        if index is None:
+            with metrics.timed("index"):
+                index = self._launch_index = _LaunchIndex(self._launches)
+        return index
+
+    def _get_cube(self) -> _StatsCube:
+        cube = self._cube
+        if cube is None:
+            cube = self._cube = _StatsCube(self._launches, self._get_launch_index())
+        return cube
+
+    def _get_columns(self) -> Optional[LaunchColumns]:
+        columns = self._columns
+        if columns is None and self.columnar:
+            columns = self._columns = build_launch_columns(self._launches)
+        return columns
+
+    def stats(self) -> LaunchStats:
+        """
+        Per-rocket, per-site and monthly/yearly launch counts, computed in one
+        pass and memoized until ``launches`` is reassigned.
+        """
+        stats = self._stats
+        if stats is None:
+            columns = self._get_columns()
+            executor = parallel.get_executor()
+            if columns is not None and executor is not None:
+                stats = LaunchStats(*executor.stats(columns))
+            elif columns is not None:
+                stats = LaunchStats.from_columns(columns)
+            else:
+                stats = LaunchStats.from_launches(self._launches, self._get_launch_index())
+            self._stats = stats
+        return stats
+
+    def _get_rockets_by_id(self) -> Dict[Any, Dict[str, Any]]:
+        index = self._rockets_by_id
+        if index is None:
+            index = self._rockets_by_id = self._index_by_id(self._rockets)
+        return index
+
+    def _get_launchpads_by_id(self) -> Dict[Any, Dict[str, Any]]:
+        index = self._launchpads_by_id
+        if index is None:
+            index = self._launchpads_by_id = self._index_by_id(self._launchpads)
+        return index
 
     def get_rocket_by_id(self, rocket_id: str) -> Dict[str, Any]:
         """
         Get rocket details by ID.
         """
-        for rocket in self.rockets:
-            if rocket.get("id") == rocket_id:
-                return rocket
-        return {}
+        rocket = self._get_rockets_by_id().get(rocket_id)
+        return rocket if rocket is not None else {}
 
     def get_launchpad_by_id(self, launchpad_id: str) -> Dict[str, Any]:
         """
         Get launchpad details by ID.
         """
-        for launchpad in self.launchpads:
-            if launchpad.get("id") == launchpad_id:
-                return launchpad
-        return {}
+        launchpad = self._get_launchpads_by_id().get(launchpad_id)
+        return launchpad if launchpad is not None else {}
+
+    @staticmethod
+    def _positions_by_name(names: Set[str],
+                           records_by_id: Dict[Any, Dict[str, Any]],
+                           postings: Dict[Any, List[int]]) -> Set[int]:
+        """
+        Union of the posting lists of every record whose name is in names.
+        """
+        positions: Set[int] = set()
+        for record_id, posting in postings.items():
+            record = records_by_id.get(record_id)
+            name = record.get("name", "") if record is not None else ""
+            if name.strip().lower() in names:
+                positions.update(posting)
+        return positions
     
-    def filter_launches(self, 
-                       start_date: Optional[datetime.datetime] = None, 
-                       end_date: Optional[datetime.datetime] = None, 
-                       rocket_name: Optional[Union[str, List[str]]] = None, 
-                       success: Optional[bool] = None, 
-                       launch_site: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def normalize_filters(start_date: Optional[datetime.datetime] = None,
+                          end_date: Optional[datetime.datetime] = None,
+                          rocket_name: Optional[Union[str, List[str]]] = None,
+                          success: Optional[bool] = None,
+                          launch_site: Optional[Union[str, List[str]]] = None) -> Tuple[Any, ...]:
         """
-        Filter launches based on:
-          - Date range (date must be in utc format)
-          - Rocket name(s)
-          - Launch success/failure
-          - Launch site name(s)
+        Canonical form of the filter_launches arguments: dates in UTC (naive
+        dates are assumed to be UTC, a reversed range is swapped) and name
+        lists lower-cased, stripped, deduplicated and sorted. Two calls with
+        the same canonical form return the same launches.
         """
-
         if start_date and start_date.tzinfo is None:
             logging.warning("Assuming start_date is in UTC timezone")
             start_date = start_date.replace(tzinfo=datetime.timezone.utc)
@@ -61,95 +635,346 @@ class SpaceXData:
 
         if isinstance(rocket_name, str):
             rocket_name = [rocket_name]
-        
-        if rocket_name:
-            rocket_name = [name.lower().strip() for name in rocket_name]
+
+        rocket_names = tuple(sorted({name.lower().strip() for name in rocket_name})) if rocket_name else None
 
         if isinstance(launch_site, str):
             launch_site = [launch_site]
 
-        if launch_site:
-            launch_site = [name.lower().strip() for name in launch_site]
+        site_names = tuple(sorted({name.lower().strip() for name in launch_site})) if launch_site else None
 
+        return (
+            start_date.astimezone(datetime.timezone.utc) if start_date else None,
+            end_date.astimezone(datetime.timezone.utc) if end_date else None,
+            rocket_names,
+            success,
+            site_names,
+        )
 
-        filtered = []
-        for launch in self.launches:
+    def filter_launches(self, 
+                       start_date: Optional[datetime.datetime] = None, 
+                       end_date: Optional[datetime.datetime] = None, 
+                       rocket_name: Optional[Union[str, List[str]]] = None, 
+                       success: Optional[bool] = None, 
+                       launch_site: Optional[Union[str, List[str]]] = None) -> List[LaunchView]:
+        """
+        Filter launches based on:
+          - Date range (date must be in utc format)
+          - Rocket name(s)
+          - Launch success/failure
+          - Launch site name(s)
 
-            # Parse date
-            launch_date = parse_date(launch.get("date_utc", "")) 
-            if not launch_date:
-                logging.warning(f"Skiping, launch({launch.get('id')}) - Invalid date format.")
+        Matches are returned as read-only ``LaunchView`` rows in source order.
+        """
+
+        query = self.normalize_filters(start_date, end_date, rocket_name, success, launch_site)
+        start_date, end_date, rocket_names, success, site_names = query
+
+        # cache key: the canonical query, tied to this version of the data
+        key = (self._generation, *query)
+        with metrics.timed("filter"):
+            filtered = _QUERY_CACHE.get_or_set(
+                key, lambda: self._filter(start_date, end_date, rocket_names, success, site_names)
+            )
+            return list(filtered)
+
+    def _filter_mask(self,
+                     columns: LaunchColumns,
+                     start_date: Optional[datetime.datetime],
+                     end_date: Optional[datetime.datetime],
+                     rocket_names: Optional[Tuple[str, ...]],
+                     success: Optional[bool],
+                     site_names: Optional[Tuple[str, ...]]) -> Any:
+        """
+        Column mask of the launches matching the normalized filters, computed
+        by the parallel executor when PARALLEL_WORKERS is set.
+        """
+        filters = dict(
+            start_date=start_date,
+            end_date=end_date,
+            rocket_names=set(rocket_names) if rocket_names else None,
+            rockets_by_id=self._get_rockets_by_id(),
+            success=success,
+            site_names=set(site_names) if site_names else None,
+            launchpads_by_id=self._get_launchpads_by_id()
+        )
+        executor = parallel.get_executor()
+        if executor is not None:
+            return executor.filter_mask(columns, **filters)
+        return columns.filter_mask(**filters)
+
+    def _filter(self,
+                start_date: Optional[datetime.datetime],
+                end_date: Optional[datetime.datetime],
+                rocket_names: Optional[Tuple[str, ...]],
+                success: Optional[bool],
+                site_names: Optional[Tuple[str, ...]]) -> Tuple[LaunchView, ...]:
+        """
+        Uncached filter_launches, with normalized arguments.
+        """
+        columns = self._get_columns()
+        if columns is not None:
+            mask = self._filter_mask(columns, start_date, end_date, rocket_names, success, site_names)
+            positions = mask.nonzero()[0].tolist()
+        else:
+            positions = self._filter_positions(start_date, end_date, rocket_names, success, site_names)
+
+        launches = self._launches
+        return tuple(LaunchView(launches[pos], self) for pos in positions)
+
+    def _filter_positions(self,
+                          start_date: Optional[datetime.datetime],
+                          end_date: Optional[datetime.datetime],
+                          rocket_names: Optional[Tuple[str, ...]],
+                          success: Optional[bool],
+                          site_names: Optional[Tuple[str, ...]]) -> List[int]:
+        index = self._get_launch_index()
+
+        # Each active filter contributes the set of matching launch positions
+        candidates: List[Any] = []
+        if start_date or end_date:
+            candidates.append(index.date_window(start_date, end_date))
+        if success is not None:
+            candidates.append(index.by_success.get(success, []))
+        if rocket_names:
+            candidates.append(self._positions_by_name(set(rocket_names), self._get_rockets_by_id(), index.by_rocket))
+        if site_names:
+            candidates.append(self._positions_by_name(set(site_names), self._get_launchpads_by_id(), index.by_launchpad))
+
+        if not candidates:
+            return index.valid
+
+        # intersect starting from the most selective filter
+        candidates.sort(key=len)
+        matched = set(candidates[0])
+        for other in candidates[1:]:
+            if not matched:
+                break
+            matched.intersection_update(other)
+        return sorted(matched)
+    
+    @staticmethod
+    def launch_key(launch: Mapping) -> Optional[Tuple[datetime.datetime, str]]:
+        """
+        Keyset (cursor) key of a launch: its parsed date and id, or None if
+        the launch has no valid date.
+        """
+        launch_date = parse_date(launch.get("date_utc", ""))
+        if launch_date is None:
+            return None
+        return launch_date, _sort_id(launch)
+
+    def iter_launches(self,
+                      start_date: Optional[datetime.datetime] = None,
+                      end_date: Optional[datetime.datetime] = None,
+                      rocket_name: Optional[Union[str, List[str]]] = None,
+                      success: Optional[bool] = None,
+                      launch_site: Optional[Union[str, List[str]]] = None,
+                      after: Optional[Tuple[datetime.datetime, str]] = None,
+                      before: Optional[Tuple[datetime.datetime, str]] = None,
+                      descending: bool = False) -> Iterator[LaunchView]:
+        """
+        Lazily yield the launches matching the filter_launches arguments
+        ordered by (date, id), only those after the ``launch_key`` ``after``
+        and before the ``launch_key`` ``before``. With descending set the
+        order is reversed, i.e. the walk starts from ``before``.
+
+        Walks the sorted index from the cursor without materializing the
+        result, so taking n rows costs O(log N + n / selectivity).
+        """
+        start_date, end_date, rocket_names, success, site_names = self.normalize_filters(
+            start_date, end_date, rocket_name, success, launch_site
+        )
+        index = self._get_launch_index()
+        launches = self._launches
+
+        lo = bisect_left(index.dates, start_date) if start_date else 0
+        hi = bisect_right(index.dates, end_date) if end_date else len(index.dates)
+        if after is not None:
+            lo = max(lo, index.key_position(*self._utc_key(after)))
+        if before is not None:
+            hi = min(hi, index.key_position(*self._utc_key(before), after=False))
+        positions = index.date_positions[lo:hi] if descending else itertools.islice(index.date_positions, lo, hi)
+        if descending:
+            positions = reversed(positions)
+
+        rocket_match = self._name_matcher(rocket_names, self._get_rockets_by_id())
+        site_match = self._name_matcher(site_names, self._get_launchpads_by_id())
+        for pos in positions:
+            launch = launches[pos]
+            if success is not None and launch.get("success", False) != success:
                 continue
-            
-            # Filter by date range
-            if start_date and launch_date < start_date:
+            if rocket_match and not rocket_match(launch.get("rocket")):
                 continue
-            if end_date and launch_date > end_date:
+            if site_match and not site_match(launch.get("launchpad")):
                 continue
+            yield LaunchView(launch, self)
 
-            # Filter by success/failure
-            if success is not None and launch.get("success", False) != success:
+    @staticmethod
+    def _utc_key(key: Tuple[datetime.datetime, str]) -> Tuple[datetime.datetime, str]:
+        launch_date, launch_id = key
+        if launch_date.tzinfo is None:
+            launch_date = launch_date.replace(tzinfo=datetime.timezone.utc)
+        return launch_date, launch_id
+
+    def count_launches(self,
+                       start_date: Optional[datetime.datetime] = None,
+                       end_date: Optional[datetime.datetime] = None,
+                       rocket_name: Optional[Union[str, List[str]]] = None,
+                       success: Optional[bool] = None,
+                       launch_site: Optional[Union[str, List[str]]] = None) -> int:
+        """
+        Number of launches filter_launches would return, computed from the
+        indexes without building the result rows.
+        """
+        query = self.normalize_filters(start_date, end_date, rocket_name, success, launch_site)
+        return _QUERY_CACHE.get_or_set((self._generation, "count", *query), lambda: self._count(*query))
+
+    def _count(self,
+               start_date: Optional[datetime.datetime],
+               end_date: Optional[datetime.datetime],
+               rocket_names: Optional[Tuple[str, ...]],
+               success: Optional[bool],
+               site_names: Optional[Tuple[str, ...]]) -> int:
+        columns = self._get_columns()
+        if columns is not None:
+            return int(self._filter_mask(columns, start_date, end_date, rocket_names, success, site_names).sum())
+
+        index = self._get_launch_index()
+        if not (rocket_names or site_names or success is not None):
+            # a date window (or everything): two bisections
+            lo = bisect_left(index.dates, start_date) if start_date else 0
+            hi = bisect_right(index.dates, end_date) if end_date else len(index.dates)
+            return hi - lo
+        if not (start_date or end_date or rocket_names or site_names):
+            return len(index.by_success.get(success, []))
+        return len(self._filter_positions(start_date, end_date, rocket_names, success, site_names))
+
+    def group_launches(self,
+                       group_by: Union[str, List[str]] = (),
+                       start_date: Optional[datetime.datetime] = None,
+                       end_date: Optional[datetime.datetime] = None,
+                       rocket_name: Optional[Union[str, List[str]]] = None,
+                       success: Optional[bool] = None,
+                       launch_site: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Launch counts of the launches filter_launches would return, grouped
+        by any of GROUP_BY_DIMENSIONS: rocket and site (by name), year,
+        month, quarter, week (ISO week number, dates in UTC) and success.
+
+        Returns one row per group, sorted by group: the dimension values
+        plus "launches", "successes" and "success_rate" (in percent). No
+        group_by gives a single row with the totals. Computed in one pass
+        over the pre-aggregated cube and cached like filter_launches.
+        """
+        dimensions = tuple(dict.fromkeys([group_by] if isinstance(group_by, str) else group_by))
+        for dimension in dimensions:
+            if dimension not in GROUP_BY_DIMENSIONS:
+                raise ValueError(f"Unknown group_by dimension: {dimension}")
+
+        query = self.normalize_filters(start_date, end_date, rocket_name, success, launch_site)
+        rows = _QUERY_CACHE.get_or_set((self._generation, "group", dimensions, *query),
+                                       lambda: self._group(dimensions, *query))
+        return [dict(row) for row in rows]
+
+    def _group(self,
+               dimensions: Tuple[str, ...],
+               start_date: Optional[datetime.datetime],
+               end_date: Optional[datetime.datetime],
+               rocket_names: Optional[Tuple[str, ...]],
+               success: Optional[bool],
+               site_names: Optional[Tuple[str, ...]]) -> Tuple[Dict[str, Any], ...]:
+        """
+        Uncached group_launches, with normalized arguments.
+        """
+        cube = self._get_cube()
+        rocket_match = self._name_matcher(rocket_names, self._get_rockets_by_id())
+        site_match = self._name_matcher(site_names, self._get_launchpads_by_id())
+        rocket_name = lambda rocket: self.get_rocket_by_id(rocket).get("name", "Unknown")
+        site_name = lambda launchpad: self.get_launchpad_by_id(launchpad).get("name", "Unknown")
+        extractors: Dict[str, Callable[[_Cell], Any]] = {
+            "rocket": lambda cell: rocket_name(cell[1]),
+            "site": lambda cell: site_name(cell[2]),
+            "year": lambda cell: cube.calendar(cell[0])[0],
+            "month": lambda cell: cube.calendar(cell[0])[1],
+            "quarter": lambda cell: cube.calendar(cell[0])[2],
+            "week": lambda cell: cube.calendar(cell[0])[3],
+            "success": lambda cell: cell[3],
+        }
+        key_of = [extractors[dimension] for dimension in dimensions]
+
+        groups: Dict[Tuple[Any, ...], List[int]] = {}
+        for cell, count in cube.cells_between(self._launches, self._get_launch_index(), start_date, end_date):
+            if success is not None and cell[3] != success:
                 continue
-            
-            # Filter by rocket name
-            if rocket_name:
-                rocket = self.get_rocket_by_id(launch.get("rocket")).get("name", "").strip().lower()
-                if rocket not in rocket_name:
-                    continue
-            
-            # Filter by launch site
-            if launch_site:
-                launchpad = self.get_launchpad_by_id(launch.get("launchpad")).get("name", "").strip().lower()
-                if launchpad not in launch_site:
-                    continue
-
-            filtered.append(copy.deepcopy(launch))
-        return filtered
-    
-    def success_rate_by_rocket(self, rocket_name: str) -> Optional[float]:
+            if rocket_match and not rocket_match(cell[1]):
+                continue
+            if site_match and not site_match(cell[2]):
+                continue
+            key = tuple(extract(cell) for extract in key_of)
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = [0, 0]
+            totals[0] += count
+            if cell[3]:
+                totals[1] += count
+
+        if not dimensions and not groups:
+            groups[()] = [0, 0]
+        rows = []
+        # None (unknown success, a missing name) sorts last
+        for key in sorted(groups, key=lambda key: tuple((value is None, value) for value in key)):
+            launches, successes = groups[key]
+            row: Dict[str, Any] = dict(zip(dimensions, key))
+            row["launches"] = launches
+            row["successes"] = successes
+            row["success_rate"] = successes / launches * 100 if launches else None
+            rows.append(row)
+        return tuple(rows)
+
+    @staticmethod
+    def _name_matcher(names: Optional[Tuple[str, ...]], records_by_id: Dict[Any, Dict[str, Any]]) -> Optional[Callable[[Any], bool]]:
         """
-        Calculate the success rate (in percentage) for a specific rocket.
+        Predicate telling whether a record id has one of the (normalized)
+        names, memoized per id; None when there is no name filter.
         """
-        filtered = self.filter_launches(rocket_name=rocket_name)
-        total_launches = len(filtered)
-        if total_launches == 0:
+        if not names:
             return None
-        successful_launches = sum([1 for launch in filtered if launch.get("success", False)])
-        return successful_launches / total_launches * 100
+        wanted = set(names)
+        matches: Dict[Any, bool] = {}
+
+        def match(record_id: Any) -> bool:
+            matched = matches.get(record_id)
+            if matched is None:
+                record = records_by_id.get(record_id)
+                name = record.get("name", "") if record is not None else ""
+                matched = matches[record_id] = name.strip().lower() in wanted
+            return matched
+        return match
+
+    @staticmethod
+    def _normalize_names(names: Union[str, List[str]]) -> Set[str]:
+        if isinstance(names, str):
+            names = [names]
+        return {name.lower().strip() for name in names}
+
+    def success_rate_by_rocket(self, rocket_name: Union[str, List[str]]) -> Optional[float]:
+        """
+        Calculate the success rate (in percentage) for a specific rocket.
+        """
+        return self.stats().success_rate_by_rocket(self._normalize_names(rocket_name), self._get_rockets_by_id())
     
-    def launches_by_site(self, launch_site: str) -> Optional[int]:
+    def launches_by_site(self, launch_site: Union[str, List[str]]) -> Optional[int]:
         """
         Count total launches per launch site.
         """
-        filtered = self.filter_launches(launch_site=launch_site)
-        return len(filtered)
+        return self.stats().launches_by_site(self._normalize_names(launch_site), self._get_launchpads_by_id())
     
     def launch_frequency(self, period: str = "monthly") -> Dict[str, int]:
         """
         Calculate launch frequency grouped by month or year.
         """
-
-        freq: Dict[str, int] = {}
-        for launch in self.launches:
-            # Parse date
-            date_str: str = launch.get("date_utc", "")
-            if not date_str:
-                continue
-            try:
-                launch_date = datetime.datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-            except (ValueError, TypeError) as e:
-                logging.warning(f"Skiping, launch({launch.get('id')}) - Invalid date format: {date_str} ({e})")
-                continue
-
-            if period == "monthly":
-                key = launch_date.strftime("%m")
-            elif period == "yearly":
-                key = launch_date.strftime("%Y")
-            else:
-                continue
-        
-            freq[key] = freq.get(key, 0) + 1
-        return freq
+        return dict(self.stats().frequency.get(period, {}))
 
     def get_rockets(self, by_name: bool = False) -> List[str]:
         if by_name:
@@ -161,38 +986,133 @@ class SpaceXData:
             return [launchpad.get("name", "") for launchpad in self.launchpads]
         return [launchpad.get("id", "") for launchpad in self.launchpads]
 
-def main():
-    import argparse
-    parser = argparse.ArgumentParser(description="SpaceX Launch Tracker")
-    parser.add_argument("--start-date", type=str, help="Start date in YYYY-MM-DD")
-    parser.add_argument("--end-date", type=str, help="End date in YYYY-MM-DD")
-    parser.add_argument("--rocket", type=str, help="Rocket name to filter")
-    parser.add_argument("--success", type=str, choices=["true", "false"], help="Filter by launch success (true/false)")
-    parser.add_argument("--site", type=str, help="Launch site name to filter")
-    args = parser.parse_args()
+# Keys of a --queries filter spec, and the filter_launches argument each maps to
+_QUERY_KEYS = {"start_date": "start_date", "end_date": "end_date", "rocket": "rocket_name",
+               "success": "success", "site": "launch_site"}
+_CSV_FIELDS = ("query", "id", "name", "date_utc", "rocket", "launchpad", "success")
 
-    # Load SpaceX data
-    data, _ = fetch_data()
-    spacex_data = SpaceXData(**data)
-
-    # Get the full list of launches
-    launches = spacex_data.launches
-
-    # Parse optional filter criteria
-    start_date = datetime.datetime.fromisoformat(args.start_date) if args.start_date else None
-    end_date = datetime.datetime.fromisoformat(args.end_date) if args.end_date else None
-    success_filter: Optional[bool] = None
-    if args.success:
-        success_filter = True if args.success.lower() == "true" else False
-
-    filtered_launches = spacex_data.filter_launches(
-        start_date=start_date,
-        end_date=end_date,
-        rocket_name=args.rocket,
-        success=success_filter,
-        launch_site=args.site
-    )
-    print(f"Total Launches: {len(launches)}")
+
+def _cli_date(value: Optional[str]) -> Optional[datetime.datetime]:
+    """
+    ISO date (or date and time) given on the command line, in UTC unless
+    it has an offset.
+    """
+    if not value:
+        return None
+    date = datetime.datetime.fromisoformat(value)
+    return date if date.tzinfo else date.replace(tzinfo=datetime.timezone.utc)
+
+
+def _cli_success(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if str(value).lower() in ("true", "false"):
+        return str(value).lower() == "true"
+    raise ValueError(f"Invalid success value: {value!r}")
+
+
+def parse_query(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    filter_launches arguments of a --queries filter spec: an object with
+    optional "start_date", "end_date", "rocket" and "site" (a name or a
+    list of names) and "success" (true/false), plus an optional "name".
+    Raises ValueError for an invalid spec.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Query must be an object: {spec!r}")
+    unknown = set(spec) - set(_QUERY_KEYS) - {"name"}
+    if unknown:
+        raise ValueError(f"Unknown query keys: {', '.join(sorted(unknown))}")
+    return {
+        "start_date": _cli_date(spec.get("start_date")),
+        "end_date": _cli_date(spec.get("end_date")),
+        "rocket_name": spec.get("rocket"),
+        "success": _cli_success(spec.get("success")),
+        "launch_site": spec.get("site"),
+    }
+
+
+def read_queries(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    (name, filter_launches arguments) of every filter spec in a --queries
+    file: a JSON array of specs, or one spec per line (JSON Lines, blank
+    lines and lines starting with # are skipped). Specs without a name are
+    named after their position. Raises ValueError for an invalid file.
+    """
+    with open(path) as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        specs = json.loads(content)
+    else:
+        specs = [json.loads(line) for line in content.splitlines()
+                 if line.strip() and not line.lstrip().startswith("#")]
+    queries = []
+    for number, spec in enumerate(specs, 1):
+        try:
+            filters = parse_query(spec)
+            queries.append((str(spec.get("name", number)), filters))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Query {number}: {e}") from e
+    return queries
+
+
+def write_json(spacex_data: SpaceXData,
+               queries: List[Tuple[str, Dict[str, Any]]],
+               out: TextIO,
+               counts_only: bool = False) -> None:
+    """
+    One JSON object per line and query: its name, filters, count and
+    (unless counts_only) matching launches in source order, like
+    ``filter_launches``, written launch by launch.
+    """
+    for name, filters in queries:
+        launches = None if counts_only else spacex_data.filter_launches(**filters)
+        head = json.dumps({
+            "query": name,
+            "filters": {key: value.isoformat() if isinstance(value, datetime.datetime) else value
+                        for key, value in ((key, filters[argument]) for key, argument in _QUERY_KEYS.items())
+                        if value is not None},
+            "count": spacex_data.count_launches(**filters) if launches is None else len(launches),
+        })
+        if launches is None:
+            out.write(head + "\n")
+            continue
+        # the launches are streamed into the object, after its other keys
+        out.write(head[:-1] + ', "launches": [')
+        for number, launch in enumerate(launches):
+            out.write((", " if number else "") + json.dumps(launch.to_dict()))
+        out.write("]}\n")
+
+
+def write_csv(spacex_data: SpaceXData,
+              queries: List[Tuple[str, Dict[str, Any]]],
+              out: TextIO,
+              counts_only: bool = False) -> None:
+    """
+    CSV rows of the launches matching each query, in source order and
+    prefixed with the query name, or one query,count row per query with
+    counts_only.
+    """
+    writer = csv.writer(out)
+    if counts_only:
+        writer.writerow(("query", "count"))
+        for name, filters in queries:
+            writer.writerow((name, spacex_data.count_launches(**filters)))
+        return
+    writer.writerow(_CSV_FIELDS)
+    for name, filters in queries:
+        for launch in spacex_data.filter_launches(**filters):
+            row = launch.to_dict()
+            row["query"] = name
+            writer.writerow([row.get(field) for field in _CSV_FIELDS])
+
+
+def print_report(spacex_data: SpaceXData, filters: Dict[str, Any]) -> None:
+    """
+    Human readable launch counts and statistics.
+    """
+    filtered_launches = spacex_data.filter_launches(**filters)
+    print(f"Total Launches: {len(spacex_data.launches)}")
     print(f"Total Launches after filtering: {len(filtered_launches)}\n")
 
     # Statistics: Success rate per rocket
@@ -220,5 +1140,60 @@ def main():
     for year, count in sorted(yearly.items()):
         print(f"  {year}: {count}")
 
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    from snapshot_file import read_snapshot, write_snapshot  # snapshot_file imports columns
+
+    parser = argparse.ArgumentParser(description="SpaceX Launch Tracker")
+    parser.add_argument("--start-date", type=str, help="Start date in YYYY-MM-DD")
+    parser.add_argument("--end-date", type=str, help="End date in YYYY-MM-DD")
+    parser.add_argument("--rocket", type=str, help="Rocket name to filter")
+    parser.add_argument("--success", type=str, choices=["true", "false"], help="Filter by launch success (true/false)")
+    parser.add_argument("--site", type=str, help="Launch site name to filter")
+    parser.add_argument("--snapshot", metavar="FILE", help="Load the data from this snapshot file instead of the API")
+    parser.add_argument("--save-snapshot", metavar="FILE", help="Save the loaded data to this snapshot file")
+    parser.add_argument("--queries", metavar="FILE",
+                        help="Run every filter spec of this file (JSON array or JSON Lines), not the filter options")
+    parser.add_argument("--format", choices=["text", "json", "csv"], default="text",
+                        help="text: report (or counts of the queries); json (an object per query), csv: the launches")
+    parser.add_argument("--counts-only", action="store_true", help="Only output the number of launches of each query")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.queries:
+            queries = read_queries(args.queries)
+        else:
+            spec = {"start_date": args.start_date, "end_date": args.end_date, "rocket": args.rocket,
+                    "success": args.success, "site": args.site}
+            queries = [("1", parse_query(spec))]
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.queries}: {e}" if args.queries else str(e))
+
+    # Load SpaceX data
+    if args.snapshot:
+        data = read_snapshot(args.snapshot)
+        if data is None:
+            parser.error(f"Could not read snapshot {args.snapshot}")
+    else:
+        data, _ = fetch_data()
+    if args.save_snapshot:
+        if not data.get("launches"):
+            parser.exit(1, "No launch data to save\n")
+        write_snapshot(args.save_snapshot, data, data.get("version", 0))
+
+    # one instance, its indexes are shared by every query
+    spacex_data = SpaceXData.from_snapshot(data)
+
+    if args.format == "json":
+        write_json(spacex_data, queries, sys.stdout, args.counts_only)
+    elif args.format == "csv":
+        write_csv(spacex_data, queries, sys.stdout, args.counts_only)
+    elif args.queries or args.counts_only:
+        for name, filters in queries:
+            print(f"{name}: {spacex_data.count_launches(**filters)}")
+    else:
+        print_report(spacex_data, queries[0][1])
+
 if __name__ == "__main__":
     main()
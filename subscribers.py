@@ -0,0 +1,196 @@
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from threading import Lock, local
+from typing import Optional, Set, Tuple
+
+# Identifies this process when taking leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _newer(fingerprint: str, revision: int, notified: Tuple[Optional[str], int]) -> bool:
+    """
+    Whether a snapshot is to be notified after the `notified` one: other
+    content, downloaded later. An older snapshot still held by a worker
+    that has not refreshed yet must not be notified again.
+    """
+    return fingerprint != notified[0] and revision > notified[1]
+
+
+class SubscriberStore(ABC):
+    """
+    Webhook subscribers shared by every worker, plus the coordination needed
+    so that one notification is sent per data change.
+
+    ``claim_notification`` is the single sender election: it succeeds for
+    the worker holding (or taking over) the notify lease when its snapshot
+    is newer than the last one notified (a higher revision, and different
+    content), and records it, so a change is notified once however many
+    workers observe it, and never after a newer one.
+    """
+    @abstractmethod
+    def add(self, url: str) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, url: str) -> None:
+        ...
+
+    @abstractmethod
+    def all(self) -> Set[str]:
+        ...
+
+    @abstractmethod
+    def notified(self) -> Tuple[Optional[str], int]:
+        """
+        Fingerprint and revision of the last snapshot notified by any worker
+        (None and 0 before the first).
+        """
+
+    @abstractmethod
+    def claim_notification(self, fingerprint: str, revision: int, owner: str = WORKER_ID, ttl: float = 60) -> bool:
+        """
+        True if `owner` holds the notify lease (renewed for `ttl` seconds)
+        and the snapshot (`fingerprint`, `revision`) is newer than the last
+        one notified; it is then recorded as notified and the caller must
+        send the notifications.
+        """
+
+    def close(self) -> None:
+        """
+        Release the resources held for the calling thread, e.g. before
+        forking; the store reopens them on next use.
+        """
+
+    def __len__(self) -> int:
+        return len(self.all())
+
+
+class MemorySubscriberStore(SubscriberStore):
+    """
+    In-process store, for a single worker.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._subscribers: Set[str] = set()
+        self._lease: Optional[Tuple[str, float]] = None
+        self._notified: Tuple[Optional[str], int] = (None, 0)
+
+    def add(self, url: str) -> None:
+        with self._lock:
+            self._subscribers.add(url)
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            self._subscribers.discard(url)
+
+    def all(self) -> Set[str]:
+        with self._lock:
+            return set(self._subscribers)
+
+    def notified(self) -> Tuple[Optional[str], int]:
+        return self._notified
+
+    def claim_notification(self, fingerprint: str, revision: int, owner: str = WORKER_ID, ttl: float = 60) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._lease is not None and self._lease[0] != owner and self._lease[1] > now:
+                return False
+            self._lease = (owner, now + ttl)
+            if not _newer(fingerprint, revision, self._notified):
+                return False
+            self._notified = (fingerprint, revision)
+            return True
+
+
+class SQLiteSubscriberStore(SubscriberStore):
+    """
+    Store in a SQLite file shared by the workers of one host. Each thread
+    uses its own connection, opened (and the schema created) on first use.
+    """
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self._local = local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # autocommit, transactions are explicit
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS subscribers (url TEXT PRIMARY KEY, created REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        # a connection must not be open across a fork, SQLite's locks are
+        # per process and the child would inherit the parent's lock state
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def add(self, url: str) -> None:
+        self._connection().execute("INSERT OR IGNORE INTO subscribers (url, created) VALUES (?, ?)", (url, time.time()))
+
+    def remove(self, url: str) -> None:
+        self._connection().execute("DELETE FROM subscribers WHERE url = ?", (url,))
+
+    def all(self) -> Set[str]:
+        return {url for url, in self._connection().execute("SELECT url FROM subscribers")}
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM subscribers").fetchone()[0]
+
+    def notified(self) -> Tuple[Optional[str], int]:
+        return self._notified(self._connection())
+
+    def claim_notification(self, fingerprint: str, revision: int, owner: str = WORKER_ID, ttl: float = 60) -> bool:
+        connection = self._connection()
+        now = time.time()
+        # write lock up front: the check and the update are one atomic step
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            lease = connection.execute("SELECT owner, expires FROM leases WHERE name = 'notify'").fetchone()
+            if lease is not None and lease[0] != owner and lease[1] > now:
+                connection.execute("ROLLBACK")
+                return False
+            if lease is not None and lease[0] != owner:
+                logging.info(f"Taking over the notify lease from {lease[0]}")
+            connection.execute("INSERT OR REPLACE INTO leases (name, owner, expires) VALUES ('notify', ?, ?)",
+                               (owner, now + ttl))
+            claimed = _newer(fingerprint, revision, self._notified(connection))
+            if claimed:
+                connection.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                                       [("notified_fingerprint", fingerprint), ("notified_revision", str(revision))])
+            connection.execute("COMMIT")
+            return claimed
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _notified(connection: sqlite3.Connection) -> Tuple[Optional[str], int]:
+        state = dict(connection.execute(
+            "SELECT key, value FROM state WHERE key IN ('notified_fingerprint', 'notified_revision')"
+        ))
+        return state.get("notified_fingerprint"), int(state.get("notified_revision") or 0)
+
+
+def create_store(location: str) -> SubscriberStore:
+    """
+    Store for a location: ":memory:" for an in-process store, otherwise the
+    path of a SQLite file (an optional "sqlite:///" prefix is accepted).
+    """
+    if location == ":memory:":
+        return MemorySubscriberStore()
+    if location.startswith("sqlite:///"):
+        location = location[len("sqlite:///"):]
+    return SQLiteSubscriberStore(location)
@@ -0,0 +1,342 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import json
+
+import app as a
+import metrics
+from diff import NO_CHANGES
+
+def _launch(i: int) -> dict:
+    return {
+        "id": f"L{i}",
+        "name": f"Launch {i}",
+        "date_utc": f"20{10 + i % 10:02d}-0{1 + i % 9}-01T00:00:00.000Z",
+        "rocket": "R1",
+        "launchpad": "LP1",
+        "success": i % 2 == 0,
+    }
+
+_DATA = {
+    "launches": [_launch(i) for i in range(50)],
+    "rockets": [{"id": "R1", "name": "Falcon 9"}],
+    "launchpads": [{"id": "LP1", "name": "KSC LC 39A"}],
+}
+
+class TestApiCaching(unittest.TestCase):
+
+    def setUp(self):
+        self.data = dict(_DATA)
+        patcher = patch("app.fetch_data", side_effect=lambda: (self.data, NO_CHANGES))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        a._RESPONSE_CACHE.clear()
+        self.client = a.app.test_client()
+
+    def test_etag_and_cache_control(self):
+        response = self.client.get("/api/launches?rocket=Falcon%209")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["ETag"])
+        self.assertIn("public, max-age=", response.headers["Cache-Control"])
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(len(response.get_json()), 50)
+
+    def test_not_modified(self):
+        etag = self.client.get("/api/stats").headers["ETag"]
+
+        with patch("spacex_tracker.SpaceXData.success_rate_by_rocket") as mock_stats:
+            response = self.client.get("/api/stats", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        mock_stats.assert_not_called()
+
+    def test_etag_depends_on_query_and_data(self):
+        etag = self.client.get("/api/launches?success=true").headers["ETag"]
+
+        # equivalent query, same representation
+        self.assertEqual(self.client.get("/api/launches?success=True").headers["ETag"], etag)
+        self.assertNotEqual(self.client.get("/api/launches?success=false").headers["ETag"], etag)
+
+        self.data = dict(_DATA, launches=_DATA["launches"][:10])
+        response = self.client.get("/api/launches?success=true", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(response.get_json()), 5)
+
+    def test_gzip(self):
+        plain = self.client.get("/api/launches")
+        response = self.client.get("/api/launches", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.data)), plain.get_json())
+        self.assertNotEqual(response.headers["ETag"], plain.headers["ETag"])
+
+        # a 304 for the compressed representation keeps its tag
+        cached = self.client.get("/api/launches", headers={"Accept-Encoding": "gzip",
+                                                           "If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers["ETag"], response.headers["ETag"])
+
+    def test_small_bodies_not_compressed(self):
+        response = self.client.get("/api/launches?rocket=Unknown", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.get_json(), [])
+
+    def test_grouped_stats(self):
+        response = self.client.get("/api/stats?group_by=year,success&start_date=2018-01-01")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["group_by"], ["year", "success"])
+        self.assertEqual(body["groups"], [
+            {"year": 2018, "success": True, "launches": 5, "successes": 5, "success_rate": 100.0},
+            {"year": 2019, "success": False, "launches": 5, "successes": 0, "success_rate": 0.0},
+        ])
+        self.assertNotEqual(response.headers["ETag"], self.client.get("/api/stats").headers["ETag"])
+
+        totals = self.client.get("/api/stats?group_by=&rocket=Falcon%209&success=true").get_json()
+        self.assertEqual(totals["groups"], [{"launches": 25, "successes": 25, "success_rate": 100.0}])
+        self.assertEqual(self.client.get("/api/stats?group_by=decade").status_code, 400)
+
+class TestApiExport(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("app.fetch_data", return_value=(dict(_DATA), NO_CHANGES))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        a._RESPONSE_CACHE.clear()
+        self.client = a.app.test_client()
+
+    def _pages(self, url: str):
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            yield response
+            url = response.headers.get("Link", "").partition(">")[0].lstrip("<")
+
+    def test_ndjson_cursor_pagination(self):
+        rows = []
+        pages = list(self._pages("/api/launches?format=ndjson&limit=7&rocket=Falcon%209"))
+        for response in pages:
+            self.assertEqual(response.mimetype, "application/x-ndjson")
+            rows.extend(json.loads(line) for line in response.get_data(as_text=True).splitlines())
+
+        self.assertEqual(len(pages), 8)
+        self.assertNotIn("X-Next-Cursor", pages[-1].headers)
+        self.assertEqual(len(rows), 50)
+        # keyset order, each launch exactly once
+        self.assertEqual(sorted(rows, key=lambda row: row["date_utc"]), rows)
+        self.assertEqual(len({row["name"] for row in rows}), 50)
+        self.assertEqual(rows[0]["rocket"], "Falcon 9")
+
+    def test_json_pages_match_full_export(self):
+        full = self.client.get("/api/launches?success=true").get_json()
+        paged = [row for response in self._pages("/api/launches?success=true&limit=4")
+                 for row in response.get_json()]
+
+        key = lambda row: (row["date_utc"], row["name"])
+        self.assertEqual(sorted(full, key=key), sorted(paged, key=key))
+
+    def test_json_encoding_does_not_depend_on_paging(self):
+        def encode(value):
+            return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+        full = self.client.get("/api/launches?start_date=2019-01-01").get_data(as_text=True)
+        page = self.client.get("/api/launches?start_date=2019-01-01&limit=3").get_data(as_text=True)
+        lines = self.client.get("/api/launches?start_date=2019-01-01&format=ndjson").get_data(as_text=True).splitlines()
+
+        self.assertEqual(full, encode(json.loads(full)) + "\n")
+        self.assertEqual(page, encode(json.loads(page)) + "\n")
+        self.assertEqual(lines, [encode(json.loads(line)) for line in lines])
+
+    def test_csv(self):
+        response = self.client.get("/api/launches?format=csv&start_date=2019-01-01")
+
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], "name,date_utc,rocket,launchpad,success")
+        self.assertEqual(len(lines), 1 + 5)
+        self.assertTrue(all(",Falcon 9,KSC LC 39A," in line for line in lines[1:]))
+
+    def test_streamed_exports_gzip(self):
+        for export_format in ("ndjson", "csv"):
+            url = f"/api/launches?format={export_format}"
+            plain = self.client.get(url)
+            response = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            self.assertEqual(gzip.decompress(response.data), plain.data)
+            self.assertEqual(response.headers["ETag"].strip('"'), plain.headers["ETag"].strip('"') + "-gzip")
+            cached = self.client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+            self.assertEqual(cached.status_code, 304)
+
+    def test_json_pages_gzip(self):
+        plain = self.client.get("/api/launches?limit=20")
+        response = self.client.get("/api/launches?limit=20", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.data)), plain.get_json())
+        self.assertNotEqual(response.headers["ETag"], plain.headers["ETag"])
+        self.assertEqual(response.headers["X-Next-Cursor"], plain.headers["X-Next-Cursor"])
+        # small pages are sent as is
+        small = self.client.get("/api/launches?limit=1", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", small.headers)
+
+    def test_invalid_arguments(self):
+        self.assertEqual(self.client.get("/api/launches?cursor=garbage").status_code, 400)
+        self.assertEqual(self.client.get("/api/launches?limit=0").status_code, 400)
+        self.assertEqual(self.client.get("/api/launches?limit=abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/launches?format=xml").status_code, 400)
+
+class TestLaunchesPage(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("app.fetch_data", return_value=(dict(_DATA), NO_CHANGES))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        a._PAGE_CACHE.clear()
+        self.client = a.app.test_client()
+
+    def _render(self, url: str):
+        with patch("app.render_template", return_value="") as mock_render:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return mock_render.call_args.kwargs
+
+    def test_keyset_pages(self):
+        context = self._render("/?success=true")
+        self.assertEqual(context["total_launches"], 25)
+        self.assertEqual(context["total_pages"], 2)
+        self.assertIsNone(context["previous_url"])
+
+        second = self._render(context["next_url"])
+        self.assertEqual(second["page"], 2)
+        self.assertIsNone(second["next_url"])
+        self.assertIn("success=true", second["previous_url"])
+
+        rows = list(context["launches"]) + list(second["launches"])
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(len({row["id"] for row in rows}), 25)
+        self.assertEqual(sorted(rows, key=lambda row: row["date_utc"]), rows)
+
+        # and back again
+        first = self._render(second["previous_url"])
+        self.assertEqual(first["page"], 1)
+        self.assertEqual(first["launches"], context["launches"])
+
+    def test_page_links_from_normalized_filters(self):
+        url = "/?rocket=Falcon%209&start_date=2012-01-01&end_date=2019-06-01T12:00:00.000Z&utm=x"
+        first = self._render(url)
+        self.assertNotIn("utm", first["next_url"])
+
+        # links keep selecting the same launches
+        second = self._render(first["next_url"])
+        self.assertEqual(second["total_launches"], first["total_launches"])
+        self.assertEqual(second["page"], 2)
+        self.assertEqual(self._render(second["previous_url"])["launches"], first["launches"])
+        a._PAGE_CACHE.clear()
+
+        # an equivalent query served from the page cache links to the same pages
+        page = self.client.get("/?rocket=falcon%209&start_date=2012-01-01&end_date=2019-06-01T12:00:00.000Z&utm=y")
+        self.assertNotIn(b"utm", page.data)
+
+    def test_page_without_cursor(self):
+        context = self._render("/?page=3")
+        self.assertEqual(context["total_pages"], 3)
+        self.assertEqual(len(context["launches"]), 10)
+        self.assertIsNone(context["next_url"])
+        self.assertEqual(self._render(context["previous_url"])["page"], 2)
+
+    def test_renders(self):
+        response = self.client.get("/")
+        self.assertIn(b"Page 1 of 3 (50 launches)", response.data)
+        self.assertIn(b'<option value="KSC LC 39A">', response.data)
+
+    def test_page_cache(self):
+        first = self.client.get("/?rocket=Falcon%209&page=2")
+
+        # same normalized filters and page: served from the cache
+        with patch("app.render_template") as mock_render:
+            second = self.client.get("/?rocket=falcon%209%20&page=2")
+        mock_render.assert_not_called()
+        self.assertEqual(first.data, second.data)
+
+        # a conditional request is answered without a body
+        cached = self.client.get("/?rocket=Falcon%209&page=2", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+
+        # another page is rendered, reusing the filter form
+        with patch("app.render_template", return_value="") as mock_render:
+            self.client.get("/?rocket=Falcon%209&page=3")
+        self.assertEqual([call.args[0] for call in mock_render.call_args_list], ["launches.html"])
+
+    def test_page_cache_new_data(self):
+        self.client.get("/")
+        with patch("app.fetch_data", return_value=(dict(_DATA, launches=_DATA["launches"][:3]), NO_CHANGES)):
+            response = self.client.get("/")
+        self.assertIn(b"Page 1 of 1 (3 launches)", response.data)
+
+    def test_stats_page_cache_headers(self):
+        response = self.client.get("/stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response.headers["Cache-Control"])
+        self.assertIn(f"max-age={a.STATIC_MAX_AGE}", response.headers["Cache-Control"])
+        cached = self.client.get("/stats", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        patchers = [
+            patch("app.fetch_data", return_value=(dict(_DATA), NO_CHANGES)),
+            patch.object(metrics, "ENABLED", True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        a._RESPONSE_CACHE.clear()
+        a._PAGE_CACHE.clear()
+        self.client = a.app.test_client()
+
+    def _timings(self, response) -> dict:
+        return dict(entry.split(";", 1) for entry in response.headers["Server-Timing"].split(", "))
+
+    def test_server_timing(self):
+        timings = self._timings(self.client.get("/api/stats"))
+        self.assertIn("fetch", timings)
+        self.assertIn("stats", timings)
+        self.assertTrue(timings["total"].startswith("dur="))
+
+        timings = self._timings(self.client.get("/?rocket=Falcon%209"))
+        self.assertIn("filter", timings)
+        self.assertIn("render", timings)
+
+        # served from the response cache, nothing is recomputed
+        timings = self._timings(self.client.get("/api/stats"))
+        self.assertNotIn("stats", timings)
+
+    def test_metrics(self):
+        self.client.get("/api/launches")
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        text = response.get_data(as_text=True)
+        self.assertIn('spacex_http_request_seconds_count{endpoint="export_launches",method="GET",status="200"}', text)
+        self.assertIn('spacex_operation_seconds_bucket{operation="filter",le="+Inf"}', text)
+        self.assertIn('spacex_cache_misses_total{cache="response"}', text)
+        self.assertIn("spacex_webhook_delivered_total", text)
+        self.assertIn("# TYPE spacex_ready gauge", text)
+
+    def test_disabled(self):
+        with patch.object(metrics, "ENABLED", False):
+            response = self.client.get("/api/stats")
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("Server-Timing", response.headers)
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+import requests
+
+import config as c
+import utils as u
+from benchmarks.load_test import BUCKETS_MS, histogram, run_scenario
+from benchmarks.stub_api import StubSpaceXAPI
+from benchmarks.suite import BENCHMARKS, compare, run_suite
+from benchmarks.synthetic import synthetic_data, synthetic_snapshot
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_synthetic_data_is_seeded(self):
+        self.assertEqual(synthetic_data(50, seed=1), synthetic_data(50, seed=1))
+        self.assertNotEqual(synthetic_data(50, seed=1)[0], synthetic_data(50, seed=2)[0])
+
+        snapshot = synthetic_snapshot(50, n_rockets=3, n_launchpads=4)
+        self.assertEqual((len(snapshot["launches"]), len(snapshot["rockets"]), len(snapshot["launchpads"])), (50, 3, 4))
+        self.assertEqual(sum(len(pad["launches"]) for pad in snapshot["launchpads"]), 50)
+        self.assertTrue(snapshot["fingerprint"])
+
+    def test_suite_runs_every_benchmark(self):
+        data = u._DATA
+        results = run_suite(launches=200, repeat=1, report=lambda line: None)
+
+        self.assertEqual(set(results["results"]), set(BENCHMARKS))
+        self.assertEqual(results["params"]["launches"], 200)
+        # the global cache is left as it was
+        self.assertIs(u._DATA, data)
+
+    def test_compare(self):
+        baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "gone": {"median_ms": 1.0}}}
+        current = {"results": {"a": {"median_ms": 12.0}, "b": {"median_ms": 13.0}, "new": {"median_ms": 1.0}}}
+
+        rows = {row["name"]: row for row in compare(baseline, current, threshold=0.25)}
+        self.assertEqual(set(rows), {"a", "b"})
+        self.assertFalse(rows["a"]["regression"])
+        self.assertTrue(rows["b"]["regression"])
+        self.assertAlmostEqual(rows["b"]["ratio"], 1.3)
+
+    def test_stub_api(self):
+        with StubSpaceXAPI(launches=20, rockets=2, launchpads=3) as stub:
+            response = requests.get(stub.url + "/launches")
+            self.assertEqual(len(response.json()), 20)
+            etag = response.headers["ETag"]
+            self.assertEqual(requests.get(stub.url + "/launches", headers={"If-None-Match": etag}).status_code, 304)
+
+            page = requests.post(stub.url + "/rockets/query",
+                                 json={"options": {"page": 2, "limit": 1, "select": {"name": 1}}}).json()
+            self.assertEqual((page["totalDocs"], page["totalPages"], list(page["docs"][0])), (2, 2, ["id", "name"]))
+
+            stub.failure_rate = 1.0
+            self.assertEqual(requests.get(stub.url + "/rockets").status_code, 503)
+            self.assertEqual((stub.requests, stub.failures), (4, 1))
+
+    def test_histogram(self):
+        counts = histogram([0.5, 1.0, 1.5, 30.0, 20000.0])
+        self.assertEqual(counts["<=1"], 2)
+        self.assertEqual(counts["<=2"], 1)
+        self.assertEqual(counts["<=50"], 1)
+        self.assertEqual(counts[f">{BUCKETS_MS[-1]}"], 1)
+
+    def test_load_test_scenario(self):
+        data, base_url = u._DATA, c.SPACEX_BASE_URL
+        with StubSpaceXAPI(launches=100, rockets=3, launchpads=4) as stub:
+            result = run_scenario("cold", stub, concurrency=2, duration=0.5)
+
+        self.assertGreater(result["requests"], 0)
+        self.assertEqual(result["errors"], 0)
+        self.assertEqual(set(result["routes"]), {"/", "/api/launches", "/api/stats"})
+        self.assertEqual(sum(result["histogram"].values()), result["requests"])
+        # the cache dropped mid-run was downloaded again
+        self.assertGreaterEqual(result["upstream"]["requests"], 3)
+        self.assertGreater(result["lock"]["acquisitions"], 0)
+        # the app is pointed back at its own cache and API
+        self.assertIs(u._DATA, data)
+        self.assertEqual(c.SPACEX_BASE_URL, base_url)
+
+
+    def test_load_test_expiry_scenario(self):
+        with StubSpaceXAPI(launches=100, rockets=3, launchpads=4) as stub:
+            result = run_scenario("expiry", stub, concurrency=2, duration=0.5)
+
+        # the expired cache is downloaded again without the background refresher
+        self.assertEqual(result["mode"], "sync")
+        self.assertGreaterEqual(result["upstream"]["requests"], 3)
+        self.assertEqual(result["errors"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
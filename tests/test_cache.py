@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+
+from cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_hit_miss(self):
+        cache = LRUCache(max_entries=2)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get_or_set("b", lambda: 2), 2)
+        self.assertEqual(cache.get_or_set("b", lambda: 3), 2)
+        self.assertEqual(cache.info(), {"hits": 2, "misses": 2, "evictions": 0, "entries": 2, "bytes": 0})
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_max_bytes(self):
+        cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "xxxx")
+        cache.set("c", "xxxx")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("a"))
+        # too big to be cached at all
+        cache.set("d", "x" * 11)
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.info()["bytes"], 8)
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=10)
+        with patch("cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+        with patch("cache.time.monotonic", return_value=105):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_disabled(self):
+        cache = LRUCache(max_entries=0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
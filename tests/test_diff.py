@@ -0,0 +1,61 @@
+import unittest
+
+from diff import RecordDiff, SnapshotDiff, NO_CHANGES, diff_records
+
+
+class TestDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.old = [
+            {"id": "1", "success": None},
+            {"id": "2", "success": True},
+        ]
+
+    def test_no_changes(self):
+        records, diff = diff_records(self.old, [dict(record) for record in self.old])
+        self.assertIs(records, self.old)
+        self.assertFalse(diff)
+
+    def test_in_place_change_and_append(self):
+        new = [{"id": "1", "success": True}, {"id": "2", "success": True}, {"id": "3", "success": None}]
+        records, diff = diff_records(self.old, new)
+
+        self.assertEqual(records, new)
+        self.assertIs(records[1], self.old[1])
+        self.assertTrue(diff.in_place)
+        self.assertEqual(diff.changed, ["1"])
+        self.assertEqual(diff.changed_positions, [0])
+        self.assertEqual(diff.added, ["3"])
+        self.assertEqual(diff.removed, [])
+        self.assertEqual(diff.old_length, 2)
+
+    def test_removed_and_reordered(self):
+        new = [{"id": "3", "success": False}, {"id": "1", "success": None}]
+        records, diff = diff_records(self.old, new)
+
+        self.assertEqual(records, new)
+        self.assertIs(records[1], self.old[0])
+        self.assertFalse(diff.in_place)
+        self.assertEqual(diff.added, ["3"])
+        self.assertEqual(diff.changed, [])
+        self.assertEqual(diff.removed, ["2"])
+
+    def test_merge(self):
+        first = RecordDiff(added=["a"], changed=["b"], removed=["c"])
+        second = RecordDiff(added=["c"], changed=["a", "d"], removed=["a", "b"])
+        merged = first.merge(second)
+
+        self.assertEqual(merged.added, [])
+        self.assertEqual(sorted(merged.changed), ["c", "d"])
+        self.assertEqual(merged.removed, ["b"])
+
+    def test_snapshot_diff(self):
+        self.assertFalse(NO_CHANGES)
+        diff = SnapshotDiff(rockets=RecordDiff(changed=["R1"]), base_version=1, version=2)
+        self.assertTrue(diff)
+        self.assertEqual(diff.to_dict()["rockets"], {"added": [], "changed": ["R1"], "removed": []})
+        self.assertEqual(diff.to_dict()["launches"], {"added": [], "changed": [], "removed": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,16 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import datetime as dt
+import time
 from concurrent.futures import ThreadPoolExecutor
 
+import columns
 import config as c
+import parallel
 import utils as u
+from breaker import CircuitBreaker
+from spacex_tracker import SpaceXData
+from columns import HAS_NUMPY
 
 class TestFetchData(unittest.TestCase):
 
@@ -37,6 +43,8 @@ class TestFetchData(unittest.TestCase):
         self.assertEqual(data["rockets"], [{"id": "R1"}])
         self.assertEqual(data["launchpads"], [{"id": "LP1"}])
         self.assertTrue(notify)  
+        if HAS_NUMPY:
+            self.assertEqual(len(data["columns"]), 3)
 
         mock_launches.assert_called_once()  
         mock_launchpads.assert_called_once()
@@ -46,7 +54,7 @@ class TestFetchData(unittest.TestCase):
     @patch("utils._fetch_rockets", return_value=[{"id": "R1"}])
     @patch("utils._fetch_launchpads", return_value=[{"id": "LP1"}])
     def test_fetch_data_no_change_in_launches(self, mock_launchpads, mock_rockets, mock_launches):
-        u._DATA["launches"] = [{"id": "1"}, {"id": "2"}]
+        u._DATA = {"launches": [{"id": "1"}, {"id": "2"}], "rockets": [{"id": "R1"}], "launchpads": [{"id": "LP1"}]}
         u._TIMESTAMP = dt.datetime.now() - dt.timedelta(seconds=c.CACHE_EXPIRY + 1)
 
         data, notify = u.fetch_data()
@@ -54,9 +62,27 @@ class TestFetchData(unittest.TestCase):
         self.assertEqual(len(data["launches"]), 2)
         self.assertFalse(notify)
 
-        mock_launches.assert_not_called()  
-        mock_launchpads.assert_not_called()
-        mock_rockets.assert_not_called()
+        mock_launches.assert_called_once()
+        mock_launchpads.assert_called_once()
+        mock_rockets.assert_called_once()
+
+    @patch("utils._fetch_launches", return_value=[{"id": "1"}, {"id": "2"}, {"id": "3"}])
+    @patch("utils._fetch_rockets", return_value=[{"id": "R1"}])
+    @patch("utils._fetch_launchpads", return_value=[{"id": "LP1"}])
+    def test_expired_snapshot_is_downloaded_again(self, mock_launchpads, mock_rockets, mock_launches):
+        u._DATA = {"launches": [{"id": "1"}, {"id": "2"}], "rockets": [{"id": "R1"}], "launchpads": [{"id": "LP1"}]}
+        u._TIMESTAMP = dt.datetime.now() - dt.timedelta(seconds=c.CACHE_EXPIRY + 1)
+
+        data, notify = u.fetch_data()
+
+        self.assertEqual([launch["id"] for launch in data["launches"]], ["1", "2", "3"])
+        self.assertTrue(notify)
+        self.assertLess(u.snapshot_age(), c.CACHE_EXPIRY)
+        mock_launches.assert_called_once()
+
+        # fresh again: served from the cache
+        u.fetch_data()
+        mock_launches.assert_called_once()
 
     @patch("utils._fetch_launches", return_value=[{"id": "1"}, {"id": "2"}])
     @patch("utils._fetch_rockets", return_value=[{"id": "R1"}])
@@ -78,7 +104,93 @@ class TestFetchData(unittest.TestCase):
         self.assertEqual(mock_rockets.call_count, 1)
         self.assertEqual(mock_launchpads.call_count, 1)
 
-    @patch("utils.requests.get")
+    @patch("utils._fetch_launches", return_value=[{"id": "1", "success": True}, {"id": "2", "success": None}])
+    @patch("utils._fetch_rockets", return_value=[{"id": "R1"}])
+    @patch("utils._fetch_launchpads", return_value=[{"id": "LP1"}])
+    def test_refresh_diff(self, mock_launchpads, mock_rockets, mock_launches):
+        rockets = [{"id": "R1"}]
+        u._DATA = {"launches": [{"id": "1", "success": None}, {"id": "2", "success": None}],
+                   "rockets": rockets, "launchpads": [{"id": "LP1"}], "version": 1}
+
+        # same number of launches, but one of them changed
+        data, diff = u.refresh_data()
+        self.assertTrue(diff)
+        self.assertEqual(diff.launches.changed, ["1"])
+        self.assertEqual(diff.base_version, 1)
+        self.assertEqual(data["version"], diff.version)
+        self.assertIs(data["diff"], diff)
+        self.assertFalse(diff.rockets)
+        self.assertIs(data["rockets"], rockets)
+
+        # nothing changed: the snapshot is kept
+        again, diff = u.refresh_data()
+        self.assertIs(again, data)
+        self.assertFalse(diff)
+
+    @patch("utils._fetch_launches", return_value=[{"id": "1"}, {"id": "2"}, {"id": "3"}])
+    @patch("utils._fetch_rockets", return_value=[{"id": "R1"}])
+    @patch("utils._fetch_launchpads", return_value=[{"id": "LP1"}])
+    def test_background_refresh(self, mock_launchpads, mock_rockets, mock_launches):
+        stale = {"launches": [{"id": "1"}], "rockets": [], "launchpads": []}
+        u._DATA = stale
+        u._TIMESTAMP = dt.datetime.now() - dt.timedelta(seconds=c.CACHE_EXPIRY + 1)
+
+        u.start_background_refresh(interval=60, warm=False)
+        try:
+            # expired cache is still served immediately, refresh happens in the background
+            data, notify = u.fetch_data()
+            self.assertIs(data, stale)
+            self.assertFalse(notify)
+
+            for _ in range(100):
+                if u._DATA is not stale:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(len(u._DATA["launches"]), 3)
+            mock_launches.assert_called_once()
+
+            # the pending notification goes to exactly one reader
+            data, notify = u.fetch_data()
+            self.assertEqual(len(data["launches"]), 3)
+            self.assertTrue(notify)
+            self.assertEqual(notify.launches.added, ["2", "3"])
+            data, notify = u.fetch_data()
+            self.assertFalse(notify)
+        finally:
+            u.stop_background_refresh(timeout=1)
+
+    @patch("utils._fetch_launches", return_value=[{"id": "1"}])
+    @patch("utils._fetch_rockets", return_value=[{"id": "R1"}])
+    @patch("utils._fetch_launchpads", return_value=[{"id": "LP1"}])
+    def test_warm_cache(self, mock_launchpads, mock_rockets, mock_launches):
+        u._DATA = {}
+        self.assertFalse(u.is_ready())
+        self.assertTrue(u.warm_cache())
+        self.assertTrue(u.warm_cache())
+        mock_launches.assert_called_once()
+
+    @patch("utils._fetch_launches", return_value=[
+        {"id": "1", "date_utc": "2020-01-01T00:00:00.000Z", "rocket": "R1", "launchpad": "LP1", "success": True},
+        {"id": "2", "date_utc": "2021-01-01T00:00:00.000Z", "rocket": "R1", "launchpad": "LP1", "success": False},
+    ])
+    @patch("utils._fetch_rockets", return_value=[{"id": "R1", "name": "Falcon 9"}])
+    @patch("utils._fetch_launchpads", return_value=[{"id": "LP1", "name": "KSC LC 39A"}])
+    def test_without_numpy(self, mock_launchpads, mock_rockets, mock_launches):
+        u._DATA = {}
+        with patch.object(columns, "HAS_NUMPY", False), patch.object(parallel, "HAS_NUMPY", False), \
+                patch.object(c, "PARALLEL_WORKERS", 2):
+            data, _ = u.fetch_data()
+            spacex_data = SpaceXData.from_snapshot(data)
+
+            # the list indexes answer instead of the columns
+            self.assertNotIn("columns", data)
+            self.assertIsNone(parallel.get_executor())
+            self.assertEqual(len(spacex_data.filter_launches(rocket_name="Falcon 9", success=True)), 1)
+            self.assertEqual(spacex_data.count_launches(start_date=dt.datetime(2020, 6, 1)), 1)
+            self.assertEqual(spacex_data.launch_frequency("yearly"), {"2020": 1, "2021": 1})
+            self.assertIsNone(spacex_data._columns)
+
+    @patch("utils._SESSION.get")
     def test_fetch_data_first_try(self, mock_get):
         mock_response = MagicMock()
         mock_response.raise_for_status.return_value = None
@@ -92,7 +204,7 @@ class TestFetchData(unittest.TestCase):
         self.assertEqual(mock_get.call_count, 1)
 
     @patch("utils.time.sleep", return_value=None)  
-    @patch("utils.requests.get")
+    @patch("utils._SESSION.get")
     def test_fetch_data_second_try(self, mock_get, mock_sleep):
         mock_response = MagicMock()
         mock_response.raise_for_status.return_value = None
@@ -106,7 +218,7 @@ class TestFetchData(unittest.TestCase):
         self.assertEqual(mock_get.call_count, 2)
 
     @patch("utils.time.sleep", return_value=None) 
-    @patch("utils.requests.get")
+    @patch("utils._SESSION.get")
     def test_fetch_data_all_fail(self, mock_get, mock_sleep):
         mock_get.side_effect = Exception("Network error")
 
@@ -117,5 +229,111 @@ class TestFetchData(unittest.TestCase):
         self.assertEqual(mock_get.call_count, 3)
     
 
+class TestUpstreamFailures(unittest.TestCase):
+
+    def setUp(self):
+        u._DATA = {}
+        u._TIMESTAMP = dt.datetime(1453, 5, 29)
+        breaker = patch.object(u, "_BREAKER", CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        self.breaker = breaker.start()
+        self.addCleanup(breaker.stop)
+
+    def _download(self, launches: int, rockets: int = 1, launchpads: int = 1) -> dict:
+        return {
+            "launches": [{"id": str(i)} for i in range(launches)],
+            "rockets": [{"id": f"R{i}"} for i in range(rockets)],
+            "launchpads": [{"id": f"LP{i}"} for i in range(launchpads)],
+        }
+
+    def test_failed_download_is_not_installed(self):
+        # what the fetches return once every attempt failed
+        with patch("utils._download_data", return_value=self._download(0, 0, 0)):
+            data, diff = u.fetch_data()
+
+        self.assertEqual(data["launches"], [])
+        self.assertFalse(diff)
+        self.assertFalse(u.is_ready())
+        self.assertEqual(u._DATA, {})
+
+        # the next call downloads again
+        with patch("utils._download_data", return_value=self._download(3)):
+            data, diff = u.fetch_data()
+        self.assertEqual(len(data["launches"]), 3)
+        self.assertTrue(diff)
+
+    def test_truncated_snapshot_keeps_last_good(self):
+        with patch("utils._download_data", return_value=self._download(10)):
+            good, _ = u.fetch_data()
+
+        for truncated in (self._download(4), self._download(10, rockets=0)):
+            with patch("utils._download_data", return_value=truncated):
+                data, diff = u.refresh_data()
+            self.assertIs(data, good)
+            self.assertFalse(diff)
+            self.assertIs(u._DATA, good)
+
+        # fewer records, within SNAPSHOT_MAX_SHRINK (once the breaker is closed again)
+        self.breaker.reset()
+        with patch("utils._download_data", return_value=self._download(6)):
+            data, diff = u.refresh_data()
+        self.assertEqual(len(data["launches"]), 6)
+        self.assertEqual(len(diff.launches.removed), 4)
+
+    def test_unchanged_collections_are_not_truncated(self):
+        with patch("utils._download_data", return_value=self._download(10)):
+            good, _ = u.fetch_data()
+        with patch("utils._download_data", return_value=dict(self._download(11), rockets=u.NOT_MODIFIED)):
+            data, diff = u.refresh_data()
+        self.assertEqual(len(data["launches"]), 11)
+        self.assertIs(data["rockets"], good["rockets"])
+
+    def test_circuit_breaker(self):
+        with patch("utils._download_data", return_value=self._download(10)):
+            good, _ = u.fetch_data()
+
+        with patch("utils._download_data", return_value=self._download(0, 0, 0)) as mock_download:
+            for _ in range(5):
+                data, diff = u.refresh_data()
+                self.assertIs(data, good)
+            # open after two failures: no more downloads
+            self.assertEqual(mock_download.call_count, 2)
+            self.assertGreater(u._BREAKER.retry_after(), 0)
+
+        # half-open: a single probe, which closes it
+        self.breaker._opened_at -= 60
+        with patch("utils._download_data", return_value=self._download(12)) as mock_download:
+            data, diff = u.refresh_data()
+            self.assertEqual(len(data["launches"]), 12)
+            u.refresh_data()
+        self.assertEqual(mock_download.call_count, 2)
+        self.assertEqual(u._BREAKER.retry_after(), 0)
+
+    @patch("utils.time.sleep", return_value=None)
+    @patch("utils._SESSION.get", side_effect=Exception("Network error"))
+    def test_no_sleep_after_last_attempt(self, mock_get, mock_sleep):
+        self.assertEqual(u._fetch_data("http://example.com/api"), [])
+        self.assertEqual(mock_sleep.call_count, 2)
+
+
+class TestParseDate(unittest.TestCase):
+
+    def test_fast_path_matches_format_chain(self):
+        values = ["2022-01-05T14:30:00.000Z", "2022-01-05T14:30:00.5Z", "2022-01-05T14:30:00.123456Z",
+                  "2022-01-05T14:30:00", "2022-01-05 14:30:00", "2022-01-05", "2022-02-30",
+                  "2022-01-05T14:30:00.000", "2022-01-05T14:30:00+01:00", "2022-1-5", "", "not a date",
+                  "2022-01-05T24:00:00"]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(u._parse_date_str.__wrapped__(value), u._parse_date_formats(value))
+                self.assertEqual(u.parse_date(value), u._parse_date_formats(value))
+
+    def test_lenient(self):
+        self.assertEqual(u.parse_date_lenient("2022-01-05T14:30:00+01:00"),
+                         dt.datetime(2022, 1, 5, 14, 30, tzinfo=dt.timezone(dt.timedelta(hours=1))))
+        self.assertIsNone(u.parse_date_lenient(""))
+        self.assertIsNone(u.parse_date_lenient(None))
+        self.assertIsNone(u.parse_date_lenient("not a date"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,208 @@
+import gzip
+import hashlib
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+import datetime as dt
+
+import config as c
+import metrics
+import utils as u
+
+
+class _StubSpaceXAPI:
+    """
+    Minimal stand-in for the SpaceX v4 API with ETag revalidation, gzip and
+    paginated ``POST /<collection>/query`` endpoints.
+    """
+    def __init__(self, query_enabled: bool = True):
+        self.query_enabled = query_enabled
+        self.documents = {
+            "/launches": [{"id": "L1", "name": "Launch 1", "date_utc": "2020-01-01T00:00:00.000Z",
+                           "rocket": "R1", "launchpad": "P1", "success": True, "links": {}}],
+            "/rockets": [{"id": "R1", "name": "Falcon 9", "active": True, "height": {}}],
+            "/launchpads": [{"id": "P1", "name": "Site A", "status": "active", "rockets": ["R1"], "launches": ["L1"]}],
+        }
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append((self.path, self.client_address, dict(self.headers)))
+                document = stub.documents.get(self.path)
+                if document is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(document).encode()
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                stub.requests.append((self.path, self.client_address, dict(self.headers), request))
+                collection = self.path[:-len("/query")] if self.path.endswith("/query") else None
+                document = stub.documents.get(collection)
+                if not stub.query_enabled or document is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                options = request.get("options", {})
+                page, limit = options.get("page", 1), options.get("limit", 10)
+                select = options.get("select", {})
+                docs = [
+                    {key: value for key, value in doc.items() if key == "id" or key in select}
+                    for doc in document[(page - 1) * limit:page * limit]
+                ]
+                body = json.dumps({
+                    "docs": docs,
+                    "totalDocs": len(document),
+                    "limit": limit,
+                    "page": page,
+                    "totalPages": max(1, -(-len(document) // limit)),
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestHTTPFetch(unittest.TestCase):
+
+    def setUp(self):
+        u._DATA = {}
+        u._TIMESTAMP = dt.datetime(1453, 5, 29)
+        u._VALIDATORS.clear()
+        # fresh connection pool per test, the stub server changes port
+        u._SESSION = u._create_session()
+
+    def test_conditional_refresh(self):
+        with _StubSpaceXAPI() as stub, patch.object(c, "SPACEX_BASE_URL", stub.url):
+            data, notify = u.fetch_data()
+            self.assertTrue(notify)
+            self.assertEqual(data["launches"], [{"id": "L1", "name": "Launch 1", "date_utc": "2020-01-01T00:00:00.000Z",
+                                                 "rocket": "R1", "launchpad": "P1", "success": True}])
+            first_timestamp = u._TIMESTAMP
+
+            # nothing changed upstream: every endpoint answers 304, snapshot is kept
+            refreshed, notify = u.refresh_data()
+            self.assertIs(refreshed, data)
+            self.assertFalse(notify)
+            self.assertGreater(u._TIMESTAMP, first_timestamp)
+            self.assertTrue(all("If-None-Match" in headers for _, _, headers in stub.requests[3:]))
+
+            # only launches changed: rockets and launchpads are reused as is
+            stub.documents["/launches"].append(dict(stub.documents["/launches"][0], id="L2"))
+            refreshed, notify = u.refresh_data()
+            self.assertIsNot(refreshed, data)
+            self.assertTrue(notify)
+            self.assertEqual([launch["id"] for launch in refreshed["launches"]], ["L1", "L2"])
+            self.assertIs(refreshed["rockets"], data["rockets"])
+            self.assertIs(refreshed["launchpads"], data["launchpads"])
+
+        self.assertEqual(len(stub.requests), 9)
+        self.assertTrue(all("gzip" in headers.get("Accept-Encoding", "") for _, _, headers in stub.requests))
+        # keep-alive: at most one connection per fetch thread
+        self.assertLessEqual(len({client for _, client, _ in stub.requests}), 3)
+
+    def test_query_ingestion(self):
+        launch = {"id": "L0", "name": "Launch", "date_utc": "2020-01-01T00:00:00.000Z",
+                  "rocket": "R1", "launchpad": "P1", "success": True, "links": {"webcast": "x"}}
+        with _StubSpaceXAPI() as stub, \
+                patch.object(c, "SPACEX_BASE_URL", stub.url), \
+                patch.object(c, "QUERY_INGESTION", True), \
+                patch.object(c, "QUERY_PAGE_SIZE", 2):
+            stub.documents["/launches"] = [dict(launch, id=f"L{i}", name=f"Launch {i}") for i in range(7)]
+            data, _ = u.fetch_data()
+
+        self.assertEqual([launch["id"] for launch in data["launches"]], [f"L{i}" for i in range(7)])
+        self.assertEqual(data["launches"][3], {"id": "L3", "name": "Launch 3", "launchpad": "P1",
+                                               "date_utc": "2020-01-01T00:00:00.000Z", "success": True, "rocket": "R1"})
+        self.assertEqual(data["rockets"], [{"id": "R1", "name": "Falcon 9", "active": True}])
+
+        queries = [request for request in stub.requests if request[0] == "/launches/query"]
+        self.assertEqual(sorted(request[3]["options"]["page"] for request in queries), [1, 2, 3, 4])
+        self.assertNotIn("links", queries[0][3]["options"]["select"])
+        self.assertFalse(any(request[0] == "/launches" for request in stub.requests))
+
+    def test_query_ingestion_fallback(self):
+        with _StubSpaceXAPI(query_enabled=False) as stub, \
+                patch.object(c, "SPACEX_BASE_URL", stub.url), \
+                patch.object(c, "QUERY_INGESTION", True):
+            data, _ = u.fetch_data()
+
+        self.assertEqual(data["launches"][0]["id"], "L1")
+        self.assertEqual(data["launchpads"][0]["rockets"], ["R1"])
+        paths = [request[0] for request in stub.requests]
+        self.assertIn("/launches/query", paths)
+        self.assertIn("/launches", paths)
+
+    def test_unconditional_when_cache_empty(self):
+        with _StubSpaceXAPI() as stub, patch.object(c, "SPACEX_BASE_URL", stub.url):
+            u.fetch_data()
+            u._DATA = {}
+            data, _ = u.refresh_data()
+            self.assertEqual(len(data["launches"]), 1)
+        self.assertTrue(all("If-None-Match" not in headers for _, _, headers in stub.requests))
+
+    def test_metrics(self):
+        with _StubSpaceXAPI() as stub, \
+                patch.object(c, "SPACEX_BASE_URL", stub.url), \
+                patch.object(metrics, "ENABLED", True):
+            requests = u._UPSTREAM_SECONDS.count(endpoint="launches", status=200)
+            misses, hits = u._CACHE_LOOKUPS.value(result="miss"), u._CACHE_LOOKUPS.value(result="hit")
+            u.fetch_data()
+            u.fetch_data()
+            u.refresh_data()
+
+            self.assertEqual(u._UPSTREAM_SECONDS.count(endpoint="launches", status=200), requests + 1)
+            self.assertGreaterEqual(u._UPSTREAM_SECONDS.count(endpoint="launches", status=304), 1)
+            self.assertEqual(u._CACHE_LOOKUPS.value(result="miss"), misses + 1)
+            self.assertEqual(u._CACHE_LOOKUPS.value(result="hit"), hits + 1)
+
+            retries = u._UPSTREAM_RETRIES.value(endpoint="missing")
+            with patch("utils.time.sleep"):
+                self.assertEqual(u._fetch_data(f"{stub.url}/missing"), [])
+            self.assertEqual(u._UPSTREAM_RETRIES.value(endpoint="missing"), retries + 2)
+            self.assertGreaterEqual(u._UPSTREAM_SECONDS.count(endpoint="missing", status=404), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+import metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(metrics, "ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counter(self):
+        counter = metrics.Counter("test_total", "Test counter", ("result",))
+        counter.inc(result="hit")
+        counter.inc(2, result="hit")
+        counter.inc(result="miss")
+        self.assertEqual(counter.value(result="hit"), 3)
+        self.assertEqual(counter.samples(), [("test_total", {"result": "hit"}, 3), ("test_total", {"result": "miss"}, 1)])
+
+    def test_histogram(self):
+        histogram = metrics.Histogram("test_seconds", "Test histogram", ("status",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value, status=200)
+        histogram.observe(0.01, status="error")
+
+        samples = {(name, tuple(labels.items())): value for name, labels, value in histogram.samples()}
+        self.assertEqual(samples[("test_seconds_bucket", (("status", "200"), ("le", "0.1")))], 2)
+        self.assertEqual(samples[("test_seconds_bucket", (("status", "200"), ("le", "1.0")))], 3)
+        self.assertEqual(samples[("test_seconds_bucket", (("status", "200"), ("le", "+Inf")))], 4)
+        self.assertEqual(samples[("test_seconds_count", (("status", "200"),))], 4)
+        self.assertAlmostEqual(samples[("test_seconds_sum", (("status", "200"),))], 5.65)
+        self.assertEqual(histogram.count(status="error"), 1)
+
+    def test_disabled(self):
+        counter = metrics.Counter("test_total", "Test counter")
+        with patch.object(metrics, "ENABLED", False):
+            counter.inc()
+            metrics.start_request()
+            with metrics.timed("work"):
+                pass
+            lock = threading.Lock()
+            self.assertIs(metrics.acquire(lock), lock)
+        self.assertEqual(counter.value(), 0)
+        self.assertIsNone(metrics.server_timing())
+
+    def test_server_timing(self):
+        metrics.start_request()
+        self.addCleanup(metrics.end_request)
+        count = metrics.OPERATION_SECONDS.count(operation="test_work")
+        with metrics.timed("test_work"):
+            pass
+        metrics.record("test_work", 0.002)
+        metrics.describe("cache", 'a "hit"')
+        with metrics.acquire(threading.Lock(), "test_lock"):
+            pass
+
+        header = metrics.server_timing()
+        entries = dict(entry.split(";", 1) for entry in header.split(", "))
+        self.assertEqual(list(entries), ["test_work", "cache", "test_lock"])
+        self.assertGreaterEqual(float(entries["test_work"][len("dur="):]), 2.0)
+        self.assertEqual(entries["cache"], 'desc="a \\"hit\\""')
+        self.assertEqual(metrics.OPERATION_SECONDS.count(operation="test_work"), count + 2)
+
+        metrics.end_request()
+        self.assertIsNone(metrics.server_timing())
+
+    def test_render(self):
+        counter = metrics.counter("test_render_total", "Rendered counter", ("path",))
+        self.assertIs(metrics.counter("test_render_total", "Rendered counter", ("path",)), counter)
+        counter.inc(path='a"b')
+        metrics.register_collector(_collect)
+
+        text = metrics.render()
+        self.assertIn("# HELP test_render_total Rendered counter\n# TYPE test_render_total counter\n", text)
+        self.assertIn('test_render_total{path="a\\"b"} 1\n', text)
+        self.assertIn("# TYPE test_collected gauge\ntest_collected 1.5\n", text)
+        self.assertTrue(text.endswith("\n"))
+
+
+def _collect():
+    yield "test_collected", "gauge", "Collected gauge", [({}, 1.5)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+
+import utils as u
+from diff import RecordDiff, SnapshotDiff
+from notifications import WebhookDispatcher
+
+
+class _StubReceiver:
+    """
+    Local webhook receiver. ``statuses`` maps a path to the status codes
+    returned by successive requests (the last one repeats), 200 by default.
+    """
+    def __init__(self, statuses=None, delay: float = 0):
+        self.statuses = statuses or {}
+        self.delay = delay
+        self.received = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with stub._lock:
+                    stub.concurrent += 1
+                    stub.max_concurrent = max(stub.max_concurrent, stub.concurrent)
+                    stub.received.append((self.path, body))
+                    statuses = stub.statuses.get(self.path, [200])
+                    status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.concurrent -= 1
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def hits(self, path: str) -> int:
+        return sum(1 for received_path, _ in self.received if received_path == path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestWebhookDispatcher(unittest.TestCase):
+
+    def _receiver(self, **kwargs) -> _StubReceiver:
+        receiver = _StubReceiver(**kwargs)
+        self.addCleanup(receiver.close)
+        return receiver
+
+    def _dispatcher(self, **kwargs) -> WebhookDispatcher:
+        options = dict(workers=4, max_attempts=3, backoff=0.01, backoff_max=0.05, timeout=2, dead_letter_file=None)
+        options.update(kwargs)
+        dispatcher = WebhookDispatcher(**options)
+        self.addCleanup(dispatcher.stop, 2)
+        return dispatcher
+
+    def test_delivers_to_every_subscriber(self):
+        receiver = self._receiver()
+        dispatcher = self._dispatcher()
+
+        queued = dispatcher.submit([f"{receiver.url}/hook/{i}" for i in range(20)], {"message": "hi"})
+
+        self.assertEqual(queued, 20)
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(len(receiver.received), 20)
+        self.assertTrue(all(body == {"message": "hi"} for _, body in receiver.received))
+        metrics = dispatcher.metrics()
+        self.assertEqual(metrics["delivered"], 20)
+        self.assertEqual(metrics["pending"], 0)
+        self.assertEqual(metrics["dead_lettered"], 0)
+
+    def test_retries_with_backoff(self):
+        receiver = self._receiver(statuses={"/flaky": [503, 500, 200]})
+        dispatcher = self._dispatcher()
+
+        dispatcher.submit([f"{receiver.url}/flaky", f"{receiver.url}/ok"], {"message": "hi"})
+
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(receiver.hits("/flaky"), 3)
+        self.assertEqual(receiver.hits("/ok"), 1)
+        metrics = dispatcher.metrics()
+        self.assertEqual(metrics["delivered"], 2)
+        self.assertEqual(metrics["retried"], 2)
+        self.assertEqual(metrics["attempts"], 4)
+
+    def test_dead_letter(self):
+        receiver = self._receiver(statuses={"/down": [500], "/gone": [410]})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dead.jsonl")
+            dispatcher = self._dispatcher(dead_letter_file=path)
+
+            dispatcher.submit([f"{receiver.url}/down", f"{receiver.url}/gone", "http://127.0.0.1:1/refused"],
+                              {"message": "hi"})
+
+            self.assertTrue(dispatcher.join(10))
+            with open(path) as f:
+                persisted = [json.loads(line) for line in f]
+
+        # retried up to max_attempts, a permanent error is not retried
+        self.assertEqual(receiver.hits("/down"), 3)
+        self.assertEqual(receiver.hits("/gone"), 1)
+        dead = {entry["url"].rsplit("/", 1)[1]: entry for entry in dispatcher.dead_letters()}
+        self.assertEqual(set(dead), {"down", "gone", "refused"})
+        self.assertEqual(dead["down"]["attempts"], 3)
+        self.assertEqual(dead["gone"]["error"], "HTTP 410")
+        self.assertEqual(dead["refused"]["payload"], {"message": "hi"})
+        self.assertEqual(len(persisted), 3)
+        self.assertEqual(dispatcher.metrics()["dead_lettered"], 3)
+
+    def test_per_host_limit(self):
+        receiver = self._receiver(delay=0.05)
+        dispatcher = self._dispatcher(workers=8, per_host=2)
+
+        dispatcher.submit([f"{receiver.url}/hook/{i}" for i in range(12)], {"message": "hi"})
+
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(len(receiver.received), 12)
+        self.assertLessEqual(receiver.max_concurrent, 2)
+
+    def test_submit_does_not_block_when_full(self):
+        receiver = self._receiver(delay=0.2)
+        dispatcher = self._dispatcher(workers=1, queue_size=2)
+
+        started = time.monotonic()
+        queued = dispatcher.submit([f"{receiver.url}/hook/{i}" for i in range(10)], {"message": "hi"})
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertLess(queued, 10)
+        self.assertTrue(dispatcher.join(5))
+        metrics = dispatcher.metrics()
+        self.assertEqual(metrics["dropped"], 10 - queued)
+        self.assertEqual(metrics["delivered"], queued)
+
+
+class TestSendNotifications(unittest.TestCase):
+
+    def test_payload_with_changes(self):
+        diff = SnapshotDiff(launches=RecordDiff(added=["L2"]))
+        with patch("utils.get_dispatcher") as mock_dispatcher:
+            u.send_notifications({"http://example.com/hook"}, diff)
+
+        subscribers, payload = mock_dispatcher.return_value.submit.call_args.args
+        self.assertEqual(subscribers, ["http://example.com/hook"])
+        self.assertEqual(payload["message"], "New data is available!")
+        self.assertEqual(payload["changes"]["launches"]["added"], ["L2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import datetime as dt
+import gc
+import unittest
+from multiprocessing import shared_memory
+from unittest.mock import patch
+
+import config as c
+import parallel
+from benchmarks.synthetic import synthetic_snapshot
+from columns import HAS_NUMPY
+
+UTC = dt.timezone.utc
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy is not installed")
+class TestParallelColumns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = parallel.ParallelColumns(3)
+        cls.snapshot = synthetic_snapshot(1001, 5, 7, seed=3)
+        cls.columns = cls.snapshot["columns"]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_filter_mask(self):
+        rockets = {rocket["id"]: rocket for rocket in self.snapshot["rockets"]}
+        launchpads = {launchpad["id"]: launchpad for launchpad in self.snapshot["launchpads"]}
+        queries = [
+            {},
+            {"start_date": dt.datetime(2012, 1, 1, tzinfo=UTC), "end_date": dt.datetime(2016, 6, 30, tzinfo=UTC)},
+            {"success": True},
+            {"success": False, "rocket_names": {"rocket 2"}},
+            {"site_names": {"launch site 3", "launch site 5"}, "start_date": dt.datetime(2014, 1, 1, tzinfo=UTC)},
+            {"rocket_names": {"no such rocket"}},
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                query = dict(query, rockets_by_id=rockets, launchpads_by_id=launchpads)
+                mask = self.executor.filter_mask(self.columns, **query)
+                self.assertEqual(mask.dtype, bool)
+                self.assertEqual(mask.tolist(), self.columns.filter_mask(**query).tolist())
+
+    def test_stats(self):
+        columns = self.columns
+        expected = (columns.rocket_totals(), columns.rocket_successes(), columns.site_totals(), columns.frequency())
+        self.assertEqual(self.executor.stats(columns), expected)
+
+    def test_chunks(self):
+        self.assertEqual(self.executor._chunks(10), [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual(self.executor._chunks(2), [(0, 1), (1, 2)])
+
+    def test_below_threshold(self):
+        executor = parallel.ParallelColumns(3, min_launches=len(self.columns) + 1)
+        self.assertFalse(executor.parallel(self.columns))
+        self.assertEqual(executor.filter_mask(self.columns, success=True).tolist(),
+                         self.columns.filter_mask(success=True).tolist())
+        executor.stats(self.columns)
+        self.assertIsNone(executor._pool)
+
+    def test_shared_block_released_with_columns(self):
+        columns = synthetic_snapshot(50, seed=4)["columns"]
+        self.executor.filter_mask(columns)
+        name = self.executor._shared[columns].block[0]
+        del columns
+        gc.collect()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_get_executor(self):
+        with patch.object(parallel, "_EXECUTOR", None), patch.object(c, "PARALLEL_WORKERS", 0):
+            self.assertIsNone(parallel.get_executor())
+        with patch.object(parallel, "_EXECUTOR", None), patch.object(c, "PARALLEL_WORKERS", 4), \
+                patch.object(c, "PARALLEL_MIN_LAUNCHES", 1000):
+            executor = parallel.get_executor()
+            self.assertIs(parallel.get_executor(), executor)
+            self.assertEqual((executor.workers, executor.min_launches), (4, 1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
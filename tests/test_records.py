@@ -0,0 +1,90 @@
+import json
+import pickle
+import unittest
+from unittest.mock import patch
+
+import config as c
+import utils as u
+from records import LaunchpadRecord, LaunchRecord, RocketRecord, compact_records, json_default
+from spacex_tracker import SpaceXData
+
+
+def _launch(i: int, rocket: str = "R1"):
+    # built at runtime so that equal ids are distinct string objects
+    return {"id": f"L{i}", "name": f"Launch {i}", "launchpad": "".join(["P", "1"]),
+            "date_utc": f"202{i}-01-01T00:00:00.000Z", "success": i % 2 == 0, "rocket": "".join(rocket)}
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_behaves_like_the_document(self):
+        document = _launch(1)
+        record = LaunchRecord.from_document(document)
+
+        self.assertEqual(record, document)
+        self.assertEqual(document, record)
+        self.assertEqual(dict(record), document)
+        self.assertEqual(list(record), list(document))
+        self.assertEqual(record["rocket"], "R1")
+        self.assertEqual(record.get("missing", 1), 1)
+        self.assertNotIn("missing", record)
+        with self.assertRaises(KeyError):
+            record["missing"]
+        with self.assertRaises(TypeError):
+            record["success"] = None
+        self.assertFalse(hasattr(record, "__dict__"))
+
+        self.assertNotEqual(record, LaunchRecord.from_document(_launch(2)))
+        self.assertNotEqual(record, dict(document, success=None))
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_same_json(self):
+        documents = [_launch(1), _launch(2)]
+        records = compact_records(documents, LaunchRecord)
+        self.assertEqual(json.dumps(records, default=json_default), json.dumps(documents))
+
+    def test_ids_are_interned(self):
+        first, second = (LaunchRecord.from_document(_launch(i)) for i in (1, 2))
+        self.assertIs(first.rocket, second.rocket)
+        self.assertIs(first.launchpad, second.launchpad)
+        pad = LaunchpadRecord.from_document({"id": "P1", "name": "Site", "status": "active",
+                                             "rockets": ["".join(["R", "1"])], "launches": []})
+        self.assertIs(pad.rockets[0], first.rocket)
+
+    def test_compact_keeps_other_documents(self):
+        documents = [{"id": "R1", "name": "Falcon 1", "active": False}, {"id": "R2", "name": "Falcon 9"}]
+        records = compact_records(documents, RocketRecord)
+        self.assertIsInstance(records[0], RocketRecord)
+        self.assertIs(records[1], documents[1])
+
+    def test_spacex_data_on_records(self):
+        documents = [_launch(i, rocket="R1" if i % 2 else "R2") for i in range(6)]
+        rockets = [{"id": "R1", "name": "Falcon 1", "active": False}, {"id": "R2", "name": "Falcon 9", "active": True}]
+        pads = [{"id": "P1", "name": "Site A", "status": "active", "rockets": ["R1"], "launches": []}]
+        plain = SpaceXData(documents, rockets, pads)
+        compact = SpaceXData(compact_records(documents, LaunchRecord), compact_records(rockets, RocketRecord),
+                             compact_records(pads, LaunchpadRecord))
+        for kwargs in [{}, {"rocket_name": "Falcon 9"}, {"success": True, "launch_site": "site a"}]:
+            self.assertEqual([launch.to_dict() for launch in compact.filter_launches(**kwargs)],
+                             [launch.to_dict() for launch in plain.filter_launches(**kwargs)])
+        self.assertEqual(compact.success_rate_by_rocket("Falcon 9"), plain.success_rate_by_rocket("Falcon 9"))
+        self.assertEqual(compact.launch_frequency("yearly"), plain.launch_frequency("yearly"))
+
+
+class TestIngestion(unittest.TestCase):
+
+    def test_projection(self):
+        documents = [dict(_launch(1), details="dropped"), {"id": "L2"}]
+        with patch.object(c, "COMPACT_RECORDS", True):
+            records = u._project(documents, u._LAUNCH_FIELDS)
+        with patch.object(c, "COMPACT_RECORDS", False):
+            dicts = u._project(documents, u._LAUNCH_FIELDS)
+
+        self.assertIsInstance(records[0], LaunchRecord)
+        self.assertIs(type(dicts[0]), dict)
+        self.assertEqual(records, dicts)
+        self.assertEqual(u._fingerprint({"launches": records}), u._fingerprint({"launches": dicts}))
+
+
+if __name__ == '__main__':
+    unittest.main()
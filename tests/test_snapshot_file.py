@@ -0,0 +1,203 @@
+import datetime as dt
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import config as c
+import utils as u
+from columns import HAS_NUMPY, build_launch_columns
+from snapshot_file import SnapshotFile, read_header, read_snapshot, write_snapshot
+from spacex_tracker import SpaceXData
+
+
+def _data(n: int = 5):
+    launches = [{"id": f"L{i}", "name": f"Launch {i}", "date_utc": f"202{i}-01-01T00:00:00.000Z",
+                 "rocket": "R1" if i % 2 else "R2", "launchpad": "P1", "success": i % 3 != 0}
+                for i in range(n)]
+    launches.append({"id": "bad", "date_utc": "not a date", "rocket": None, "launchpad": "P1", "success": None})
+    return {
+        "launches": launches,
+        "rockets": [{"id": "R1", "name": "Falcon 1"}, {"id": "R2", "name": "Falcon 9"}],
+        "launchpads": [{"id": "P1", "name": "Site A"}],
+        "columns": build_launch_columns(launches),
+        "fingerprint": "f1",
+    }
+
+
+def _try_lock(path: str) -> bool:
+    return SnapshotFile(path).try_become_writer()
+
+
+class TestSnapshotFile(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(tmp.name, "snapshot.bin")
+
+    def test_round_trip(self):
+        data = _data()
+        write_snapshot(self.path, data, 7)
+        loaded = read_snapshot(self.path)
+
+        for key in ("launches", "rockets", "launchpads"):
+            self.assertEqual(loaded[key], data[key])
+        self.assertEqual(loaded["version"], 7)
+        self.assertEqual(loaded["fingerprint"], "f1")
+        # no temporary file is left behind
+        self.assertEqual(os.listdir(self.dir), ["snapshot.bin"])
+
+        original = SpaceXData(data["launches"], data["rockets"], data["launchpads"], columns=data["columns"])
+        shared = SpaceXData(loaded["launches"], loaded["rockets"], loaded["launchpads"], columns=loaded.get("columns"))
+        for kwargs in [{}, {"rocket_name": "Falcon 9"}, {"success": False},
+                       {"start_date": dt.datetime(2022, 1, 1, tzinfo=dt.timezone.utc)}]:
+            self.assertEqual(shared.filter_launches(**kwargs), original.filter_launches(**kwargs))
+        self.assertEqual(shared.launch_frequency("yearly"), original.launch_frequency("yearly"))
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy is not installed")
+    def test_columns_are_memory_mapped(self):
+        write_snapshot(self.path, _data(), 1)
+        columns = read_snapshot(self.path)["columns"]
+
+        self.assertFalse(columns.dates.flags.writeable)
+        self.assertFalse(columns.dates.flags.owndata)
+        # an incremental update copies instead of writing to the mapping
+        launches = _data()["launches"] + _data(7)["launches"][5:7]
+        updated = columns.updated(launches, [], len(columns))
+        self.assertEqual(len(updated), 8)
+        self.assertEqual(updated.rocket_totals(), {"R1": 3, "R2": 4})
+
+    def test_invalid_files(self):
+        self.assertIsNone(read_snapshot(self.path))
+        with open(self.path, "wb") as f:
+            f.write(b"garbage")
+        self.assertIsNone(read_snapshot(self.path))
+
+        write_snapshot(self.path, _data(), 1)
+        with open(self.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.path) - 16)
+        self.assertIsNone(read_snapshot(self.path))
+
+    def test_load_if_changed(self):
+        writer, reader = SnapshotFile(self.path), SnapshotFile(self.path)
+        self.assertIsNone(reader.load_if_changed())
+
+        writer.write(_data(), 1)
+        self.assertEqual(reader.load_if_changed()["version"], 1)
+        self.assertIsNone(reader.load_if_changed())
+        # the writer does not reload its own version
+        self.assertIsNone(writer.load_if_changed())
+
+        writer.write(_data(3), 2)
+        self.assertEqual(len(reader.load_if_changed()["launches"]), 4)
+
+    def test_single_writer(self):
+        writer = SnapshotFile(self.path)
+        self.assertTrue(writer.try_become_writer())
+        self.assertTrue(writer.try_become_writer())
+        with multiprocessing.get_context("fork").Pool(2) as pool:
+            self.assertEqual(pool.map(_try_lock, [self.path] * 2), [False, False])
+
+
+class TestSharedSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "snapshot.bin")
+        patchers = [patch.object(c, "SNAPSHOT_FILE", self.path), patch.object(c, "SNAPSHOT_POLL_INTERVAL", 0),
+                    patch("utils._SNAPSHOT_FILE", None)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        u._DATA = {}
+        u._TIMESTAMP = dt.datetime(1453, 5, 29)
+        self.addCleanup(setattr, u, "_DATA", {})
+
+    def _download(self, n: int):
+        data = _data(n)
+        return {key: data[key] for key in ("launches", "rockets", "launchpads")}
+
+    def test_writer_publishes_and_followers_load(self):
+        with patch("utils._download_data", return_value=self._download(5)):
+            data, diff = u.fetch_data()
+        self.assertTrue(diff)
+        self.assertTrue(os.path.exists(self.path))
+        writer = u._SNAPSHOT_FILE
+
+        # another worker: starts from the file, without the network
+        u._SNAPSHOT_FILE = None
+        u._DATA = {}
+        with patch("utils._download_data") as mock_download:
+            shared, diff = u.fetch_data()
+            mock_download.assert_not_called()
+        self.assertFalse(u._SNAPSHOT_FILE.is_writer)
+        self.assertEqual(shared["launches"], data["launches"])
+        self.assertEqual(shared["fingerprint"], data["fingerprint"])
+        self.assertTrue(diff)
+
+        # the writer publishes a new version, the follower picks it up
+        with patch("utils._download_data") as mock_download:
+            self.assertIs(u.fetch_data()[0], shared)
+            writer.write(dict(self._download(6), fingerprint="f2"), 2)
+            updated, diff = u.fetch_data()
+            # refreshing only reads the file
+            self.assertEqual(u.refresh_data(), (updated, u.NO_CHANGES))
+            mock_download.assert_not_called()
+        self.assertEqual(len(updated["launches"]), 7)
+        self.assertEqual(diff.launches.added, ["L5"])
+
+
+    def test_follower_never_downloads(self):
+        with patch("utils._download_data", return_value=self._download(5)):
+            data, _ = u.fetch_data()
+        writer = u._SNAPSHOT_FILE
+        self.assertTrue(writer.is_writer)
+
+        # another worker, its copy expired: the writer holds the lock
+        u._SNAPSHOT_FILE = None
+        u._DATA = {}
+        with patch("utils._download_data") as mock_download:
+            shared, _ = u.fetch_data()
+            u._TIMESTAMP = dt.datetime.now() - dt.timedelta(seconds=c.CACHE_EXPIRY + 1)
+            self.assertIs(u.fetch_data()[0], shared)
+            self.assertIs(u.refresh_data()[0], shared)
+            mock_download.assert_not_called()
+        follower = u._SNAPSHOT_FILE
+        self.assertFalse(follower.is_writer)
+
+        # the writer revalidates an unchanged snapshot: the file is touched,
+        # the follower's copy is fresh again without reloading it
+        u._SNAPSHOT_FILE, follower_data = writer, u._DATA
+        u._DATA = data
+        with patch("utils._download_data", return_value=self._download(5)):
+            self.assertEqual(u.refresh_data(), (data, u.NO_CHANGES))
+        self.assertEqual(read_header(self.path)["version"], data["version"])
+
+        u._SNAPSHOT_FILE, u._DATA = follower, follower_data
+        u._TIMESTAMP = dt.datetime.now() - dt.timedelta(seconds=c.CACHE_EXPIRY + 1)
+        with patch("utils._download_data") as mock_download, patch("snapshot_file.read_snapshot") as mock_read:
+            self.assertEqual(u.fetch_data(), (shared, u.NO_CHANGES))
+            mock_download.assert_not_called()
+            mock_read.assert_not_called()
+        self.assertLess(u.snapshot_age(), 5)
+
+    def test_follower_waits_for_the_first_version(self):
+        writer = SnapshotFile(self.path)
+        self.assertTrue(writer.try_become_writer())
+
+        with patch("utils._download_data") as mock_download:
+            data, diff = u.fetch_data()
+            mock_download.assert_not_called()
+        self.assertFalse(data["launches"])
+        self.assertFalse(u.is_ready())
+
+        writer.write(dict(self._download(2), fingerprint="f1"), 1)
+        data, diff = u.fetch_data()
+        self.assertEqual(len(data["launches"]), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,20 @@
 import unittest
+import contextlib
+import csv
 import datetime
-from spacex_tracker import SpaceXData
+import io
+import json
+import os
+import random
+import tempfile
+from unittest.mock import patch
+
+import config as c
+import parallel
+from columns import HAS_NUMPY, build_launch_columns
+from diff import SnapshotDiff, diff_records
+from snapshot_file import read_snapshot, write_snapshot
+from spacex_tracker import SpaceXData, main
 
 class TestSpaceXTracker(unittest.TestCase):
     def setUp(self):
@@ -82,6 +96,214 @@ class TestSpaceXTracker(unittest.TestCase):
         filtered = self.spacex_data.filter_launches(success=False)
         self.assertEqual(len(filtered), 1)
 
+    def test_filter_combined(self):
+        filtered = self.spacex_data.filter_launches(
+            start_date=datetime.datetime(2020, 1, 15),
+            rocket_name="falcon 1",
+            success=True,
+            launch_site="Launch Site A"
+        )
+        self.assertEqual([launch["date_utc"] for launch in filtered], ["2020-03-01T00:00:00.000Z"])
+
+        filtered = self.spacex_data.filter_launches(rocket_name="Falcon 9", launch_site="Launch Site A")
+        self.assertEqual(len(filtered), 0)
+
+    def test_filter_keeps_source_order(self):
+        self.spacex_data.launches = list(reversed(self.spacex_data.launches))
+        filtered = self.spacex_data.filter_launches(start_date=datetime.datetime(2020, 1, 1))
+        self.assertEqual([launch["date_utc"] for launch in filtered],
+                         [launch["date_utc"] for launch in self.spacex_data.launches])
+
+    def test_index_rebuilt_on_reassign(self):
+        self.assertEqual(len(self.spacex_data.filter_launches(rocket_name="Falcon 9")), 1)
+
+        self.spacex_data.rockets = [{"id": "rocket1", "name": "Falcon 9"}]
+        self.assertEqual(len(self.spacex_data.filter_launches(rocket_name="Falcon 9")), 2)
+
+        self.spacex_data.launches = self.spacex_data.launches[:1]
+        self.assertEqual(len(self.spacex_data.filter_launches(rocket_name="Falcon 9")), 1)
+
+    def test_get_by_id(self):
+        self.assertEqual(self.spacex_data.get_rocket_by_id("rocket2")["name"], "Falcon 9")
+        self.assertEqual(self.spacex_data.get_rocket_by_id("rocket3"), {})
+        self.assertEqual(self.spacex_data.get_launchpad_by_id("pad1")["name"], "Launch Site A")
+        self.assertEqual(self.spacex_data.get_launchpad_by_id(None), {})
+
+    def test_launch_view(self):
+        launch = self.spacex_data.filter_launches(rocket_name="Falcon 9")[0]
+        self.assertEqual(launch["rocket"], "rocket2")
+        self.assertEqual(launch.rocket_name, "Falcon 9")
+        self.assertEqual(launch.launchpad_name, "Launch Site B")
+        with self.assertRaises(TypeError):
+            launch["rocket"] = "Falcon 9"
+
+        exported = launch.to_dict(include_id=False)
+        self.assertEqual(exported, {
+            "date_utc": "2020-02-01T00:00:00.000Z",
+            "rocket": "Falcon 9",
+            "launchpad": "Launch Site B",
+            "success": False
+        })
+        # the stored launch is untouched
+        self.assertEqual(self.spacex_data.launches[1]["rocket"], "rocket2")
+
+        self.spacex_data.launches[1]["rocket"] = "rocket3"
+        self.assertEqual(launch.rocket_name, "Unknown")
+
+    def test_from_snapshot_reuses_instance(self):
+        data = {"launches": [], "rockets": [], "launchpads": []}
+        first = SpaceXData.from_snapshot(data)
+        self.assertIs(SpaceXData.from_snapshot(data), first)
+        self.assertIsNot(SpaceXData.from_snapshot(dict(data)), first)
+
+    def _snapshot(self, launches, version, previous=None):
+        data = {"launches": launches, "rockets": self.spacex_data.rockets, "launchpads": self.spacex_data.launchpads,
+                "version": version}
+        if previous is not None:
+            data["launches"], launch_diff = diff_records(previous["launches"], launches)
+            data["diff"] = SnapshotDiff(launches=launch_diff, base_version=previous["version"], version=version)
+        if self.spacex_data.columnar:
+            data["columns"] = build_launch_columns(data["launches"])
+        return data
+
+    def test_from_snapshot_incremental(self):
+        first = self._snapshot(self.spacex_data.launches, 1)
+        old = SpaceXData.from_snapshot(first)
+        old.filter_launches(success=True)
+        old.stats()
+
+        launches = [dict(launch) for launch in self.spacex_data.launches]
+        launches[0]["success"] = None
+        launches[1]["date_utc"] = "2021-02-01T00:00:00.000Z"
+        launches[2]["date_utc"] = "not a date"
+        launches.append({"date_utc": "2020-02-15T00:00:00.000Z", "rocket": "rocket2", "launchpad": "pad1", "success": True})
+        second = self._snapshot(launches, 2, previous=first)
+        self.assertTrue(second["diff"].launches.in_place)
+
+        new = SpaceXData.from_snapshot(second)
+        fresh = SpaceXData(second["launches"], second["rockets"], second["launchpads"], columns=second.get("columns"))
+        self.assertIsNot(new, old)
+        self.assertIs(new.rockets, old.rockets)
+        if not self.spacex_data.columnar:
+            # carried over from the previous version instead of rebuilt
+            self.assertIsNotNone(new._launch_index)
+            self.assertIsNotNone(new._stats)
+
+        utc = datetime.timezone.utc
+        for kwargs in [{}, {"success": True}, {"success": False}, {"rocket_name": "Falcon 9"},
+                       {"start_date": datetime.datetime(2020, 2, 1, tzinfo=utc), "end_date": datetime.datetime(2021, 1, 1, tzinfo=utc)},
+                       {"launch_site": "Launch Site A", "success": True}]:
+            self.assertEqual(new.filter_launches(**kwargs), fresh.filter_launches(**kwargs), kwargs)
+            self.assertEqual(list(new.iter_launches(**kwargs)), list(fresh.iter_launches(**kwargs)), kwargs)
+        for period in ("monthly", "yearly"):
+            self.assertEqual(new.launch_frequency(period), fresh.launch_frequency(period))
+        self.assertEqual(new.success_rate_by_rocket("Falcon 9"), fresh.success_rate_by_rocket("Falcon 9"))
+        self.assertEqual(new.launches_by_site("Launch Site A"), fresh.launches_by_site("Launch Site A"))
+
+        # the previous version is left untouched
+        self.assertEqual(len(old.filter_launches(success=True)), 2)
+        self.assertEqual(old.launch_frequency("yearly"), {"2020": 3})
+
+    def test_iter_launches_keyset(self):
+        self.spacex_data.launches = [
+            {"id": "c", "date_utc": "2020-03-01T00:00:00.000Z", "rocket": "rocket1", "launchpad": "pad1", "success": True},
+            {"id": "b", "date_utc": "2020-01-01T00:00:00.000Z", "rocket": "rocket2", "launchpad": "pad2", "success": False},
+            {"id": "a", "date_utc": "2020-03-01T00:00:00.000Z", "rocket": "rocket1", "launchpad": "pad2", "success": True},
+            {"id": "d", "date_utc": "invalid", "rocket": "rocket1", "launchpad": "pad1", "success": True},
+            {"id": "e", "date_utc": "2019-12-01T00:00:00.000Z", "rocket": "rocket1", "launchpad": "pad1", "success": True},
+        ]
+
+        # ordered by date, ties broken by id
+        self.assertEqual([launch["id"] for launch in self.spacex_data.iter_launches()], ["e", "b", "a", "c"])
+
+        # resuming after a cursor, including one in the middle of a tie
+        after = SpaceXData.launch_key(self.spacex_data.launches[2])
+        self.assertEqual([launch["id"] for launch in self.spacex_data.iter_launches(after=after)], ["c"])
+        after = SpaceXData.launch_key(self.spacex_data.launches[1])
+        self.assertEqual([launch["id"] for launch in self.spacex_data.iter_launches(rocket_name="Falcon 1", after=after)],
+                         ["a", "c"])
+
+        # same matches as filter_launches
+        utc = datetime.timezone.utc
+        for kwargs in [{"success": True}, {"launch_site": "Launch Site B"}, {"rocket_name": ["falcon 9"]},
+                       {"start_date": datetime.datetime(2020, 1, 1, tzinfo=utc), "end_date": datetime.datetime(2020, 2, 1, tzinfo=utc)}]:
+            self.assertEqual(sorted(launch["id"] for launch in self.spacex_data.iter_launches(**kwargs)),
+                             sorted(launch["id"] for launch in self.spacex_data.filter_launches(**kwargs)), kwargs)
+
+    def test_count_launches(self):
+        utc = datetime.timezone.utc
+        for kwargs in [{}, {"success": True}, {"success": False}, {"rocket_name": "Falcon 1"},
+                       {"launch_site": ["Launch Site B", "unknown"]},
+                       {"start_date": datetime.datetime(2020, 1, 15, tzinfo=utc)},
+                       {"end_date": datetime.datetime(2020, 2, 1, tzinfo=utc), "success": True}]:
+            self.assertEqual(self.spacex_data.count_launches(**kwargs), len(self.spacex_data.filter_launches(**kwargs)), kwargs)
+
+    def test_group_launches(self):
+        self.assertEqual(self.spacex_data.group_launches(), [{"launches": 3, "successes": 2, "success_rate": 2 / 3 * 100}])
+        self.assertEqual(self.spacex_data.group_launches(["rocket", "quarter"]), [
+            {"rocket": "Falcon 1", "quarter": 1, "launches": 2, "successes": 2, "success_rate": 100.0},
+            {"rocket": "Falcon 9", "quarter": 1, "launches": 1, "successes": 0, "success_rate": 0.0},
+        ])
+        self.assertEqual(self.spacex_data.group_launches("month", launch_site="launch site a", success=True),
+                         [{"month": 1, "launches": 1, "successes": 1, "success_rate": 100.0},
+                          {"month": 3, "launches": 1, "successes": 1, "success_rate": 100.0}])
+        self.assertEqual(self.spacex_data.group_launches("year", rocket_name="unknown"), [])
+        with self.assertRaises(ValueError):
+            self.spacex_data.group_launches("decade")
+
+    def test_group_launches_matches_filter(self):
+        rng = random.Random(3)
+        start = datetime.datetime(2019, 12, 25, tzinfo=datetime.timezone.utc)
+        self.spacex_data.launches = [
+            {"id": str(i), "date_utc": (start + datetime.timedelta(hours=rng.randrange(24 * 30))).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+             "rocket": rng.choice(["rocket1", "rocket2", "missing"]), "launchpad": rng.choice(["pad1", "pad2"]),
+             "success": rng.choice([True, False, None])}
+            for i in range(300)
+        ] + [{"id": "bad", "date_utc": "not a date", "rocket": "rocket1", "launchpad": "pad1", "success": True}]
+
+        for _ in range(100):
+            kwargs = {}
+            if rng.random() < 0.6:
+                kwargs["start_date"] = start + datetime.timedelta(minutes=rng.choice([0, 30, 24 * 60]) + 24 * 60 * rng.randrange(30))
+            if rng.random() < 0.6:
+                kwargs["end_date"] = start + datetime.timedelta(minutes=rng.choice([0, 30, 24 * 60 - 1]) + 24 * 60 * rng.randrange(30),
+                                                                microseconds=rng.choice([0, 59999999]))
+            if rng.random() < 0.3:
+                kwargs["success"] = rng.choice([True, False])
+            if rng.random() < 0.3:
+                kwargs["rocket_name"] = "Falcon 9"
+            if rng.random() < 0.3:
+                kwargs["launch_site"] = "Launch Site B"
+            group_by = rng.sample(["rocket", "site", "year", "month", "quarter", "week", "success"], rng.randrange(3))
+
+            expected = {}
+            for launch in self.spacex_data.filter_launches(**kwargs):
+                date = datetime.datetime.strptime(launch["date_utc"], "%Y-%m-%dT%H:%M:%S.000Z")
+                values = {"rocket": launch.rocket_name, "site": launch.launchpad_name, "year": date.year, "month": date.month,
+                          "quarter": (date.month - 1) // 3 + 1, "week": date.isocalendar()[1], "success": launch["success"]}
+                counts = expected.setdefault(tuple(values[dimension] for dimension in group_by), [0, 0])
+                counts[0] += 1
+                counts[1] += bool(launch["success"])
+            rows = self.spacex_data.group_launches(group_by, **kwargs)
+            self.assertEqual({tuple(row[dimension] for dimension in group_by): [row["launches"], row["successes"]]
+                              for row in rows if row["launches"]}, expected, (group_by, kwargs))
+
+    def test_query_cache(self):
+        before = SpaceXData.query_cache_info()
+        first = self.spacex_data.filter_launches(rocket_name=["Falcon 9", "falcon 1"], success=True)
+        # same query, differently spelled
+        second = self.spacex_data.filter_launches(rocket_name=[" FALCON 1", "Falcon 9", "Falcon 9"], success=True)
+        after = SpaceXData.query_cache_info()
+
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+        # reassigning the data invalidates cached results
+        self.spacex_data.launches = self.spacex_data.launches[:1]
+        self.assertEqual(len(self.spacex_data.filter_launches(rocket_name=["Falcon 9", "Falcon 1"], success=True)), 1)
+
     def test_calc_success_rate(self):
         rates = self.spacex_data.success_rate_by_rocket("Falcon 1")
         self.assertAlmostEqual(rates, 100.0)
@@ -112,5 +334,148 @@ class TestSpaceXTracker(unittest.TestCase):
         freq = self.spacex_data.launch_frequency(period="yearly")
         self.assertEqual(freq, {"2020": 3})
 
+        freq = self.spacex_data.launch_frequency(period="weekly")
+        self.assertEqual(freq, {})
+
+    def test_stats_memoized(self):
+        stats = self.spacex_data.stats()
+        self.assertIs(self.spacex_data.stats(), stats)
+        self.assertEqual(stats.rocket_totals, {"rocket1": 2, "rocket2": 1})
+
+        # utc offsets are not accepted by the filters but still counted by frequency
+        self.spacex_data.launches = self.spacex_data.launches + [
+            {"date_utc": "2021-04-01T00:00:00+02:00", "rocket": "rocket2", "launchpad": "pad2", "success": True}
+        ]
+        self.assertIsNot(self.spacex_data.stats(), stats)
+        self.assertEqual(self.spacex_data.launch_frequency("yearly"), {"2020": 3, "2021": 1})
+        self.assertAlmostEqual(self.spacex_data.success_rate_by_rocket("Falcon 9"), 0.0)
+        self.assertEqual(self.spacex_data.launches_by_site("Launch Site B"), 1)
+
+@unittest.skipUnless(HAS_NUMPY, "numpy is not installed")
+class TestSpaceXTrackerColumnar(TestSpaceXTracker):
+    """
+    Same tests, run against the numpy columnar backend.
+    """
+    def setUp(self):
+        super().setUp()
+        self.spacex_data.columnar = True
+
+    def test_columns_used(self):
+        self.spacex_data.filter_launches()
+        self.assertIsNotNone(self.spacex_data._columns)
+        self.assertEqual(len(self.spacex_data._columns), 3)
+
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy is not installed")
+class TestSpaceXTrackerParallel(TestSpaceXTrackerColumnar):
+    """
+    Same tests, with the column filters and statistics evaluated by a pool
+    of worker processes.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = parallel.ParallelColumns(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        super().setUp()
+        for patcher in (patch.object(parallel, "_EXECUTOR", self.executor), patch.object(c, "PARALLEL_WORKERS", 2)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_columns_used(self):
+        super().test_columns_used()
+        self.assertIn(self.spacex_data._columns, self.executor._shared)
+
+class TestCLI(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.data = {
+            "launches": [
+                {"id": f"L{i}", "name": f"Launch {i}", "launchpad": f"P{i % 2}",
+                 "date_utc": f"20{10 + i:02d}-01-01T00:00:00.000Z", "success": i % 3 != 0, "rocket": f"R{i % 2}"}
+                for i in range(6)
+            ],
+            "rockets": [{"id": "R0", "name": "Falcon 1", "active": False}, {"id": "R1", "name": "Falcon 9", "active": True}],
+            "launchpads": [{"id": "P0", "name": "Site A", "status": "active", "rockets": [], "launches": []},
+                           {"id": "P1", "name": "Site B", "status": "active", "rockets": [], "launches": []}],
+        }
+        self.snapshot = os.path.join(self.dir, "snapshot.bin")
+        write_snapshot(self.snapshot, self.data, 1)
+
+    def _run(self, *argv: str) -> str:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), patch("spacex_tracker.fetch_data") as mock_fetch:
+            main(list(argv))
+        mock_fetch.assert_not_called()
+        return out.getvalue()
+
+    def _queries(self, content: str) -> str:
+        path = os.path.join(self.dir, "queries.jsonl")
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_offline_report(self):
+        output = self._run("--snapshot", self.snapshot, "--rocket", "Falcon 9")
+        self.assertIn("Total Launches: 6\n", output)
+        self.assertIn("Total Launches after filtering: 3\n", output)
+        self.assertIn("Site A: 3", output)
+
+    def test_batch_json(self):
+        queries = self._queries('# comment\n{"name": "f9", "rocket": "falcon 9", "success": true}\n\n'
+                                '{"start_date": "2012-01-01", "site": ["Site A"]}\n')
+        lines = self._run("--snapshot", self.snapshot, "--queries", queries, "--format", "json").splitlines()
+
+        results = [json.loads(line) for line in lines]
+        self.assertEqual([result["query"] for result in results], ["f9", "2"])
+        self.assertEqual(results[0]["count"], 2)
+        self.assertEqual([launch["id"] for launch in results[0]["launches"]], ["L1", "L5"])
+        self.assertEqual(results[0]["launches"][0]["rocket"], "Falcon 9")
+        self.assertEqual(results[1]["filters"], {"start_date": "2012-01-01T00:00:00+00:00", "site": ["Site A"]})
+        self.assertEqual([launch["id"] for launch in results[1]["launches"]], ["L2", "L4"])
+
+        # same matches as separate filter_launches calls
+        spacex_data = SpaceXData(self.data["launches"], self.data["rockets"], self.data["launchpads"])
+        self.assertEqual(results[0]["count"], len(spacex_data.filter_launches(rocket_name="falcon 9", success=True)))
+
+        counts = self._run("--snapshot", self.snapshot, "--queries", queries, "--format", "json", "--counts-only")
+        self.assertEqual([json.loads(line)["count"] for line in counts.splitlines()], [2, 2])
+        self.assertEqual(self._run("--snapshot", self.snapshot, "--queries", queries), "f9: 2\n2: 2\n")
+
+    def test_batch_csv(self):
+        queries = self._queries('[{"name": "all"}, {"name": "failed", "success": "false"}]')
+        rows = list(csv.DictReader(io.StringIO(self._run("--snapshot", self.snapshot, "--queries", queries,
+                                                         "--format", "csv"))))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual([row["id"] for row in rows if row["query"] == "failed"], ["L0", "L3"])
+        self.assertEqual(rows[0]["launchpad"], "Site A")
+
+        counts = self._run("--snapshot", self.snapshot, "--queries", queries, "--format", "csv", "--counts-only")
+        self.assertEqual(counts.splitlines(), ["query,count", "all,6", "failed,2"])
+
+    def test_invalid_queries(self):
+        for content in ('{"rocket": "Falcon 9", "color": "red"}', '{"success": "maybe"}', "not json"):
+            with self.subTest(content=content), contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    self._run("--snapshot", self.snapshot, "--queries", self._queries(content))
+
+    def test_save_snapshot(self):
+        saved = os.path.join(self.dir, "saved.bin")
+        with patch("spacex_tracker.fetch_data", return_value=(self.data, None)), \
+                contextlib.redirect_stdout(io.StringIO()):
+            main(["--save-snapshot", saved])
+        snapshot = read_snapshot(saved)
+        self.assertEqual([launch["id"] for launch in snapshot["launches"]], [f"L{i}" for i in range(6)])
+        self.assertEqual(self._run("--snapshot", saved, "--queries", self._queries('{"site": "Site B"}')), "1: 3\n")
+
+
 if __name__ == "__main__":
     unittest.main()
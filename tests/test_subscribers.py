@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import app as a
+from diff import NO_CHANGES, RecordDiff, SnapshotDiff
+from subscribers import MemorySubscriberStore, SQLiteSubscriberStore, SubscriberStore, create_store
+
+
+def _claim(path: str, owner: str) -> bool:
+    return SQLiteSubscriberStore(path).claim_notification("f1", 1, owner=owner, ttl=0.5)
+
+
+class TestMemorySubscriberStore(unittest.TestCase):
+
+    def _store(self):
+        return MemorySubscriberStore()
+
+    def test_incomplete_store_cannot_be_built(self):
+        class NoLeaseStore(SubscriberStore):
+            def add(self, url): pass
+            def remove(self, url): pass
+            def all(self): return set()
+            def notified(self): return None, 0
+
+        with self.assertRaises(TypeError):
+            NoLeaseStore()
+
+    def test_subscribers(self):
+        store = self._store()
+        store.add("http://a/hook")
+        store.add("http://b/hook")
+        store.add("http://a/hook")
+        self.assertEqual(store.all(), {"http://a/hook", "http://b/hook"})
+        self.assertEqual(len(store), 2)
+
+        store.remove("http://a/hook")
+        self.assertEqual(store.all(), {"http://b/hook"})
+
+    def test_claim_notification(self):
+        store = self._store()
+
+        self.assertEqual(store.notified(), (None, 0))
+        self.assertTrue(store.claim_notification("f1", 1, owner="w1", ttl=0.2))
+        # already notified
+        self.assertFalse(store.claim_notification("f1", 1, owner="w1", ttl=0.2))
+        self.assertEqual(store.notified(), ("f1", 1))
+        # w1 holds the lease
+        self.assertFalse(store.claim_notification("f2", 2, owner="w2", ttl=0.2))
+        self.assertTrue(store.claim_notification("f2", 2, owner="w1", ttl=0.2))
+
+        # the lease is taken over once it expires
+        time.sleep(0.25)
+        self.assertTrue(store.claim_notification("f3", 3, owner="w2", ttl=0.2))
+        self.assertFalse(store.claim_notification("f4", 4, owner="w1", ttl=0.2))
+
+    def test_older_snapshot_is_not_notified(self):
+        store = self._store()
+        self.assertTrue(store.claim_notification("f2", 20, owner="w1", ttl=0))
+
+        # a worker still holding the previous snapshot, once the lease expired
+        self.assertFalse(store.claim_notification("f1", 10, owner="w2", ttl=0))
+        # the same content downloaded again later by another worker
+        self.assertFalse(store.claim_notification("f2", 30, owner="w2", ttl=0))
+        self.assertEqual(store.notified(), ("f2", 20))
+        # newer content
+        self.assertTrue(store.claim_notification("f3", 40, owner="w2", ttl=0))
+
+class TestSQLiteSubscriberStore(TestMemorySubscriberStore):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "subscribers.db")
+
+    def _store(self):
+        return create_store(self.path)
+
+    def test_shared_between_stores(self):
+        # two workers opening the same file
+        first, second = self._store(), self._store()
+        first.add("http://a/hook")
+        self.assertEqual(second.all(), {"http://a/hook"})
+
+        self.assertTrue(first.claim_notification("f1", 1, owner="w1"))
+        self.assertFalse(second.claim_notification("f1", 1, owner="w2"))
+        self.assertEqual(second.notified(), ("f1", 1))
+
+        # reopened on next use
+        first.close()
+        self.assertEqual(first.all(), {"http://a/hook"})
+
+    def test_single_claim_across_processes(self):
+        store = self._store()
+        store.all()  # create the schema
+        store.close()
+        with multiprocessing.get_context("fork").Pool(4) as pool:
+            claims = pool.starmap(_claim, [(self.path, f"w{i}") for i in range(8)])
+        self.assertEqual(claims.count(True), 1)
+
+
+class TestAppNotify(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemorySubscriberStore()
+        self.store.add("http://a/hook")
+        patchers = [patch("app._STORE", self.store), patch("app._PENDING_DIFF", NO_CHANGES),
+                    patch("app.send_notifications")]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _diff(self, *added):
+        return SnapshotDiff(launches=RecordDiff(added=list(added)))
+
+    def test_notifies_once_per_snapshot(self):
+        data = {"launches": [], "rockets": [], "launchpads": [], "fingerprint": "f1", "revision": 1}
+
+        a._notify(data, self._diff("L1"))
+        a._notify(data, NO_CHANGES)
+
+        a.send_notifications.assert_called_once()
+        subscribers, diff = a.send_notifications.call_args.args
+        self.assertEqual(subscribers, {"http://a/hook"})
+        self.assertEqual(diff.launches.added, ["L1"])
+
+    def test_already_notified_by_another_worker(self):
+        self.store.claim_notification("f1", 1, owner="other", ttl=0)
+
+        a._notify({"fingerprint": "f1", "revision": 1}, self._diff("L1"))
+
+        a.send_notifications.assert_not_called()
+        self.assertFalse(a._PENDING_DIFF)
+
+    def test_older_snapshot_after_newer_one(self):
+        # another worker notified f2, then its lease expired
+        self.store.claim_notification("f2", 2, owner="other", ttl=0)
+
+        a._notify({"fingerprint": "f1", "revision": 1}, self._diff("L1"))
+
+        a.send_notifications.assert_not_called()
+        # the stale changes are dropped, not sent once this worker catches up
+        self.assertFalse(a._PENDING_DIFF)
+        a._notify({"fingerprint": "f3", "revision": 3}, self._diff("L3"))
+        self.assertEqual(a.send_notifications.call_args.args[1].launches.added, ["L3"])
+
+    def test_pending_until_lease_is_free(self):
+        self.store.claim_notification("f0", 0, owner="other", ttl=0.2)
+
+        a._notify({"fingerprint": "f1", "revision": 1}, self._diff("L1"))
+        a._notify({"fingerprint": "f2", "revision": 2}, self._diff("L2"))
+        a.send_notifications.assert_not_called()
+
+        time.sleep(0.25)
+        a._notify({"fingerprint": "f2", "revision": 2}, NO_CHANGES)
+        a.send_notifications.assert_called_once()
+        self.assertEqual(a.send_notifications.call_args.args[1].launches.added, ["L1", "L2"])
+
+    def test_only_the_refresher_notifies(self):
+        # the shared snapshot file is written by another worker
+        with patch("app.is_refresher", return_value=False):
+            a._notify({"fingerprint": "f1", "revision": 1}, self._diff("L1"))
+            a.send_notifications.assert_not_called()
+            self.assertTrue(a._PENDING_DIFF)
+
+            # dropped once the writer notified it
+            self.store.claim_notification("f1", 1, owner="writer", ttl=0)
+            a._notify({"fingerprint": "f1", "revision": 1}, NO_CHANGES)
+            a.send_notifications.assert_not_called()
+            self.assertFalse(a._PENDING_DIFF)
+
+if __name__ == '__main__':
+    unittest.main()
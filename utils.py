@@ -1,130 +1,710 @@
 import time
 import random
+import re
+import functools
+import hashlib
+import json
 import datetime as dt
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from threading import Lock
-from typing import List, Dict, Any, Tuple, Optional, Set
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock, Event, Thread
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Tuple, Optional, Set
 
 import requests
 
 import config as c
+import metrics
+from breaker import CircuitBreaker
+from diff import RecordDiff, SnapshotDiff, NO_CHANGES, diff_records
+from notifications import get_dispatcher
+from records import LaunchpadRecord, LaunchRecord, RocketRecord, json_default
 
+if TYPE_CHECKING:  # snapshot_file imports columns, which imports utils
+    from snapshot_file import SnapshotFile
 
-_DATA: Dict[str, List[Dict[str, Any]]] = {}
+
+# Current snapshot: launches, rockets, launchpads, plus columns (optional),
+# version (incremented on every change) and diff (against the previous version)
+_DATA: Dict[str, Any] = {}
+_VERSION = 0
 _TIMESTAMP: dt.datetime = dt.datetime(1453, 5, 29)
 _LOCK = Lock()
+_REFRESHER_LOCK = Lock()
+
+def _create_session() -> requests.Session:
+    """
+    HTTP session shared by all upstream fetches, keeps connections alive.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=c.HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+    return session
+
+_SESSION = _create_session()
 
-def _fetch_data(url: str) -> List[Dict[str, Any]]:
+# Returned by _fetch_data when the server answers 304 Not Modified
+NOT_MODIFIED: Any = object()
+
+# ETag / Last-Modified validators of the last successful response per url
+_VALIDATORS: Dict[str, Dict[str, str]] = {}
+
+_UPSTREAM_SECONDS = metrics.histogram("spacex_upstream_request_seconds", "Latency of the SpaceX API requests",
+                                      ("endpoint", "status"))
+_UPSTREAM_RETRIES = metrics.counter("spacex_upstream_retries_total", "SpaceX API requests retried after a failure",
+                                    ("endpoint",))
+_CACHE_LOOKUPS = metrics.counter("spacex_cache_lookups_total", "fetch_data calls by cache outcome", ("result",))
+
+def _endpoint(url: str) -> str:
+    """
+    Metrics label of an upstream url: its path below SPACEX_BASE_URL.
+    """
+    return url[len(c.SPACEX_BASE_URL):].lstrip("/") if url.startswith(c.SPACEX_BASE_URL) else url
+
+def _upstream_failed(url: str, attempt: int, start: float, response: Optional[requests.Response]) -> None:
+    """
+    Metrics of a failed upstream attempt: its latency if no response was
+    received (a response was already observed), and a retry if another
+    attempt follows.
+    """
+    if response is None:
+        _UPSTREAM_SECONDS.observe(time.perf_counter() - start, endpoint=_endpoint(url), status="error")
+    if attempt < 2:
+        _UPSTREAM_RETRIES.inc(endpoint=_endpoint(url))
+
+def _fetch_data(url: str, conditional: bool = False) -> Any:
+    """
+    GET a JSON document. With `conditional` the request is revalidated with
+    the validators of the previous response, and NOT_MODIFIED is returned
+    when the server answers 304.
+    """
     logging.info(f"Fetching data from: {url}")
+    headers = {}
+    validators = _VALIDATORS.get(url, {}) if conditional else {}
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last_modified" in validators:
+        headers["If-Modified-Since"] = validators["last_modified"]
+
     for i in range(3):  
+        start = time.perf_counter()
+        response = None
         try:
-            response = requests.get(url)
+            response = _SESSION.get(url, headers=headers, timeout=(c.HTTP_CONNECT_TIMEOUT, c.HTTP_READ_TIMEOUT))
+            _UPSTREAM_SECONDS.observe(time.perf_counter() - start, endpoint=_endpoint(url), status=response.status_code)
+            if response.status_code == 304 and validators:
+                logging.info(f"Not modified: {url}")
+                return NOT_MODIFIED
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+            _store_validators(url, response)
+            return data
         except Exception as e:
             logging.error(f"Error fetching data from {url}: {e}")
-            time.sleep(2**i + random.random())
+            _upstream_failed(url, i, start, response)
+            if i < 2:
+                time.sleep(2**i + random.random())
 
     logging.error(f"Failed to fetch data from {url} after 3 attempts")
     return []
+
+def _store_validators(url: str, response: requests.Response) -> None:
+    validators = {}
+    etag = response.headers.get("ETag")
+    if isinstance(etag, str):
+        validators["etag"] = etag
+    last_modified = response.headers.get("Last-Modified")
+    if isinstance(last_modified, str):
+        validators["last_modified"] = last_modified
+    if validators:
+        _VALIDATORS[url] = validators
+    else:
+        _VALIDATORS.pop(url, None)
     
 
-def _fetch_launchpads() -> List[Dict[str, Any]]:
+# interesting fields kept from each upstream document
+_LAUNCHPAD_FIELDS = LaunchpadRecord.FIELDS
+_ROCKET_FIELDS = RocketRecord.FIELDS
+_LAUNCH_FIELDS = LaunchRecord.FIELDS
+_RECORD_TYPES = {record_type.FIELDS: record_type for record_type in (LaunchpadRecord, RocketRecord, LaunchRecord)}
+
+def _project(documents: List[Dict[str, Any]], fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
     """
-    Fetch launchpad data from the SpaceX API.
+    Keep only `fields` of each document, as compact records when
+    COMPACT_RECORDS is enabled (see records.Record), else as dicts.
     """
-    launchpads = _fetch_data(f"{c.SPACEX_BASE_URL}/launchpads")
+    record_type = _RECORD_TYPES.get(fields) if c.COMPACT_RECORDS else None
+    if record_type is not None:
+        return [record_type.from_document(document) for document in documents]
+    return [{field: document.get(field) for field in fields} for document in documents]
 
-    # get interesting fields from launchpads
-    return [
-        {
-            "id": launchpad.get("id"),
-            "name": launchpad.get("name"),
-            "status": launchpad.get("status"),
-            "rockets": launchpad.get("rockets"),
-            "launches": launchpad.get("launches"),
-        }
-        for launchpad in launchpads
-    ]
+def _post_query(url: str, page: int, fields: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """
+    Fetch one page of a v4 query endpoint, or None if the endpoint is
+    unavailable or keeps failing.
+    """
+    body = {
+        "query": {},
+        "options": {
+            # the API always returns the id
+            "select": {field: 1 for field in fields if field != "id"},
+            "page": page,
+            "limit": c.QUERY_PAGE_SIZE,
+            "pagination": True,
+        },
+    }
+    for i in range(3):
+        start = time.perf_counter()
+        response = None
+        try:
+            response = _SESSION.post(url, json=body, timeout=(c.HTTP_CONNECT_TIMEOUT, c.HTTP_READ_TIMEOUT))
+            _UPSTREAM_SECONDS.observe(time.perf_counter() - start, endpoint=_endpoint(url), status=response.status_code)
+            if response.status_code in (404, 405, 501):
+                logging.warning(f"Query endpoint unavailable: {url} ({response.status_code})")
+                return None
+            response.raise_for_status()
+            result = response.json()
+            if not isinstance(result, dict) or not isinstance(result.get("docs"), list):
+                logging.warning(f"Unexpected response from query endpoint: {url}")
+                return None
+            return result
+        except Exception as e:
+            logging.error(f"Error fetching page {page} from {url}: {e}")
+            _upstream_failed(url, i, start, response)
+            if i < 2:
+                time.sleep(2**i + random.random())
+
+    logging.error(f"Failed to fetch page {page} from {url} after 3 attempts")
+    return None
 
-def _fetch_rockets() -> List[Dict[str, Any]]:
+def _query_data(path: str, fields: Tuple[str, ...]) -> Optional[List[Dict[str, Any]]]:
     """
-    Fetch rocket data from the SpaceX API.
+    Fetch a collection through its v4 query endpoint, asking the server for
+    only `fields`. The first page tells how many pages there are, the rest
+    are fetched concurrently and projected as they arrive, so only the
+    projected records are kept in memory. Returns None if any page fails.
     """
-    rockets = _fetch_data(f"{c.SPACEX_BASE_URL}/rockets")
+    url = f"{c.SPACEX_BASE_URL}/{path}/query"
+    logging.info(f"Querying data from: {url}")
 
-    # get interesting fields from rockets
-    return [
-        {
-            "id": rocket.get("id"),
-            "name": rocket.get("name"),
-            "active": rocket.get("active"),
-        }
-        for rocket in rockets
-    ]
+    first = _post_query(url, 1, fields)
+    if first is None:
+        return None
+    pages: Dict[int, List[Dict[str, Any]]] = {1: _project(first["docs"], fields)}
+    total_pages = int(first.get("totalPages") or 1)
+    del first
+
+    if total_pages > 1:
+        with ThreadPoolExecutor(max_workers=c.QUERY_CONCURRENCY) as executor:
+            futures = {executor.submit(_post_query, url, page, fields): page for page in range(2, total_pages + 1)}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    for other in futures:
+                        other.cancel()
+                    return None
+                pages[futures[future]] = _project(result["docs"], fields)
 
-def _fetch_launches() -> List[Dict[str, Any]]:
+    return [document for page in sorted(pages) for document in pages[page]]
+
+def _fetch_collection(path: str, fields: Tuple[str, ...], conditional: bool) -> Any:
     """
-    Fetch launch data from the SpaceX API.
+    Fetch and project a collection, through the query endpoint when
+    QUERY_INGESTION is enabled and falling back to the full document.
     """
-    launches = _fetch_data(f"{c.SPACEX_BASE_URL}/launches")
+    if c.QUERY_INGESTION:
+        documents = _query_data(path, fields)
+        if documents is not None:
+            return documents
+        logging.warning(f"Falling back to full fetch of {path}")
 
-    # get interesting fields from launches
-    return [
-        {
-            "id": launch.get("id"),
-            "name": launch.get("name"),
-            "launchpad": launch.get("launchpad"),
-            "date_utc": launch.get("date_utc"),
-            "success": launch.get("success"),
-            "rocket": launch.get("rocket"),
-        }
-        for launch in launches
-    ]
+    documents = _fetch_data(f"{c.SPACEX_BASE_URL}/{path}", conditional=conditional)
+    if documents is NOT_MODIFIED:
+        return NOT_MODIFIED
+    return _project(documents, fields)
 
-def fetch_data() -> Tuple[List[Dict[str, Any]], bool]:
+def _fetch_launchpads(conditional: bool = False) -> Any:
     """
-    Return data from the API endpoint, using a cache to minimize API calls.
+    Fetch launchpad data from the SpaceX API, or NOT_MODIFIED when
+    `conditional` and unchanged since the last fetch.
+    """
+    return _fetch_collection("launchpads", _LAUNCHPAD_FIELDS, conditional)
+
+def _fetch_rockets(conditional: bool = False) -> Any:
+    """
+    Fetch rocket data from the SpaceX API, or NOT_MODIFIED when
+    `conditional` and unchanged since the last fetch.
+    """
+    return _fetch_collection("rockets", _ROCKET_FIELDS, conditional)
+
+def _fetch_launches(conditional: bool = False) -> Any:
+    """
+    Fetch launch data from the SpaceX API, or NOT_MODIFIED when
+    `conditional` and unchanged since the last fetch.
     """
-    global _DATA, _TIMESTAMP
+    return _fetch_collection("launches", _LAUNCH_FIELDS, conditional)
 
-    def __foo(key: str) -> Tuple[str, List[Dict[str, Any]]]:
+def _download_data() -> Dict[str, Any]:
+    """
+    Fetch launches, rockets and launchpads from the API in parallel. Parts
+    already cached are revalidated and come back as NOT_MODIFIED if unchanged.
+    """
+    cached = _DATA
+
+    def __foo(key: str) -> Tuple[str, Any]:
         """
         Fetch data from the API endpoint.
         """
+        conditional = key in cached
         if key == "launches":
-            data = _fetch_launches()
+            data = _fetch_launches(conditional=conditional)
         elif key == "rockets":
-            data = _fetch_rockets()
+            data = _fetch_rockets(conditional=conditional)
         elif key == "launchpads":
-            data = _fetch_launchpads()
+            data = _fetch_launchpads(conditional=conditional)
         else:
             data = []
         return (key, data)
 
-    with _LOCK:
+    logging.info(f"Fetching data...")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        data = dict(executor.map(__foo, ["launches", "rockets", "launchpads"]))
+
+    return data
+
+# Guards the downloads, see download_snapshot
+_BREAKER = CircuitBreaker(c.BREAKER_FAILURES, c.BREAKER_RESET_TIMEOUT)
+_REJECTED = metrics.counter("spacex_snapshots_rejected_total", "Downloaded snapshots rejected as truncated")
+
+def _snapshot_problem(data: Dict[str, Any], current: Dict[str, Any]) -> Optional[str]:
+    """
+    Why a downloaded snapshot looks truncated, or None: a collection came
+    back empty (which is also what a failed fetch returns), or lost more
+    than SNAPSHOT_MAX_SHRINK of the records of the current snapshot.
+    """
+    for key in ("launches", "rockets", "launchpads"):
+        documents = data[key]
+        if documents is NOT_MODIFIED:
+            continue
+        if not documents:
+            return f"no {key}"
+        previous = len(current.get(key) or ())
+        if previous and len(documents) < previous * (1 - c.SNAPSHOT_MAX_SHRINK):
+            return f"{key} shrank from {previous} to {len(documents)}"
+    return None
+
+def download_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Download the data, or None if the upstream API is unavailable: the
+    circuit breaker is open (no request is made), or the download failed
+    or looks truncated (see _snapshot_problem), which counts as a failure
+    of the breaker. Callers keep serving the last good snapshot then.
+    """
+    if not _BREAKER.allow():
+        logging.warning(f"SpaceX API unavailable, retrying in {_BREAKER.retry_after():.0f}s")
+        return None
+    current = _DATA
+    with metrics.timed("download"):
+        data = _download_data()
+    problem = _snapshot_problem(data, current)
+    if problem is not None:
+        logging.error(f"Rejected the downloaded data ({problem}), keeping the last good snapshot")
+        _REJECTED.inc()
+        _BREAKER.record_failure()
+        return None
+    _BREAKER.record_success()
+    return data
+
+# Served while no snapshot could be downloaded yet. Not installed: _DATA stays
+# empty, so is_ready() is False and the next fetch_data downloads again.
+_EMPTY_SNAPSHOT: Dict[str, Any] = {"launches": [], "rockets": [], "launchpads": [], "version": 0}
+
+def _last_good() -> Dict[str, Any]:
+    """
+    The current snapshot, the last one that was downloaded successfully.
+    """
+    return _DATA or _EMPTY_SNAPSHOT
+
+def _collect_metrics() -> Iterator[metrics.Family]:
+    yield "spacex_upstream_circuit_open", "gauge", "Whether upstream downloads are suspended", [
+        ({}, int(_BREAKER.retry_after() > 0))
+    ]
+
+metrics.register_collector(_collect_metrics)
+
+def _install_data(data: Dict[str, Any]) -> Tuple[Dict[str, Any], SnapshotDiff]:
+    """
+    Install a freshly downloaded snapshot, must be called with _LOCK held.
+
+    Each collection is diffed by id against the current snapshot. Unchanged
+    records (and collections) keep their current objects, and the columnar
+    launches are updated in place of a rebuild when possible. If nothing
+    changed the current snapshot is kept and only its timestamp is bumped.
+    Returns the installed snapshot and its diff, which is falsy when there
+    is nothing to notify about.
+    """
+    global _DATA, _TIMESTAMP, _VERSION
+
+    current = _DATA
+    snapshot: Dict[str, Any] = {}
+    diffs: Dict[str, RecordDiff] = {}
+    for key in ("launches", "rockets", "launchpads"):
+        if data[key] is NOT_MODIFIED:
+            snapshot[key] = current.get(key, [])
+            diffs[key] = RecordDiff()
+        else:
+            snapshot[key], diffs[key] = diff_records(current.get(key, []), data[key])
+
+    diff = SnapshotDiff(**diffs, base_version=current.get("version", 0), version=_VERSION + 1)
+    # a shared snapshot is as old as its download by the writer process
+    fetched = dt.datetime.fromtimestamp(data["written"]) if "written" in data else dt.datetime.now()
+    if current and not diff and all(snapshot[key] is current.get(key) for key in diffs):
+        logging.info("Upstream data not modified")
+        _TIMESTAMP = fetched
+        return current, NO_CHANGES
+
+    # columnar copy of the launches for vectorized queries (needs numpy)
+    from columns import build_launch_columns  # columns imports utils
+    columns = current.get("columns")
+    if data.get("columns") is not None:
+        # memory-mapped columns of a shared snapshot file
+        snapshot["columns"] = data["columns"]
+    elif snapshot["launches"] is current.get("launches") and columns is not None:
+        snapshot["columns"] = columns
+    elif columns is not None and diff.launches.in_place:
+        snapshot["columns"] = columns.updated(snapshot["launches"], diff.launches.changed_positions, diff.launches.old_length)
+    else:
+        columns = build_launch_columns(snapshot["launches"])
+        if columns is not None:
+            snapshot["columns"] = columns
+
+    _VERSION += 1
+    snapshot["version"] = _VERSION
+    snapshot["diff"] = diff
+    snapshot["fingerprint"] = data.get("fingerprint") or _fingerprint(snapshot)
+    # orders snapshots across the workers of a host (see claim_notification):
+    # when the content was downloaded, kept by the processes sharing it
+    snapshot["revision"] = data.get("revision") or time.time_ns()
+    if diff:
+        logging.info(f"Installed data version {_VERSION}: {diff}")
+
+    _DATA = snapshot
+    _TIMESTAMP = fetched
+
+    return snapshot, diff
+
+def _fingerprint(data: Dict[str, Any]) -> str:
+    content = json.dumps([data.get(key, []) for key in ("launches", "rockets", "launchpads")],
+                         sort_keys=True, separators=(",", ":"), default=json_default)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+def data_fingerprint(data: Dict[str, Any]) -> str:
+    """
+    Content hash of a snapshot, identical across processes for identical
+    data. Computed when the snapshot is installed (or on first use for
+    snapshots built elsewhere).
+    """
+    fingerprint = data.get("fingerprint")
+    if fingerprint is None:
+        fingerprint = data["fingerprint"] = _fingerprint(data)
+    return fingerprint
+
+def snapshot_age() -> float:
+    """
+    Seconds since the current snapshot was fetched (or last revalidated).
+    """
+    return (dt.datetime.now() - _TIMESTAMP).total_seconds()
+
+def fetch_data() -> Tuple[Dict[str, Any], SnapshotDiff]:
+    """
+    Return data from the API endpoint, using a cache to minimize API calls.
+
+    The second value is the SnapshotDiff against the previous data when this
+    call installed new data, and the (falsy) NO_CHANGES otherwise.
+
+    While the background refresher is running (see start_background_refresh)
+    this never waits on the network once the cache is warm: the last snapshot
+    is returned immediately and an expired cache only wakes the refresher.
+
+    While the API is unavailable (see download_snapshot) the last good
+    snapshot keeps being returned, or an empty one if there is none yet.
+    """
+    if _REFRESHER is not None and _DATA:
+        _cache_lookup("background")
+        return _REFRESHER.read()
+
+    with metrics.acquire(_LOCK):
+        # a version published by the writer process (or the last one on startup)
+        shared = _poll_shared_snapshot()
+        if shared is not None:
+            _cache_lookup("shared")
+            return _install_data(shared)
+
         # first check cache (if expired or missing, fetch from API)
-        if _TIMESTAMP.timestamp() - dt.datetime.now().timestamp() < c.CACHE_EXPIRY and _DATA:
-            return _DATA, False
-            
+        if _DATA and snapshot_age() < c.CACHE_EXPIRY:
+            _cache_lookup("hit")
+            return _DATA, NO_CHANGES
+
+        # only the process writing the shared snapshot calls the API
+        shared = _shared_snapshot()
+        if shared is not None and not shared.try_become_writer():
+            _cache_lookup("shared")
+            return _follow(shared)
+
         # If cache is expired or missing, fetch from API and save cache.
-        logging.info(f"Fetching data...")
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            data = dict(executor.map(__foo, ["launches", "rockets", "launchpads"]))
+        data = download_snapshot()
+        if data is None:
+            _cache_lookup("stale")
+            return _last_good(), NO_CHANGES
+        _cache_lookup("miss")
+        return _publish(*_install_data(data))
+
+def _cache_lookup(result: str) -> None:
+    _CACHE_LOOKUPS.inc(result=result)
+    metrics.describe("cache", result)
+
+def refresh_data() -> Tuple[Dict[str, Any], SnapshotDiff]:
+    """
+    Refresh the cache regardless of its age. The download happens outside
+    of _LOCK, which is only held to swap in the new snapshot.
+
+    With a shared snapshot file only the writer process downloads, the
+    others install the last version it published. While the API is
+    unavailable the current snapshot is kept.
+    """
+    shared = _shared_snapshot()
+    if shared is not None and not shared.try_become_writer():
+        with metrics.acquire(_LOCK):
+            return _follow(shared)
+
+    data = download_snapshot()
+    if data is None:
+        return _last_good(), NO_CHANGES
+    with metrics.acquire(_LOCK):
+        return _publish(*_install_data(data))
+
+_SNAPSHOT_FILE: Optional["SnapshotFile"] = None
+_SNAPSHOT_POLLED = 0.0
+
+def _shared_snapshot() -> Optional["SnapshotFile"]:
+    """
+    The snapshot file shared with the other workers, None unless
+    SNAPSHOT_FILE is set.
+    """
+    global _SNAPSHOT_FILE
+    if not c.SNAPSHOT_FILE:
+        return None
+    if _SNAPSHOT_FILE is None or _SNAPSHOT_FILE.path != c.SNAPSHOT_FILE:
+        from snapshot_file import SnapshotFile  # snapshot_file imports columns, which imports utils
+        _SNAPSHOT_FILE = SnapshotFile(c.SNAPSHOT_FILE)
+    return _SNAPSHOT_FILE
+
+def _poll_shared_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    The shared snapshot if it changed since it was last loaded: always
+    checked while the cache is empty, then at most every
+    SNAPSHOT_POLL_INTERVAL seconds by the processes that do not write it.
+    Must be called with _LOCK held.
+    """
+    global _SNAPSHOT_POLLED
+    shared = _shared_snapshot()
+    if shared is None:
+        return None
+    if _DATA:
+        if shared.is_writer or time.monotonic() - _SNAPSHOT_POLLED < c.SNAPSHOT_POLL_INTERVAL:
+            return None
+    _SNAPSHOT_POLLED = time.monotonic()
+    return shared.load_if_changed()
+
+def is_refresher() -> bool:
+    """
+    Whether this process downloads the snapshot from the API: always, unless
+    the shared snapshot file is written by another process.
+    """
+    shared = _shared_snapshot()
+    return shared is None or shared.is_writer
+
+def _follow(shared: "SnapshotFile") -> Tuple[Dict[str, Any], SnapshotDiff]:
+    """
+    Refresh of a process that does not write the shared snapshot: install
+    the last version the writer published, if new, and never download.
+    Until the writer publishes or revalidates again the current snapshot
+    (or the last good one) is served, and the file is looked at again in
+    SNAPSHOT_POLL_INTERVAL. Must be called with _LOCK held.
+    """
+    global _TIMESTAMP
+    data = shared.load_if_changed()
+    if data is not None:
+        return _install_data(data)
+    retry = dt.datetime.now() - dt.timedelta(seconds=max(0, c.CACHE_EXPIRY - c.SNAPSHOT_POLL_INTERVAL))
+    _TIMESTAMP = max(retry, dt.datetime.fromtimestamp(shared.revalidated))
+    return _last_good(), NO_CHANGES
+
+def _publish(snapshot: Dict[str, Any], diff: SnapshotDiff) -> Tuple[Dict[str, Any], SnapshotDiff]:
+    """
+    Write a newly installed snapshot to the shared file, if this process is
+    its writer. An unchanged snapshot only marks the file revalidated, so
+    the other processes' copies stay fresh without reloading it. Must be
+    called with _LOCK held.
+    """
+    shared = _shared_snapshot()
+    if shared is not None and shared.try_become_writer():
+        try:
+            if diff or not shared.touch():
+                shared.write(snapshot, snapshot["version"])
+        except OSError as e:
+            logging.error(f"Could not write snapshot {shared.path}: {e}")
+    return snapshot, diff
+
+class _BackgroundRefresher:
+    """
+    Stale-while-revalidate refresher: a single daemon thread that refreshes
+    the cache every `interval` seconds, or sooner when a reader finds the
+    cache expired. Readers never block on the network. While the circuit
+    breaker is open it sleeps until the API may be probed again.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._wakeup = Event()
+        self._stop = Event()
+        self._notify_lock = Lock()
+        self._pending_diff: SnapshotDiff = NO_CHANGES
+        self._thread = Thread(target=self._run, name="spacex-refresher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
 
-        notify_subscribers = len(_DATA.get("launches", [])) != len(data["launches"])
-        
-        if data:
-            _DATA = data
-            _TIMESTAMP = dt.datetime.now()
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
 
-        return data, notify_subscribers
+    def wakeup(self) -> None:
+        self._wakeup.set()
+
+    def read(self) -> Tuple[Dict[str, Any], SnapshotDiff]:
+        """
+        Return the current snapshot, waking the refresher if it has expired.
+        Changes installed since the last read are handed to exactly one reader.
+        """
+        data = _DATA
+        if (dt.datetime.now() - _TIMESTAMP).total_seconds() >= c.CACHE_EXPIRY:
+            self._wakeup.set()
+
+        with self._notify_lock:
+            diff, self._pending_diff = self._pending_diff, NO_CHANGES
+        return data, diff
+
+    def refresh(self) -> None:
+        _, diff = refresh_data()
+        if diff:
+            with self._notify_lock:
+                pending = self._pending_diff
+                self._pending_diff = pending.merge(diff) if pending else diff
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            retry_after = _BREAKER.retry_after()
+            if retry_after > 0:
+                # the API is unavailable: probe it again when the breaker
+                # allows it, expired reads waking us meanwhile would fail fast
+                self._stop.wait(retry_after)
+            else:
+                self._wakeup.wait(self.interval)
+            if self._stop.is_set():
+                break
+            self._wakeup.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Background refresh failed: {e}")
+
+_REFRESHER: Optional[_BackgroundRefresher] = None
+
+def warm_cache() -> bool:
+    """
+    Readiness hook: load the cache synchronously if it is empty (e.g. at
+    application startup) and return whether data is available.
+    """
+    if not _DATA:
+        fetch_data()
+    return is_ready()
+
+def is_ready() -> bool:
+    """
+    Whether a snapshot has been loaded.
+    """
+    return bool(_DATA)
+
+def start_background_refresh(interval: Optional[float] = None, warm: bool = True) -> None:
+    """
+    Start the background refresher (no-op if already running). With `warm`
+    the cache is loaded before returning, so the first request is served
+    from memory.
+    """
+    global _REFRESHER
+
+    with _REFRESHER_LOCK:
+        if _REFRESHER is not None:
+            return
+        if warm:
+            warm_cache()
+        _REFRESHER = _BackgroundRefresher(c.REFRESH_INTERVAL if interval is None else interval)
+        _REFRESHER.start()
+    logging.info("Background refresh started")
+
+def stop_background_refresh(timeout: Optional[float] = None) -> None:
+    """
+    Stop the background refresher, fetch_data goes back to synchronous refreshes.
+    """
+    global _REFRESHER
+
+    with _REFRESHER_LOCK:
+        refresher, _REFRESHER = _REFRESHER, None
+    if refresher is not None:
+        refresher.stop(timeout)
+
+# ISO-8601 shapes accepted by parse_date: a date, optionally followed by
+# "T" and a time with an optional fraction (and "Z" after a fraction), or by
+# " " and a time without either
+_ISO_DATE = re.compile(
+    r"([0-9]{4})-([0-9]{2})-([0-9]{2})(?:(T)([0-9]{2}):([0-9]{2}):([0-9]{2})(?:\.([0-9]{1,6})(Z)?)?"
+    r"| ([0-9]{2}):([0-9]{2}):([0-9]{2}))?"
+)
 
 def parse_date(date_str: str | dt.datetime) -> Optional[dt.datetime]:
     """
     Parse a date string into a datetime object.
     """
+    if isinstance(date_str, str):
+        return _parse_date_str(date_str)
+    return _parse_date_formats(date_str)
+
+@functools.lru_cache(maxsize=1 << 16)
+def _parse_date_str(date_str: str) -> Optional[dt.datetime]:
+    """
+    parse_date of a string, memoized: launch dates are parsed once however
+    many indexes, columns or requests need them. Canonical ISO-8601 strings
+    are parsed directly, anything else goes through the format chain.
+    """
+    match = _ISO_DATE.fullmatch(date_str)
+    if match is not None:
+        year, month, day, _, hour, minute, second, fraction, _, s_hour, s_minute, s_second = match.groups()
+        hour, minute, second = hour or s_hour, minute or s_minute, second or s_second
+        try:
+            return dt.datetime(int(year), int(month), int(day),
+                               int(hour or 0), int(minute or 0), int(second or 0),
+                               int(fraction.ljust(6, "0")) if fraction else 0,
+                               tzinfo=dt.timezone.utc)
+        except ValueError:
+            pass
+    return _parse_date_formats(date_str)
+
+def _parse_date_formats(date_str: str | dt.datetime) -> Optional[dt.datetime]:
+    """
+    Try the accepted formats one by one (the slow path of parse_date).
+    """
     for data_formats in [
         "%Y-%m-%dT%H:%M:%S.%fZ",
         "%Y-%m-%dT%H:%M:%S.%f",
@@ -140,19 +720,31 @@ def parse_date(date_str: str | dt.datetime) -> Optional[dt.datetime]:
     logging.warning(f"Invalid date format: {date_str}")
     return None
 
-def send_notifications(subscribers: Set[str]) -> None:
+def parse_date_lenient(date_str: str) -> Optional[dt.datetime]:
     """
-    Send notifications to subscribers.
+    parse_date, falling back to ``fromisoformat`` (which also accepts e.g.
+    utc offsets) as launch frequency does. None if both fail.
     """
-    def __foo(subscriber: str) -> None:
-        logging.info(f"Sending notification to {subscriber}")
-        for i in range(3):
-            response = requests.post(subscriber, 
-                                     json={"message": "New data is available!"},
-                                     timeout=5)
-            if response.status_code == 200:
-                break
-            time.sleep(2**i + random.random())
+    if not date_str or not isinstance(date_str, str):
+        return None
+    launch_date = parse_date(date_str)
+    if launch_date is None:
+        try:
+            launch_date = dt.datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return launch_date
+
+def send_notifications(subscribers: Set[str], diff: Optional[SnapshotDiff] = None) -> None:
+    """
+    Send notifications to subscribers, including the ids that changed when
+    the diff is known.
+
+    Returns immediately, delivery (with retries) is done in the background
+    by the webhook dispatcher.
+    """
+    payload: Dict[str, Any] = {"message": "New data is available!"}
+    if diff:
+        payload["changes"] = diff.to_dict()
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        executor.map(__foo, subscribers)
+    get_dispatcher().submit(list(subscribers), payload)